@@ -6,11 +6,10 @@ from flask import Flask, session
 from flask_login import LoginManager
 
 import src.config_manager as config_manager
-from src.file_mgmt.content_managers import BackBlazeContentManager
-import src.file_mgmt.datastore as file_datastore
+from src.container import AppContainer
+from src.startup import PhaseTimer
+from src.file_mgmt.upload_limits import UploadLimitedRequest
 import src.user_mgmt.authentication as authentication
-import src.user_mgmt.datastore as user_datastore
-from src.user_mgmt.model import UserManager
 
 
 # Blueprints
@@ -20,12 +19,34 @@ import src.user_mgmt.blueprint as user_mgmt_blueprint
 
 class FileZapServer(Flask):
 
+    request_class = UploadLimitedRequest
+
     def __init__(self):
-        super(FileZapServer, self).__init__(__name__)
-        self._init_flask_app()
-        self._init_user_manager()
-        self._init_content_manager()
-        self._init_login_manager()
+        """
+        Services are built on first use unless FILEZAP_STARTUP_MODE is eager, so a
+        cold start only pays for what its first request needs
+        """
+        self.startup_timer = PhaseTimer()
+        with self.startup_timer.phase('flask'):
+            super(FileZapServer, self).__init__(__name__)
+        self.container = AppContainer()
+        with self.startup_timer.phase('flask_app'):
+            self._init_flask_app()
+        with self.startup_timer.phase('login_manager'):
+            self._init_login_manager()
+        if self.container.config.get('FILEZAP_STARTUP_MODE') == config_manager.STARTUP_MODE_EAGER:
+            with self.startup_timer.phase('services'):
+                self.container.warm_up()
+
+
+    @property
+    def user_manager(self):
+        return self.container.user_manager
+
+
+    @property
+    def content_manager(self):
+        return self.container.content_manager
 
 
     def _init_flask_app(self):
@@ -44,26 +65,20 @@ class FileZapServer(Flask):
         user_mgmt_blueprint.register_blueprint(self)
 
 
-    def _init_user_manager(self):
-        config = config_manager.get_config()
-        user_data_store = user_datastore.UserDataStore(config)
-        file_data_store = file_datastore.FileDataStore(config)
-        self.user_manager = UserManager(user_data_store, file_data_store)
-
-
-    def _init_content_manager(self):
-        # TODO (Future): Implement logic to use configurable content managers
-        self.content_manager = BackBlazeContentManager()
-
-
     def _init_login_manager(self):
         login_manager = LoginManager()
-        login_manager.user_callback = self.user_manager.get_user
-        login_manager.request_callback = self._load_user_from_request
+        login_manager.user_loader(self._load_user)
+        login_manager.request_loader(self._load_user_from_request)
         login_manager.init_app(self)
         login_manager.login_view = "/login"
 
 
+    def _load_user(self, username):
+        user = self.user_manager.get_user(username)
+        if user and not user.deletion_pending:
+            return user
+
+
     def _load_user_from_request(self, request):
         auth_string = request.headers.get('Authorization')
         if auth_string:
@@ -71,6 +86,6 @@ class FileZapServer(Flask):
             credentials = base64.b64decode(base64_credentials).decode()
             username, password = credentials.split(':')
             user = self.user_manager.get_user(username)
-            if user and user.password_hash == authentication.hash_password(password, user.salt):
+            if user and not user.deletion_pending and user.password_hash == authentication.hash_password(password, user.salt):
                 user.is_authenticated = True
                 return user
\ No newline at end of file
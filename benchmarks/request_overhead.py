@@ -0,0 +1,60 @@
+"""
+Compares the cost of getting a FileMgmtController per request when it is
+built from scratch, as the blueprint used to do, with getting it from an
+AppContainer. No AWS calls are made, building boto3 resources is local.
+
+The development server starts a thread per request, so the cost of the
+first DynamoDB table a new thread uses is measured too: with a session of
+its own per thread and with the container's resources sharing one client.
+
+Run with: python -m benchmarks.request_overhead
+"""
+import threading
+import timeit
+
+import src.config_manager as config_manager
+import src.container as container
+import src.file_mgmt.controller as controller
+import src.file_mgmt.datastore as datastore
+
+
+_REQUESTS = 200
+_THREADS = 20
+_TABLE = 'files'
+
+
+def build_per_request():
+    config = config_manager.get_config()
+    data_store = datastore.FileDataStore(config)
+    return controller.FileMgmtController(data_store, None)
+
+
+def create_session_per_thread():
+    import boto3
+    return container.ThreadLocalResource(lambda: boto3.session.Session().resource('dynamodb', region_name='us-east-1'))
+
+
+def get_table_on_new_thread(dynamodb):
+    thread = threading.Thread(target=lambda: dynamodb.get_table(_TABLE))
+    thread.start()
+    thread.join()
+
+
+def main():
+    app_container = container.AppContainer(content_manager=object())
+    per_request = timeit.timeit(build_per_request, number=_REQUESTS)
+    from_container = timeit.timeit(lambda: app_container.file_mgmt_controller, number=_REQUESTS)
+    print(f'built per request: {per_request / _REQUESTS * 1000:.3f} ms/request')
+    print(f'from container:    {from_container / _REQUESTS * 1000:.3f} ms/request')
+
+    session_per_thread = create_session_per_thread()
+    shared_client = container._create_dynamodb()
+    per_thread = timeit.timeit(lambda: get_table_on_new_thread(session_per_thread), number=_THREADS)
+    from_shared_client = timeit.timeit(lambda: get_table_on_new_thread(shared_client), number=_THREADS)
+    print(f'new thread, session per thread: {per_thread / _THREADS * 1000:.3f} ms/thread')
+    print(f'new thread, shared client:      {from_shared_client / _THREADS * 1000:.3f} ms/thread')
+
+
+
+if __name__ == '__main__':
+    main()
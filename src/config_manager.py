@@ -6,7 +6,12 @@ def get_config():
         'FILE_DB_TABLE': _get_file_db_table(),
         'USER_DB_TABLE': _get_user_db_table(),
         'USER_REGISTRATION_ENABLED': _get_user_registration_enabled(),
-        'FILEZAP_MAX_FILE_SIZE': int(os.environ.get('FILEZAP_MAX_FILE_SIZE', 0))
+        'FILEZAP_MAX_FILE_SIZE': int(os.environ.get('FILEZAP_MAX_FILE_SIZE', 0)),
+        'FILEZAP_MAX_REQUEST_SIZE': int(os.environ.get('FILEZAP_MAX_REQUEST_SIZE', 0)),
+        'FILEZAP_MAX_FILES_PER_REQUEST': int(os.environ.get('FILEZAP_MAX_FILES_PER_REQUEST', _DEFAULT_MAX_FILES_PER_REQUEST)),
+        'FILEZAP_DOWNLOAD_MODE': _get_download_mode(),
+        'FILEZAP_PAGE_SIZE': int(os.environ.get('FILEZAP_PAGE_SIZE', _DEFAULT_PAGE_SIZE)),
+        'FILEZAP_STARTUP_MODE': _get_startup_mode()
     }
 
 
@@ -26,10 +31,26 @@ def _get_user_registration_enabled():
     return os.environ.get('USER_REGISTRATION_ENABLED') == 'True'
 
 
+def _get_download_mode():
+    download_mode = os.environ.get('FILEZAP_DOWNLOAD_MODE')
+    return download_mode if download_mode in (DOWNLOAD_MODE_PROXY, DOWNLOAD_MODE_REDIRECT) else DOWNLOAD_MODE_PROXY
+
+
+def _get_startup_mode():
+    startup_mode = os.environ.get('FILEZAP_STARTUP_MODE')
+    return startup_mode if startup_mode in (STARTUP_MODE_LAZY, STARTUP_MODE_EAGER) else STARTUP_MODE_LAZY
+
+
 
 DEV_ENV = 'DEVELOPMENT'
 PROD_ENV = 'PRODUCTION'
+DOWNLOAD_MODE_PROXY = 'proxy'
+DOWNLOAD_MODE_REDIRECT = 'redirect'
+STARTUP_MODE_LAZY = 'lazy'
+STARTUP_MODE_EAGER = 'eager'
 _DEV_FILE_DB_TABLE = 'files-dev'
 _DEV_USER_DB_TABLE = 'users-dev'
 _PROD_FILE_DB_TABLE = 'files'
 _PROD_USER_DB_TABLE = 'users'
+_DEFAULT_PAGE_SIZE = 50
+_DEFAULT_MAX_FILES_PER_REQUEST = 20
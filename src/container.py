@@ -0,0 +1,177 @@
+import threading
+
+import src.config_manager as config_manager
+from src.jobs import JobRunner
+from src.file_mgmt.content_managers import BackBlazeContentManager
+import src.file_mgmt.content_providers as content_providers
+import src.file_mgmt.controller as file_controller
+import src.file_mgmt.datastore as file_datastore
+import src.user_mgmt.controller as user_controller
+import src.user_mgmt.datastore as user_datastore
+from src.user_mgmt.model import UserManager
+
+
+class AppContainer(object):
+    """
+    Builds the services shared by every request the first time they are needed
+    and keeps them for the life of the process. Building a boto3 resource loads
+    its JSON service model and creates a session, which costs far more than
+    serving most requests.
+
+    Every service is built under one lock and shared across threads, except
+    for DynamoDB: boto3 documents resources and sessions as not thread safe,
+    so the shared resource hands every thread its own resource the first time
+    that thread uses it. Those resources wrap one low level client, which is
+    thread safe, so a new thread doesn't load the service model again.
+    """
+    def __init__(self, config=None, dynamodb=None, content_manager=None, provider_registry=None):
+        """
+        :param dynamodb, content_manager, provider_registry: Only used for test mocking, do not pass in production code
+        """
+        self._services = {}
+        if config is not None:
+            self._services['config'] = config
+        if dynamodb is not None:
+            self._services['dynamodb'] = dynamodb
+        if content_manager is not None:
+            self._services['content_manager'] = content_manager
+        if provider_registry is not None:
+            self._services['provider_registry'] = provider_registry
+        self._lock = threading.RLock()
+
+
+    @property
+    def config(self):
+        return self._get('config', config_manager.get_config)
+
+
+    @property
+    def dynamodb(self):
+        return self._get('dynamodb', _create_dynamodb)
+
+
+    @property
+    def content_manager(self):
+        return self._get('content_manager', _create_content_manager)
+
+
+    @property
+    def job_runner(self):
+        return self._get('job_runner', JobRunner)
+
+
+    @property
+    def provider_registry(self):
+        return self._get('provider_registry', content_providers.create_default_registry)
+
+
+    @property
+    def file_data_store(self):
+        return self._get('file_data_store', lambda: file_datastore.FileDataStore(self.config, self.dynamodb))
+
+
+    @property
+    def user_data_store(self):
+        return self._get('user_data_store', lambda: user_datastore.UserDataStore(self.config, self.dynamodb))
+
+
+    @property
+    def user_manager(self):
+        return self._get('user_manager', lambda: UserManager(self.user_data_store, self.file_data_store))
+
+
+    @property
+    def file_mgmt_controller(self):
+        return self._get('file_mgmt_controller',
+                         lambda: file_controller.FileMgmtController(self.file_data_store, self.content_manager,
+                                                                    job_runner=self.job_runner,
+                                                                    provider_registry=self.provider_registry))
+
+
+    @property
+    def user_mgmt_controller(self):
+        return self._get('user_mgmt_controller',
+                         lambda: user_controller.UserMgmtController(self.user_manager, self.content_manager,
+                                                                    job_runner=self.job_runner))
+
+
+    def warm_up(self):
+        """
+        Builds every service now instead of on first use
+        """
+        self.file_mgmt_controller
+        self.user_mgmt_controller
+
+
+    def _get(self, name, factory):
+        service = self._services.get(name)
+        if service is None:
+            with self._lock:
+                service = self._services.get(name)
+                if service is None:
+                    service = factory()
+                    self._services[name] = service
+        return service
+
+
+
+def _create_dynamodb():
+    import boto3
+    resource = boto3.session.Session().resource('dynamodb', region_name='us-east-1')
+    return ThreadLocalResource(lambda: type(resource)(client=resource.meta.client))
+
+
+
+class ThreadLocalResource(object):
+    """
+    Stands in for a boto3 resource that each thread builds for itself with
+    factory. Its tables resolve to the calling thread's table on every call
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self._local = threading.local()
+
+
+    def Table(self, table_name):
+        return _ThreadLocalTable(self, table_name)
+
+
+    def get_table(self, table_name):
+        tables = self._get_local('tables', dict)
+        table = tables.get(table_name)
+        if table is None:
+            table = tables[table_name] = self.get_resource().Table(table_name)
+        return table
+
+
+    def get_resource(self):
+        return self._get_local('resource', self._factory)
+
+
+    def __getattr__(self, name):
+        return getattr(self.get_resource(), name)
+
+
+    def _get_local(self, name, factory):
+        value = getattr(self._local, name, None)
+        if value is None:
+            value = factory()
+            setattr(self._local, name, value)
+        return value
+
+
+
+class _ThreadLocalTable(object):
+
+    def __init__(self, resource, table_name):
+        self._resource = resource
+        self._table_name = table_name
+
+
+    def __getattr__(self, name):
+        return getattr(self._resource.get_table(self._table_name), name)
+
+
+def _create_content_manager():
+    # TODO (Future): Implement logic to use configurable content managers
+    return BackBlazeContentManager()
@@ -1,27 +1,36 @@
-from io import BytesIO
+import unicodedata
+import urllib.parse
 
-from flask import Blueprint, request, send_file, render_template, redirect, jsonify, current_app
+from flask import Blueprint, Response, request, render_template, redirect, jsonify, current_app, stream_with_context
 from flask_login import login_required, current_user
 
 import src.config_manager as config_manager
 import src.file_mgmt.content_managers.exceptions as content_manager_exceptions
 import src.file_mgmt.controller as controller
 import src.file_mgmt.datastore as datastore
+import src.file_mgmt.http_caching as http_caching
+import src.file_mgmt.upload_limits as upload_limits
 
 
 blueprint = Blueprint(__name__, 'file_mgmt')
+blueprint.before_app_request(upload_limits.reject_oversized_request)
 
 
 @blueprint.route('/', methods=['GET'])
 @login_required
 def list_files():
     ctrl = _get_controller()
-    files = ctrl.get_files(current_user.username)
-    return render_template('list_files.html', username=current_user.username, files=files)
+    page_size = current_app.container.config.get('FILEZAP_PAGE_SIZE')
+    try:
+        page = ctrl.get_files_page(current_user.username, page_size, request.args.get('page'))
+    except datastore.InvalidContinuationTokenError:
+        return "Bad Request", 400
+    return render_template('list_files.html', username=current_user.username,
+                           files=page.files, continuation_token=page.continuation_token)
 
 
 
-@blueprint.route('/get_file', methods=['GET'])
+@blueprint.route('/get_file', methods=['GET', 'HEAD'])
 @login_required
 def get_file():
     content_id = request.args.get('contentId')
@@ -29,8 +38,19 @@ def get_file():
         return "Bad Request", 400
     ctrl = _get_controller()
     try:
-        file = ctrl.get_file(content_id, current_user)
-        return send_file(BytesIO(file.content), as_attachment=True, attachment_filename=file.filename)
+        file = ctrl.get_file_info(content_id, current_user)
+        if http_caching.is_not_modified(request, file):
+            return http_caching.make_not_modified_response(file)
+        if request.method == 'HEAD' and file.size is not None:
+            return http_caching.add_cache_headers(_make_file_response(file, []), file)
+        if current_app.container.config.get('FILEZAP_DOWNLOAD_MODE') == config_manager.DOWNLOAD_MODE_REDIRECT:
+            return redirect(ctrl.get_file_download_url(file, current_user))
+        byte_range = http_caching.get_byte_range(request, file)
+        return http_caching.add_cache_headers(_stream_file(ctrl.load_content(file, current_user, byte_range)), file)
+    except content_manager_exceptions.ContentRangeNotSatisfiableError:
+        return _make_range_not_satisfiable_response(file)
+    except content_manager_exceptions.ContentDownloadFailedError:
+        return "Bad Gateway", 502
     except content_manager_exceptions.ContentNotFoundError:
         ctrl.delete_file(content_id, current_user)
         return redirect('/')
@@ -39,6 +59,26 @@ def get_file():
 
 
 
+@blueprint.route('/download_zip', methods=['GET'])
+@login_required
+def download_zip():
+    """
+    Streams a ZIP of the files in the comma separated ids, or of every file with
+    all=true. Files are listed and downloaded while the response is sent, after
+    the view returned, and partly on other threads
+    """
+    ids = request.args.get('ids')
+    if not ids and request.args.get('all') != 'true':
+        return "Bad Request", 400
+    content_ids = [content_id for content_id in ids.split(',') if content_id] if ids else None
+    zip_stream = _get_controller().get_zip(content_ids, _get_user())
+    response = Response(stream_with_context(zip_stream), mimetype='application/zip', direct_passthrough=True)
+    response.headers.add('Content-Disposition', 'attachment', filename=f'{current_user.username}-files.zip')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+
 @blueprint.route('/delete_file', methods=['GET'])
 @login_required
 def delete_file():
@@ -55,34 +95,281 @@ def delete_file():
 @login_required
 def save_file():
     file = request.files.get('file')
+    if not file:
+        return "Bad Request", 400
     ctrl = _get_controller()
     ctrl.save_file(file, current_user)
     return 'OK'
 
 
 
+@blueprint.route('/save_files', methods=['POST'])
+@login_required
+@upload_limits.takes_many_files
+def save_files():
+    """
+    Saves every part named file in one request, answering with the files that
+    were saved and the filenames that could not be. A request holds at most
+    FILEZAP_MAX_FILES_PER_REQUEST files (20 by default) and is limited to that
+    many times FILEZAP_MAX_FILE_SIZE, unless FILEZAP_MAX_REQUEST_SIZE is set,
+    which then limits every request
+    """
+    raw_files = [raw_file for raw_file in request.files.getlist('file') if raw_file]
+    if not raw_files:
+        return "Bad Request", 400
+    if len(raw_files) > current_app.container.config.get('FILEZAP_MAX_FILES_PER_REQUEST'):
+        return "Payload Too Large", 413
+    ctrl = _get_controller()
+    result = ctrl.save_files(raw_files, _get_user())
+    return jsonify({
+        'saved': [{'filename': file.filename, 'contentId': file.content_id} for file in result.saved],
+        'failed': [raw_file.filename for raw_file in result.failed]
+    })
+
+
+
+@blueprint.route('/upload_session', methods=['POST'])
+@login_required
+def create_upload_session():
+    """
+    First step of a direct upload: the client sends the file straight to the
+    returned upload url, naming it fileNamePrefix followed by the url encoded
+    filename, then reports the resulting fileId to /upload_complete
+    """
+    ctrl = _get_controller()
+    upload_session = ctrl.create_upload_session(current_user)
+    return jsonify({
+        'uploadUrl': upload_session.upload_url,
+        'authorizationToken': upload_session.token,
+        'fileNamePrefix': upload_session.content_name_prefix
+    })
+
+
+
+@blueprint.route('/upload_complete', methods=['POST'])
+@login_required
+def complete_upload():
+    content_id = request.json.get('fileId')
+    filename = request.json.get('filename')
+    if not content_id or not filename:
+        return "Bad Request", 400
+    ctrl = _get_controller()
+    try:
+        ctrl.complete_upload(content_id, filename, current_user)
+    except content_manager_exceptions.ContentNotFoundError:
+        return "Bad Request", 400
+    finally:
+        if request.json.get('uploadUrl') and request.json.get('authorizationToken'):
+            ctrl.end_upload_session(current_user, request.json.get('uploadUrl'), request.json.get('authorizationToken'))
+    return 'OK'
+
+
+
+@blueprint.route('/uploads', methods=['POST'])
+@login_required
+def create_resumable_upload():
+    """
+    Resumable uploads, in the style of tus (https://tus.io): the client creates
+    an upload, PATCHes it with chunks of partSize bytes at the offset the server
+    reports, asks for that offset with HEAD after losing its connection, and
+    POSTs to /uploads/<id>/finish once every byte is sent
+    """
+    filename = request.json.get('filename')
+    size = request.json.get('size')
+    if not filename or not isinstance(size, int):
+        return "Bad Request", 400
+    max_file_size = current_app.container.config.get('FILEZAP_MAX_FILE_SIZE')
+    if max_file_size and size > max_file_size:
+        return "Payload Too Large", 413
+    ctrl = _get_controller()
+    try:
+        upload = ctrl.create_resumable_upload(filename, size, request.json.get('contentType'), current_user)
+    except content_manager_exceptions.InvalidUploadError:
+        return "Bad Request", 400
+    response = _make_resumable_upload_response(upload)
+    response.status_code = 201
+    response.headers['Location'] = f'/uploads/{upload.upload_id}'
+    return response
+
+
+
+@blueprint.route('/uploads/<upload_id>', methods=['GET', 'HEAD'])
+@login_required
+def get_resumable_upload(upload_id):
+    try:
+        upload = _get_controller().get_resumable_upload(upload_id, current_user)
+    except content_manager_exceptions.ContentNotFoundError:
+        return "Not Found", 404
+    return _make_resumable_upload_response(upload)
+
+
+
+@blueprint.route('/uploads/<upload_id>', methods=['PATCH'])
+@login_required
+def append_to_resumable_upload(upload_id):
+    offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None:
+        return "Bad Request", 400
+    if request.content_length is None:
+        return "Length Required", 411
+    ctrl = _get_controller()
+    try:
+        offset = ctrl.append_to_resumable_upload(upload_id, offset, request.stream, request.content_length, current_user)
+    except content_manager_exceptions.ContentNotFoundError:
+        return "Not Found", 404
+    except content_manager_exceptions.InvalidUploadError:
+        return "Bad Request", 400
+    except content_manager_exceptions.UploadOffsetConflictError as e:
+        return _make_upload_offset_response("Conflict", 409, e.offset)
+    except content_manager_exceptions.ContentUploadFailedError:
+        return "Bad Gateway", 502  # The offset is unchanged, the client resends the chunk
+    return _make_upload_offset_response('', 204, offset)
+
+
+
+@blueprint.route('/uploads/<upload_id>/finish', methods=['POST'])
+@login_required
+def finish_resumable_upload(upload_id):
+    ctrl = _get_controller()
+    try:
+        file = ctrl.finish_resumable_upload(upload_id, current_user)
+    except content_manager_exceptions.ContentNotFoundError:
+        return "Not Found", 404
+    except content_manager_exceptions.UploadOffsetConflictError as e:
+        return _make_upload_offset_response("Conflict", 409, e.offset)
+    return jsonify({'contentId': file.content_id})
+
+
+
+@blueprint.route('/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def cancel_resumable_upload(upload_id):
+    try:
+        _get_controller().cancel_resumable_upload(upload_id, current_user)
+    except content_manager_exceptions.ContentNotFoundError:
+        return "Not Found", 404
+    return '', 204
+
+
+
 @blueprint.route('/from_url', methods=['POST'])
 @login_required
 def save_file_from_url():
+    """
+    Imports in the background, the returned job can be polled at /jobs/<id>
+    """
     url = request.json.get('url')
+    if not url:
+        return "Bad Request", 400
     ctrl = _get_controller()
-    ctrl.save_file_from(url, current_user)
-    return 'OK'
+    try:
+        job = ctrl.start_import(url, _get_user())
+    except controller.URLNotSupportedError:
+        return "Bad Request", 400
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = f'/jobs/{job.id}'
+    return response
+
+
+
+@blueprint.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    job = _get_controller().get_job(job_id, current_user)
+    if not job:
+        return "Not Found", 404
+    return jsonify(job.to_dict())
 
 
 
 @blueprint.route('/max_file_size', methods=['GET'])
 def get_max_file_size():
-    config = config_manager.get_config()
+    config = current_app.container.config
     return jsonify({'maxBytes': config.get('FILEZAP_MAX_FILE_SIZE')})
 
 
 
+def _stream_file(file):
+    """
+    Forwards content chunks as they arrive from the content manager instead of
+    buffering the whole file, so memory use does not grow with file size. A
+    partial download is sent as 206 with the Content-Range BackBlaze returned
+    """
+    file.content_type = file.content.content_type or file.content_type
+    if file.content.content_length is not None:
+        file.size = file.content.content_length
+    response = _make_file_response(file, file.content)
+    if file.content.content_range:
+        response.status_code = 206
+        response.headers['Content-Range'] = file.content.content_range
+    return response
+
+
+
+def _make_resumable_upload_response(upload):
+    response = jsonify({
+        'uploadId': upload.upload_id,
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.offset,
+        'partSize': upload.part_size
+    })
+    response.headers['Upload-Offset'] = str(upload.offset)
+    response.headers['Upload-Length'] = str(upload.size)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+
+def _make_upload_offset_response(body, status, offset):
+    response = Response(body, status=status)
+    response.headers['Upload-Offset'] = str(offset)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+
+def _make_range_not_satisfiable_response(file):
+    response = Response('Range Not Satisfiable', status=416)
+    if file.size is not None:
+        response.headers['Content-Range'] = f'bytes */{file.size}'
+    return response
+
+
+
+def _make_file_response(file, body):
+    response = Response(body, mimetype=file.content_type or 'application/octet-stream', direct_passthrough=True)
+    response.headers.add('Content-Disposition', 'attachment', **_get_attachment_filenames(file.filename))
+    if file.size is not None:
+        response.content_length = file.size
+    return response
+
+
+
+def _get_attachment_filenames(filename):
+    try:
+        filename.encode('latin-1')
+        return {'filename': filename}
+    except UnicodeEncodeError:
+        return {
+            'filename': unicodedata.normalize('NFKD', filename).encode('latin-1', 'ignore').decode('latin-1'),
+            'filename*': f"UTF-8''{urllib.parse.quote(filename, safe='')}"
+        }
+
+
+
 def _get_controller():
-    config = config_manager.get_config()
-    data_store = datastore.FileDataStore(config)
-    content_manager = current_app.content_manager
-    return controller.FileMgmtController(data_store, content_manager)
+    return current_app.container.file_mgmt_controller
+
+
+
+def _get_user():
+    """
+    The user behind current_user, for controller calls that hand it to other
+    threads. The proxy only resolves within the request, elsewhere it is None
+    """
+    return current_user._get_current_object()
 
 
 
@@ -1 +1,3 @@
 from .backblaze.content_manager import ContentManager as BackBlazeContentManager
+
+from .model import ResumableUpload, UploadedContent, UploadSession
@@ -3,7 +3,9 @@ from collections import namedtuple
 import os
 
 import src.config_manager as config_manager
-from .exceptions import BackBlazeAuthorizationError
+import src.file_mgmt.http_sessions as http_sessions
+from .cache import ExpiringCache
+from .exceptions import BackBlazeAuthorizationError, BackBlazeAuthorizationExpiredError
 
 
 
@@ -12,33 +14,59 @@ _ENV_BUCKET_ID = 'BACKBLAZE_BUCKET_ID'
 _ENV_MASTER_APP_ID = 'BACKBLAZE_MASTER_APP_ID'
 _ENV_MASTER_SECRET_KEY = 'BACKBLAZE_MASTER_SECRET_KEY'
 _AUTH_DURATION_SECONDS = 30
+_AUTH_CACHE_MAX_SIZE = 1000
+_AUTH_CACHE_TTL_SECONDS = 23 * 60 * 60  # B2 tokens last 24 hours, refresh an hour early
+_EXPIRED_AUTH_TOKEN_CODE = 'expired_auth_token'
 
 
 _AUTH_URL = 'https://api.backblazeb2.com/b2api/v2/b2_authorize_account'
 _CREATE_KEY_RELATIVE_URL = 'b2api/v2/b2_create_key'
 _DELETE_KEY_RELATIVE_URL = 'b2api/v2/b2_delete_key'
 _UPLOAD_AUTH_RELATIVE_URL = 'b2api/v2/b2_get_upload_url'
+_UPLOAD_PART_AUTH_RELATIVE_URL = 'b2api/v2/b2_get_upload_part_url'
+_DOWNLOAD_AUTH_RELATIVE_URL = 'b2api/v2/b2_get_download_authorization'
 
 
 
 
 class Authorizer(object):
     """
-    Authorization client for BackBlaze. Requests lib is used for testing only and
+    Authorization client for BackBlaze. Account authorizations are cached per
+    credential string until shortly before BackBlaze expires them.
+
+    Requests lib and authorization cache are used for testing only and
     should not be passed in production code.
     """
-    def __init__(self, requests_lib=None):
+    def __init__(self, requests_lib=None, authorization_cache=None):
         if not requests_lib:
-            import requests
-            requests_lib = requests
+            requests_lib = http_sessions.get_shared_sessions()
         self._requests = requests_lib
+        self._cache = authorization_cache or ExpiringCache(_AUTH_CACHE_MAX_SIZE, _AUTH_CACHE_TTL_SECONDS)
+
+
+    @property
+    def cache_stats(self):
+        return self._cache.stats
+
+
+    @property
+    def master_credentials(self):
+        return f'{os.environ.get(_ENV_MASTER_APP_ID)}:{os.environ.get(_ENV_MASTER_SECRET_KEY)}'
 
 
     def authorize_api(self, credentials):
-        self._query_auth_api(credentials)
-        if self._api_response.status_code != 200:
-            raise BackBlazeAuthorizationError(credentials)
-        return self._make_authorize_response(self._api_response.json())
+        authorization = self._cache.get(credentials)
+        if not authorization:
+            response = self._query_auth_api(credentials)
+            if response.status_code != 200:
+                raise BackBlazeAuthorizationError(credentials)
+            authorization = self._make_authorize_response(response.json())
+            self._cache.put(credentials, authorization)
+        return authorization
+
+
+    def invalidate_api_authorization(self, credentials):
+        self._cache.invalidate(credentials)
 
 
     def authorize_upload(self, api_authorization):
@@ -46,14 +74,39 @@ class Authorizer(object):
         headers = {'Authorization': api_authorization.token}
         params = {'bucketId': os.environ.get(_ENV_BUCKET_ID)}
         response = self._requests.get(authorize_upload_url, headers=headers, params=params)
+        raise_if_authorization_expired(response)
+        response_json = response.json()
+        return _UploadAuthorization(response_json.get('uploadUrl'), response_json.get('authorizationToken'))
+
+
+    def authorize_upload_part(self, api_authorization, file_id):
+        authorize_upload_part_url = f'{api_authorization.api_url}/{_UPLOAD_PART_AUTH_RELATIVE_URL}'
+        headers = {'Authorization': api_authorization.token}
+        params = {'fileId': file_id}
+        response = self._requests.get(authorize_upload_part_url, headers=headers, params=params)
+        raise_if_authorization_expired(response)
         response_json = response.json()
         return _UploadAuthorization(response_json.get('uploadUrl'), response_json.get('authorizationToken'))
 
 
+    def authorize_download(self, api_authorization, file_name_prefix, duration_seconds):
+        authorize_download_url = f'{api_authorization.api_url}/{_DOWNLOAD_AUTH_RELATIVE_URL}'
+        headers = {'Authorization': api_authorization.token}
+        json = {
+            'bucketId': os.environ.get(_ENV_BUCKET_ID),
+            'fileNamePrefix': file_name_prefix,
+            'validDurationInSeconds': duration_seconds
+        }
+        response = self._requests.post(authorize_download_url, headers=headers, json=json)
+        raise_if_authorization_expired(response)
+        if response.status_code != 200:
+            raise BackBlazeAuthorizationError(api_authorization.token)
+        return response.json().get('authorizationToken')
+
+
     def create_user_credentials(self, user):
         authorization = self._get_master_authorization()
-        self._generate_application_key(authorization, user.username)
-        response_data = self._api_response.json()
+        response_data = self._generate_application_key(authorization, user.username).json()
         user.content_credentials = f'{response_data.get("applicationKeyId")}:{response_data.get("applicationKey")}'
 
 
@@ -64,15 +117,16 @@ class Authorizer(object):
 
 
     def _query_auth_api(self, credentials):
-        self._build_auth_headers(credentials)
-        self._api_response = self._requests.get(_AUTH_URL, headers=self._headers)
+        headers = self._build_auth_headers(credentials)
+        return self._requests.get(_AUTH_URL, headers=headers)
 
 
     def _make_authorize_response(self, response_data):
         download_url = response_data.get('downloadUrl')
         return _Authorization(response_data.get('apiUrl'),
                               download_url,
-                              response_data.get('authorizationToken'))
+                              response_data.get('authorizationToken'),
+                              (response_data.get('allowed') or {}).get('bucketName'))
 
 
     def _generate_application_key(self, authorization, username):
@@ -85,20 +139,20 @@ class Authorizer(object):
             'bucketId': os.environ.get(_ENV_BUCKET_ID),
             'namePrefix': f'{username}/'
         }
-        self._api_response = self._requests.post(create_key_url, headers={'Authorization': authorization.token}, json=post_json)
-        if self._api_response.status_code != 200:
+        response = self._requests.post(create_key_url, headers={'Authorization': authorization.token}, json=post_json)
+        if response.status_code != 200:
             raise BackBlazeAuthorizationError(authorization.token)
+        return response
 
 
     def _build_auth_headers(self, auth_string):
         auth_string_bytes = auth_string.encode()
         auth_string_as_base64 = base64.b64encode(auth_string_bytes).decode()
-        self._headers = {'Authorization': f'Basic {auth_string_as_base64}'}
+        return {'Authorization': f'Basic {auth_string_as_base64}'}
 
 
     def _get_master_authorization(self):
-        master_credentials = f'{os.environ.get(_ENV_MASTER_APP_ID)}:{os.environ.get(_ENV_MASTER_SECRET_KEY)}'
-        return self.authorize_api(master_credentials)
+        return self.authorize_api(self.master_credentials)
 
 
     def _delete_application_key(self, authorization, application_key_id):
@@ -108,5 +162,15 @@ class Authorizer(object):
 
 
 
-_Authorization = namedtuple('Authorization', ['api_url', 'download_url', 'token'])
+def raise_if_authorization_expired(response):
+    """
+    BackBlaze answers 401 with code expired_auth_token once a token runs out,
+    callers can catch the raised error to re-authorize and retry once
+    """
+    if response.status_code == 401 and response.json().get('code') == _EXPIRED_AUTH_TOKEN_CODE:
+        raise BackBlazeAuthorizationExpiredError(response.json().get('message'))
+
+
+
+_Authorization = namedtuple('Authorization', ['api_url', 'download_url', 'token', 'bucket_name'])
 _UploadAuthorization = namedtuple('UploadAuthorization', ['upload_url', 'token'])
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+
+class ExpiringCache(object):
+    """
+    Thread safe, size bounded LRU cache whose entries expire after a fixed
+    time to live. on_evict, if given, is called with the key and value of
+    every entry dropped because it expired or the cache was full, e.g. to
+    close it. Clock is used for testing only and should not be passed in
+    production code.
+    """
+    def __init__(self, max_size, ttl_seconds, clock=None, on_evict=None):
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock or time.monotonic
+        self._on_evict = on_evict
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+
+    @property
+    def size(self):
+        return len(self._entries)
+
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': self.size}
+
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            expired_entry = self._entries.pop(key, None)
+            self.misses += 1
+        if expired_entry:
+            self._evict([(key, expired_entry[0])])
+
+
+    def put(self, key, value, ttl_seconds=None):
+        ttl_seconds = self._ttl_seconds if ttl_seconds is None else ttl_seconds
+        evicted = []
+        with self._lock:
+            self._entries[key] = (value, self._clock() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                evicted_key, (evicted_value, expires_at) = self._entries.popitem(last=False)
+                evicted.append((evicted_key, evicted_value))
+        self._evict(evicted)
+
+
+    def items(self):
+        """
+        The entries that have not expired, without counting hits or misses
+        """
+        now = self._clock()
+        with self._lock:
+            return [(key, value) for key, (value, expires_at) in self._entries.items() if expires_at > now]
+
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+    def _evict(self, entries):
+        """
+        Called outside the lock so on_evict may take its time or use the cache
+        """
+        if self._on_evict:
+            for key, value in entries:
+                self._on_evict(key, value)
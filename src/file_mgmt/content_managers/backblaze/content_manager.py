@@ -1,27 +1,51 @@
-import hashlib
+import io
 import urllib
 
-from .authorization import Authorizer
-from ..exceptions import ContentNotFoundError, ContentUploadFailedError
+import src.file_mgmt.http_sessions as http_sessions
+from .authorization import Authorizer, raise_if_authorization_expired, _UploadAuthorization
+from .cache import ExpiringCache
+from .exceptions import BackBlazeAuthorizationExpiredError
+from .hashing_reader import HashingReader, HEX_DIGITS_AT_END, SHA1_HEX_LENGTH
+from .large_file import LargeFileUploader
+from .resumable import ResumableUploads
+from .upload_pool import UploadUrlPool
+from ..exceptions import ContentDownloadFailedError, ContentNotFoundError, ContentRangeNotSatisfiableError, ContentUploadFailedError
+from ..model import UploadedContent, UploadSession
+from ..stream import ContentStream
 
 
 _API_PREFIX = 'b2api/v2'
 _DELETE_RELATIVE_URL = f'{_API_PREFIX}/b2_delete_file_version'
 _DOWNLOAD_RELATIVE_URL = f'{_API_PREFIX}/b2_download_file_by_id'
 _FILE_INFO_RELATIVE_URL = f'{_API_PREFIX}/b2_get_file_info'
+_DOWNLOAD_BY_NAME_RELATIVE_URL = 'file'
+_DOWNLOAD_AUTH_DURATION_SECONDS = 60 * 60
+_DOWNLOAD_AUTH_REFRESH_MARGIN_SECONDS = 5 * 60
+_DOWNLOAD_AUTH_CACHE_MAX_SIZE = 1000
+_UPLOAD_ATTEMPTS = 2
+_BROKEN_UPLOAD_URL_STATUS_CODES = {401, 408, *range(500, 600)}
 
 
 class ContentManager(object):
     """
+    Every operation runs with a cached account authorization and is retried
+    once with a fresh one if BackBlaze reports the cached token as expired.
+    Upload urls are reused across uploads through an UploadUrlPool and files
+    above the large file threshold are uploaded in parts by a LargeFileUploader.
+    Clients on unreliable connections upload in chunks through ResumableUploads.
     """
     def __init__(self, authorizer=None, requests_lib=None):
         if not authorizer:
             authorizer = Authorizer()
         self._authorizer = authorizer
         if not requests_lib:
-            import requests
-            requests_lib = requests
+            requests_lib = http_sessions.get_shared_sessions()
         self._requests = requests_lib
+        self._upload_urls = UploadUrlPool(self._authorizer)
+        self._large_files = LargeFileUploader(self._authorizer, self._requests)
+        self._resumable_uploads = ResumableUploads(self._authorizer, self._requests, self._large_files)
+        self._download_authorizations = ExpiringCache(_DOWNLOAD_AUTH_CACHE_MAX_SIZE,
+                                                      _DOWNLOAD_AUTH_DURATION_SECONDS - _DOWNLOAD_AUTH_REFRESH_MARGIN_SECONDS)
 
 
     def generate_credentials(self, user):
@@ -33,74 +57,286 @@ class ContentManager(object):
         self._authorizer.delete_user_credentials(application_key_id)
 
 
-    def get_content(self, content_id, credentials):
-        authorization = self._authorizer.authorize_api(credentials)
-        response = self._download_content(authorization, content_id)
-        return response.content
+    @property
+    def stats(self):
+        return {
+            'authorization_cache': self._authorizer.cache_stats,
+            'download_authorization_cache': self._download_authorizations.stats,
+            'upload_url_pool': self._upload_urls.stats,
+            'connections': getattr(self._requests, 'stats', {})
+        }
+
+
+    def get_content(self, content_id, credentials, byte_range=None):
+        """
+        Returns a ContentStream so the body can be forwarded while it downloads.
+
+        byte_range is a (start, stop) pair with the meaning of an HTTP byte range:
+        stop is exclusive or None for the rest of the content, and a negative start
+        without stop asks for the last -start bytes. BackBlaze then only sends
+        those bytes and the stream's content_range says which ones they are
+        """
+        response = self._with_authorization(credentials,
+                                            lambda authorization: self._download_content(authorization, content_id, byte_range))
+        return ContentStream(response)
 
 
-    def delete_content(self, content_id, credentials):
+    def get_download_url(self, content_id, user, filename, content_name=None):
+        """
+        Returns a url the client can download the content from directly. It carries
+        a download authorization for the user's name prefix, which is cached until
+        shortly before it expires, and asks BackBlaze to serve the content as an
+        attachment named filename
+        """
+        return self._with_authorization(user.content_credentials,
+                                        lambda authorization: self._make_download_url(authorization, content_id, user, filename, content_name))
+
+
+    def delete_content(self, content_id, credentials, content_name=None):
         """
         BackBlaze requires id AND filename to delete:
         https://www.backblaze.com/b2/docs/b2_delete_file_version.html
 
-        Since FileZap doesn't know or care how a content manager stores
-        a filename, we retrieve it from the BackBlaze API
+        The filename is the content name returned by upload_content. Files
+        stored before content names were recorded don't have one, so it is
+        retrieved from the BackBlaze API
         """
-        authorization = self._authorizer.authorize_api(credentials)
-        filename = self._get_filename(authorization, content_id)
-        self._invoke_api_delete(authorization, content_id, filename)
+        self._with_authorization(credentials, lambda authorization: self._delete_content(authorization, content_id, content_name))
 
 
     def upload_content(self, file, user):
-        api_authorization = self._authorizer.authorize_api(user.content_credentials)
-        upload_authorization = self._authorizer.authorize_upload(api_authorization)
-        content_id = self._upload_file(upload_authorization, file, user.username)
-        return content_id
+        credentials = user.content_credentials
+        file_info = self._with_authorization(credentials, lambda authorization: self._upload_file(authorization, file, user))
+        return self._make_uploaded_content(file_info)
 
 
-    def _download_content(self, authorization, content_id):
-        download_url = f'{authorization.download_url}/{_DOWNLOAD_RELATIVE_URL}'
-        response = self._invoke_api_get(download_url, authorization, content_id)
-        if response.status_code == 404:
+    def create_upload_session(self, user):
+        """
+        Lends a pooled upload url to a client uploading straight to BackBlaze.
+        The client must name the file with the returned prefix, which is the
+        only prefix the user's key may write to
+        """
+        upload_authorization = self._with_authorization(user.content_credentials,
+                                                         lambda authorization: self._upload_urls.lend(user.content_credentials, authorization))
+        return UploadSession(upload_authorization.upload_url, upload_authorization.token, f'{user.username}/')
+
+
+    def end_upload_session(self, user, upload_url, token):
+        self._upload_urls.give_back(user.content_credentials, _UploadAuthorization(upload_url, token))
+
+
+    def verify_upload(self, content_id, user):
+        """
+        Confirms that a client uploaded content_id into the user's prefix
+        and returns its details
+        """
+        response = self._with_authorization(user.content_credentials,
+                                            lambda authorization: self._get_file_info(authorization, content_id))
+        file_info = response.json() if response.status_code == 200 else {}
+        if not file_info.get('fileName', '').startswith(f'{user.username}/'):
             raise ContentNotFoundError()
+        return self._make_uploaded_content(file_info)
+
+
+    def create_resumable_upload(self, user, filename, size, content_type=None):
+        return self._with_authorization(user.content_credentials,
+                                        lambda authorization: self._resumable_uploads.create(authorization, user.username, filename, size, content_type))
+
+
+    def get_resumable_upload(self, user, upload_id):
+        return self._with_authorization(user.content_credentials,
+                                        lambda authorization: self._resumable_uploads.get(authorization, user.username, upload_id))
+
+
+    def append_to_resumable_upload(self, user, upload_id, offset, stream, length):
+        """
+        Returns the new offset. Not retried on an expired token once the chunk
+        is being sent, since the stream can't be read twice
+        """
+        authorization = self._authorizer.authorize_api(user.content_credentials)
+        return self._resumable_uploads.append(authorization, user.username, upload_id, offset, stream, length)
+
+
+    def finish_resumable_upload(self, user, upload_id):
+        """
+        Returns the filename the upload was created with and its UploadedContent
+        """
+        upload, file_info = self._with_authorization(user.content_credentials,
+                                                     lambda authorization: self._resumable_uploads.finish(authorization, user.username, upload_id))
+        return upload.filename, self._make_uploaded_content(file_info)
+
+
+    def cancel_resumable_upload(self, user, upload_id):
+        self._with_authorization(user.content_credentials,
+                                 lambda authorization: self._resumable_uploads.cancel(authorization, user.username, upload_id))
+
+
+    def cancel_expired_resumable_uploads(self):
+        """
+        Cancels the expired resumable uploads of every user with the master key
+        and returns how many were cancelled. Run it periodically, uploads of
+        users who don't come back are never cancelled otherwise
+        """
+        return self._with_authorization(self._authorizer.master_credentials, self._resumable_uploads.cancel_expired)
+
+
+    def _with_authorization(self, credentials, operation):
+        authorization = self._authorizer.authorize_api(credentials)
+        try:
+            return operation(authorization)
+        except BackBlazeAuthorizationExpiredError:
+            self._authorizer.invalidate_api_authorization(credentials)
+            return operation(self._authorizer.authorize_api(credentials))
+
+
+    def _make_download_url(self, authorization, content_id, user, filename, content_name):
+        content_name = content_name or self._get_filename(authorization, content_id)
+        download_authorization = self._get_download_authorization(authorization, user)
+        quoted_name = urllib.parse.quote(content_name)
+        query = urllib.parse.urlencode({
+            'Authorization': download_authorization,
+            'b2ContentDisposition': f"attachment; filename*=UTF-8''{urllib.parse.quote(filename, safe='')}"
+        })
+        return f'{authorization.download_url}/{_DOWNLOAD_BY_NAME_RELATIVE_URL}/{authorization.bucket_name}/{quoted_name}?{query}'
+
+
+    def _get_download_authorization(self, authorization, user):
+        download_authorization = self._download_authorizations.get(user.content_credentials)
+        if not download_authorization:
+            download_authorization = self._authorizer.authorize_download(authorization, f'{user.username}/', _DOWNLOAD_AUTH_DURATION_SECONDS)
+            self._download_authorizations.put(user.content_credentials, download_authorization)
+        return download_authorization
+
+
+    def _delete_content(self, authorization, content_id, content_name):
+        filename = content_name or self._get_filename(authorization, content_id)
+        self._invoke_api_delete(authorization, content_id, filename)
+
+
+    def _download_content(self, authorization, content_id, byte_range):
+        download_url = f'{authorization.download_url}/{_DOWNLOAD_RELATIVE_URL}'
+        headers = {'Range': _format_byte_range(byte_range)} if byte_range else None
+        response = self._invoke_api_get(download_url, authorization, content_id, stream=True, headers=headers)
+        try:
+            raise_if_authorization_expired(response)
+            if response.status_code == 404:
+                raise ContentNotFoundError()
+            if response.status_code == 416:
+                raise ContentRangeNotSatisfiableError()
+            if response.status_code not in (200, 206):
+                raise ContentDownloadFailedError(response.status_code)  # The body is an error, not the content
+        except Exception:
+            response.close()
+            raise
         return response
 
 
     def _get_filename(self, authorization, content_id):
+        return self._get_file_info(authorization, content_id).json().get('fileName')
+
+
+    def _get_file_info(self, authorization, content_id):
         file_info_url = f'{authorization.api_url}/{_FILE_INFO_RELATIVE_URL}'
         response = self._invoke_api_get(file_info_url, authorization, content_id)
-        return response.json().get('fileName')
+        raise_if_authorization_expired(response)
+        return response
 
 
-    def _upload_file(self, authorization, file, username):
-        response = self._invoke_api_post(authorization, file, username)
-        if response.status_code != 200:
-            raise ContentUploadFailedError()
-        return response.json().get('fileId')
+    def _upload_file(self, api_authorization, file, user):
+        size = self._get_file_size(file)
+        if size > self._large_files.threshold:
+            b2_filename = self._get_b2_filename(file, user.username)
+            return self._large_files.upload(api_authorization, file, b2_filename, file.mimetype)
+        return self._upload_small_file(api_authorization, file, size, user)
 
 
-    def _invoke_api_get(self, url, authorization, content_id):
-        headers = {'Authorization': authorization.token}
+    def _upload_small_file(self, api_authorization, file, size, user):
+        """
+        BackBlaze expects uploaders to get a new upload url and try again when
+        an upload url is busy, expired or its pod went down
+        https://www.backblaze.com/b2/docs/integration_checklist.html
+        """
+        for attempt in range(_UPLOAD_ATTEMPTS):
+            file.seek(0)  # Before checkout, a read once file can't rewind and would leak the url
+            upload_authorization = self._upload_urls.checkout(user.content_credentials, api_authorization)
+            try:
+                response = self._invoke_api_post(upload_authorization, file, size, user.username)
+            except IOError:
+                self._upload_urls.discard(user.content_credentials, upload_authorization)
+                continue
+            except Exception:
+                # e.g. a remote file failing while it is read, the url would be checked out for good
+                self._upload_urls.discard(user.content_credentials, upload_authorization)
+                raise
+            if response.status_code in _BROKEN_UPLOAD_URL_STATUS_CODES:
+                self._upload_urls.discard(user.content_credentials, upload_authorization)
+                continue
+            self._upload_urls.checkin(user.content_credentials, upload_authorization)
+            if response.status_code != 200:
+                raise ContentUploadFailedError()
+            return response.json()
+        raise ContentUploadFailedError()
+
+
+    def _make_uploaded_content(self, file_info):
+        sha1 = file_info.get('contentSha1')
+        return UploadedContent(file_info.get('fileId'),
+                               file_info.get('fileName'),
+                               file_info.get('contentLength'),
+                               sha1 if sha1 != 'none' else None,  # Large files have no whole file SHA1
+                               file_info.get('contentType'))
+
+
+    def _get_file_size(self, file):
+        """
+        The size of an uploaded part is whatever the client claims, so it is
+        read from the spooled file instead. Only read once files, which can't
+        seek and fail when their content is shorter or longer, give their size
+        """
+        try:
+            file.seek(0, io.SEEK_END)
+        except io.UnsupportedOperation:
+            return file.content_length
+        size = file.tell()
+        file.seek(0)
+        return size
+
+
+    def _get_b2_filename(self, file, username):
+        encoded_filename = urllib.parse.quote_plus(file.filename)
+        return f'{username}/{encoded_filename}'
+
+
+    def _invoke_api_get(self, url, authorization, content_id, stream=False, headers=None):
+        headers = {'Authorization': authorization.token, **(headers or {})}
         params = {'fileId': content_id}
-        return self._requests.get(url, headers=headers, params=params)
+        return self._requests.get(url, headers=headers, params=params, stream=stream)
 
 
     def _invoke_api_delete(self, authorization, content_id, filename):
         delete_url = f'{authorization.api_url}/{_DELETE_RELATIVE_URL}'
         headers = {'Authorization': authorization.token}
         json = {'fileId': content_id, 'fileName': filename}
-        self._requests.post(delete_url, headers=headers, json=json)
+        response = self._requests.post(delete_url, headers=headers, json=json)
+        raise_if_authorization_expired(response)
 
 
-    def _invoke_api_post(self, authorization, file, username):
-        file_content = file.read()
-        encoded_filename = urllib.parse.quote_plus(file.filename)
+    def _invoke_api_post(self, authorization, file, size, username):
         headers = {
             'Authorization': authorization.token,
-            'X-Bz-File-Name': f'{username}/{encoded_filename}',
+            'X-Bz-File-Name': self._get_b2_filename(file, username),
             'Content-Type': file.mimetype,
-            'Content-Length': str(len(file_content)),
-            'X-Bz-Content-Sha1': hashlib.sha1(file_content).hexdigest()
+            'Content-Length': str(size + SHA1_HEX_LENGTH),
+            'X-Bz-Content-Sha1': HEX_DIGITS_AT_END
         }
-        return self._requests.post(authorization.upload_url, headers=headers, data=file_content)
+        return self._requests.post(authorization.upload_url, headers=headers, data=HashingReader(file, size))
+
+
+
+def _format_byte_range(byte_range):
+    start, stop = byte_range
+    if start < 0:
+        return f'bytes={start}'
+    if stop is None:
+        return f'bytes={start}-'
+    return f'bytes={start}-{stop - 1}'
@@ -7,4 +7,11 @@ class BackBlazeAuthorizationError(ContentManagerAuthorizationError):
 
 
     def __str__(self):
-        return f'Invalid authentication string: {self.auth_string}'
\ No newline at end of file
+        return f'Invalid authentication string: {self.auth_string}'
+
+
+
+class BackBlazeAuthorizationExpiredError(BackBlazeAuthorizationError):
+
+    def __str__(self):
+        return f'Authorization expired: {self.auth_string}'
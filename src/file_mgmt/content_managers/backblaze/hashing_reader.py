@@ -0,0 +1,48 @@
+import hashlib
+
+
+_CHUNK_SIZE = 64 * 1024
+SHA1_HEX_LENGTH = 40
+HEX_DIGITS_AT_END = 'hex_digits_at_end'
+
+
+
+class HashingReader(object):
+    """
+    Upload body that hashes the file while it is being sent and appends the hex
+    SHA1 once the file is exhausted, as BackBlaze expects when X-Bz-Content-Sha1
+    is hex_digits_at_end:
+    https://www.backblaze.com/b2/docs/b2_upload_file.html
+
+    Only one chunk of the file is held in memory at a time. The length is the
+    file size plus the 40 hex digits so requests can send a Content-Length.
+    """
+    def __init__(self, file, size, chunk_size=_CHUNK_SIZE):
+        self._file = file
+        self._length = size + SHA1_HEX_LENGTH
+        self._chunk_size = chunk_size
+        self._sha1 = hashlib.sha1()
+        self._digest = None
+
+
+    def __len__(self):
+        return self._length
+
+
+    def __iter__(self):
+        chunk = self.read(self._chunk_size)
+        while chunk:
+            yield chunk
+            chunk = self.read(self._chunk_size)
+
+
+    def read(self, size=-1):
+        if self._digest is None:
+            chunk = self._file.read(size if size and size > 0 else self._chunk_size)
+            if chunk:
+                self._sha1.update(chunk)
+                return chunk
+            self._digest = self._sha1.hexdigest().encode()
+        end = size if size and size > 0 else len(self._digest)
+        digest_part, self._digest = self._digest[:end], self._digest[end:]
+        return digest_part
@@ -0,0 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import hashlib
+import os
+import threading
+
+from .authorization import _ENV_BUCKET_ID, raise_if_authorization_expired
+from ..exceptions import ContentUploadFailedError
+
+
+_API_PREFIX = 'b2api/v2'
+_START_RELATIVE_URL = f'{_API_PREFIX}/b2_start_large_file'
+_FINISH_RELATIVE_URL = f'{_API_PREFIX}/b2_finish_large_file'
+_CANCEL_RELATIVE_URL = f'{_API_PREFIX}/b2_cancel_large_file'
+
+_ENV_THRESHOLD = 'BACKBLAZE_LARGE_FILE_THRESHOLD'
+_ENV_PART_SIZE = 'BACKBLAZE_LARGE_FILE_PART_SIZE'
+_ENV_CONCURRENCY = 'BACKBLAZE_LARGE_FILE_CONCURRENCY'
+_DEFAULT_THRESHOLD = 50 * 1000 * 1000
+_DEFAULT_PART_SIZE = 10 * 1000 * 1000
+_DEFAULT_CONCURRENCY = 4
+_MINIMUM_PART_SIZE = 5 * 1000 * 1000
+_PART_ATTEMPTS = 3
+
+
+
+
+class LargeFileUploader(object):
+    """
+    Uploads files through the BackBlaze large file API:
+    https://www.backblaze.com/b2/docs/large_files.html
+
+    Parts are read one at a time and uploaded concurrently by a bounded thread
+    pool, so at most `concurrency` parts are held in memory. Each part is hashed
+    on its own and retried individually with a fresh part url if it fails.
+    """
+    def __init__(self, authorizer, requests_lib, threshold=None, part_size=None, concurrency=None):
+        self._authorizer = authorizer
+        self._requests = requests_lib
+        self.threshold = threshold or int(os.environ.get(_ENV_THRESHOLD, _DEFAULT_THRESHOLD))
+        self.part_size = max(part_size or int(os.environ.get(_ENV_PART_SIZE, _DEFAULT_PART_SIZE)), _MINIMUM_PART_SIZE)
+        self.concurrency = concurrency or int(os.environ.get(_ENV_CONCURRENCY, _DEFAULT_CONCURRENCY))
+
+
+    def upload(self, api_authorization, file, b2_filename, content_type):
+        """
+        Returns the file info BackBlaze answers b2_finish_large_file with
+        """
+        file_id = self.start_large_file(api_authorization, b2_filename, content_type)
+        try:
+            part_hashes = self._upload_parts(api_authorization, file, file_id)
+            return self.finish_large_file(api_authorization, file_id, part_hashes)
+        except Exception:
+            self.cancel_large_file(api_authorization, file_id)
+            raise
+
+
+    def start_large_file(self, api_authorization, b2_filename, content_type, file_info=None):
+        """
+        Returns the id of the new unfinished large file, file_info is stored with it
+        """
+        json = {
+            'bucketId': os.environ.get(_ENV_BUCKET_ID),
+            'fileName': b2_filename,
+            'contentType': content_type or 'b2/x-auto'
+        }
+        if file_info:
+            json['fileInfo'] = file_info
+        response = self._invoke_api_post(api_authorization, _START_RELATIVE_URL, json)
+        return response.json().get('fileId')
+
+
+    def finish_large_file(self, api_authorization, file_id, part_hashes):
+        json = {'fileId': file_id, 'partSha1Array': part_hashes}
+        return self._invoke_api_post(api_authorization, _FINISH_RELATIVE_URL, json).json()
+
+
+    def cancel_large_file(self, api_authorization, file_id):
+        try:
+            self._requests.post(f'{api_authorization.api_url}/{_CANCEL_RELATIVE_URL}',
+                                headers={'Authorization': api_authorization.token},
+                                json={'fileId': file_id})
+        except IOError:
+            pass  # Best effort, a failed cancel only leaves an unfinished large file behind
+
+
+    def _upload_parts(self, api_authorization, file, file_id):
+        part_urls = _PartUrls(self._authorizer, api_authorization, file_id)
+        part_hashes = {}
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            part_number = 1
+            part = file.read(self.part_size)
+            while part:
+                if len(pending) >= self.concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect_part_hashes(done, part_hashes)
+                pending.add(executor.submit(self._upload_part, part_urls, part_number, part))
+                part_number += 1
+                part = file.read(self.part_size)
+            done, pending = wait(pending)
+            self._collect_part_hashes(done, part_hashes)
+        return [part_hashes[part_number] for part_number in sorted(part_hashes)]
+
+
+    def _collect_part_hashes(self, futures, part_hashes):
+        for future in futures:
+            part_number, part_hash = future.result()
+            part_hashes[part_number] = part_hash
+
+
+    def _upload_part(self, part_urls, part_number, part):
+        part_hash = hashlib.sha1(part).hexdigest()
+        for attempt in range(_PART_ATTEMPTS):
+            part_authorization = part_urls.checkout()
+            headers = {
+                'Authorization': part_authorization.token,
+                'X-Bz-Part-Number': str(part_number),
+                'Content-Length': str(len(part)),
+                'X-Bz-Content-Sha1': part_hash
+            }
+            try:
+                response = self._requests.post(part_authorization.upload_url, headers=headers, data=part)
+            except IOError:
+                continue
+            if response.status_code == 200:
+                part_urls.checkin(part_authorization)
+                return part_number, part_hash
+        raise ContentUploadFailedError()
+
+
+    def _invoke_api_post(self, api_authorization, relative_url, json):
+        url = f'{api_authorization.api_url}/{relative_url}'
+        response = self._requests.post(url, headers={'Authorization': api_authorization.token}, json=json)
+        raise_if_authorization_expired(response)
+        if response.status_code != 200:
+            raise ContentUploadFailedError()
+        return response
+
+
+
+
+class _PartUrls(object):
+    """
+    Part urls of one large file, each used by one part upload at a time.
+    Failed urls are simply not checked back in.
+    """
+    def __init__(self, authorizer, api_authorization, file_id):
+        self._authorizer = authorizer
+        self._api_authorization = api_authorization
+        self._file_id = file_id
+        self._idle = []
+        self._lock = threading.Lock()
+
+
+    def checkout(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._authorizer.authorize_upload_part(self._api_authorization, self._file_id)
+
+
+    def checkin(self, part_authorization):
+        with self._lock:
+            self._idle.append(part_authorization)
@@ -0,0 +1,209 @@
+import os
+import time
+import urllib
+
+from .authorization import _ENV_BUCKET_ID, raise_if_authorization_expired
+from .hashing_reader import HashingReader, HEX_DIGITS_AT_END, SHA1_HEX_LENGTH
+from ..exceptions import ContentNotFoundError, ContentUploadFailedError, InvalidUploadError, UploadOffsetConflictError
+from ..model import ResumableUpload
+
+
+_API_PREFIX = 'b2api/v2'
+_LIST_UNFINISHED_RELATIVE_URL = f'{_API_PREFIX}/b2_list_unfinished_large_files'
+_LIST_PARTS_RELATIVE_URL = f'{_API_PREFIX}/b2_list_parts'
+
+_ENV_EXPIRY_SECONDS = 'BACKBLAZE_RESUMABLE_UPLOAD_EXPIRY_SECONDS'
+_DEFAULT_EXPIRY_SECONDS = 24 * 60 * 60
+_UPLOAD_LENGTH_INFO_KEY = 'upload_length'
+_MAX_LISTED_UPLOADS = 100
+_MAX_LISTED_PARTS = 1000
+
+
+
+
+class ResumableUploads(object):
+    """
+    Uploads sent in chunks over several requests, so a client that loses its
+    connection only resends the chunk it was sending.
+
+    An upload is an unfinished BackBlaze large file. Its file id is the upload
+    id, the declared size is kept in its fileInfo and its offset is the size of
+    the parts uploaded so far, so no upload state lives in the app and uploads
+    survive restarts of any worker. Every chunk is one part of part_size bytes,
+    only the last one may be shorter, and is streamed straight through to
+    BackBlaze. Uploads not finished within the expiry are cancelled when they
+    are used, when their owner creates another upload and by cancel_expired,
+    which has to run periodically so uploads of users who never come back
+    are cancelled too.
+
+    Clock is used for testing only and should not be passed in production code.
+    """
+    def __init__(self, authorizer, requests_lib, large_files, expiry_seconds=None, clock=None):
+        self._authorizer = authorizer
+        self._requests = requests_lib
+        self._large_files = large_files
+        self.part_size = large_files.part_size
+        self.expiry_seconds = expiry_seconds or int(os.environ.get(_ENV_EXPIRY_SECONDS, _DEFAULT_EXPIRY_SECONDS))
+        self._clock = clock or time.time
+
+
+    def create(self, api_authorization, username, filename, size, content_type):
+        """
+        BackBlaze needs at least two parts to finish a large file, smaller
+        files are uploaded in one request instead
+        """
+        if size <= self.part_size:
+            raise InvalidUploadError(f'Resumable uploads must be larger than {self.part_size} bytes')
+        self.cancel_expired(api_authorization, f'{username}/')
+        b2_filename = f'{username}/{urllib.parse.quote_plus(filename)}'
+        upload_id = self._large_files.start_large_file(api_authorization, b2_filename, content_type,
+                                                       {_UPLOAD_LENGTH_INFO_KEY: str(size)})
+        return ResumableUpload(upload_id, filename, size, 0, self.part_size)
+
+
+    def get(self, api_authorization, username, upload_id):
+        upload, part_hashes = self._get_upload(api_authorization, username, upload_id)
+        return upload
+
+
+    def append(self, api_authorization, username, upload_id, offset, stream, length):
+        """
+        Uploads the chunk at offset as the next part and returns the new offset.
+        A chunk that fails is not recorded, the client resends it from the same offset
+        """
+        upload, part_hashes = self._get_upload(api_authorization, username, upload_id)
+        if offset != upload.offset:
+            raise UploadOffsetConflictError(upload.offset)
+        if length != min(self.part_size, upload.size - offset):
+            raise InvalidUploadError(f'Chunks must be {self.part_size} bytes, except the last one')
+        self._upload_part(api_authorization, upload_id, offset // self.part_size + 1, stream, length)
+        return offset + length
+
+
+    def finish(self, api_authorization, username, upload_id):
+        """
+        Returns the upload and the file info BackBlaze answers b2_finish_large_file with
+        """
+        upload, part_hashes = self._get_upload(api_authorization, username, upload_id)
+        if upload.offset != upload.size:
+            raise UploadOffsetConflictError(upload.offset)
+        return upload, self._large_files.finish_large_file(api_authorization, upload_id, part_hashes)
+
+
+    def cancel(self, api_authorization, username, upload_id):
+        self._get_upload(api_authorization, username, upload_id)
+        self._large_files.cancel_large_file(api_authorization, upload_id)
+
+
+    def cancel_expired(self, api_authorization, name_prefix=''):
+        """
+        Cancels every expired upload whose name starts with name_prefix, all of
+        them by default, which needs an authorization for the whole bucket.
+        Returns how many were cancelled
+        """
+        expired_files = [unfinished_file for unfinished_file in self._list_all_unfinished_files(api_authorization, name_prefix)
+                         if self._is_expired(unfinished_file)]
+        for unfinished_file in expired_files:
+            self._large_files.cancel_large_file(api_authorization, unfinished_file.get('fileId'))
+        return len(expired_files)
+
+
+    def _get_upload(self, api_authorization, username, upload_id):
+        """
+        Listing from the upload id within the user's prefix returns the upload
+        first only if it exists and belongs to the user
+        """
+        unfinished_files = self._list_unfinished_files(api_authorization, f'{username}/', upload_id, 1).get('files', [])
+        if not unfinished_files or unfinished_files[0].get('fileId') != upload_id:
+            raise ContentNotFoundError()
+        unfinished_file = unfinished_files[0]
+        if self._is_expired(unfinished_file):
+            self._large_files.cancel_large_file(api_authorization, upload_id)
+            raise ContentNotFoundError()
+        part_hashes, offset = self._get_uploaded_parts(api_authorization, upload_id)
+        filename = urllib.parse.unquote_plus(unfinished_file.get('fileName')[len(username) + 1:])
+        size = int(unfinished_file.get('fileInfo', {}).get(_UPLOAD_LENGTH_INFO_KEY, 0))
+        return ResumableUpload(upload_id, filename, size, offset, self.part_size), part_hashes
+
+
+    def _get_uploaded_parts(self, api_authorization, upload_id):
+        """
+        Returns the hashes of the parts uploaded without a gap from the first
+        one and the number of bytes they hold
+        """
+        part_hashes = []
+        offset = 0
+        start_part_number = 1
+        while start_part_number:
+            response_json = self._invoke_api_post(api_authorization, _LIST_PARTS_RELATIVE_URL, {
+                'fileId': upload_id,
+                'startPartNumber': start_part_number,
+                'maxPartCount': _MAX_LISTED_PARTS
+            })
+            for part in response_json.get('parts', []):
+                if part.get('partNumber') != len(part_hashes) + 1:
+                    return part_hashes, offset
+                part_hashes.append(part.get('contentSha1'))
+                offset += part.get('contentLength')
+            start_part_number = response_json.get('nextPartNumber')
+        return part_hashes, offset
+
+
+    def _upload_part(self, api_authorization, upload_id, part_number, stream, length):
+        """
+        Not retried, the chunk has been read from the client by then
+        """
+        part_authorization = self._authorizer.authorize_upload_part(api_authorization, upload_id)
+        headers = {
+            'Authorization': part_authorization.token,
+            'X-Bz-Part-Number': str(part_number),
+            'Content-Length': str(length + SHA1_HEX_LENGTH),
+            'X-Bz-Content-Sha1': HEX_DIGITS_AT_END
+        }
+        try:
+            response = self._requests.post(part_authorization.upload_url, headers=headers, data=HashingReader(stream, length))
+        except IOError:
+            raise ContentUploadFailedError()
+        if response.status_code != 200:
+            raise ContentUploadFailedError()
+
+
+    def _is_expired(self, unfinished_file):
+        upload_timestamp_seconds = unfinished_file.get('uploadTimestamp', 0) / 1000
+        return self._clock() - upload_timestamp_seconds > self.expiry_seconds
+
+
+    def _list_all_unfinished_files(self, api_authorization, name_prefix):
+        """
+        Listed in full before anything is cancelled, so cancelling doesn't move the pages
+        """
+        unfinished_files = []
+        start_file_id = None
+        while True:
+            response_json = self._list_unfinished_files(api_authorization, name_prefix, start_file_id, _MAX_LISTED_UPLOADS)
+            unfinished_files.extend(response_json.get('files', []))
+            start_file_id = response_json.get('nextFileId')
+            if not start_file_id:
+                return unfinished_files
+
+
+    def _list_unfinished_files(self, api_authorization, name_prefix, start_file_id, max_file_count):
+        json = {
+            'bucketId': os.environ.get(_ENV_BUCKET_ID),
+            'namePrefix': name_prefix,
+            'maxFileCount': max_file_count
+        }
+        if start_file_id:
+            json['startFileId'] = start_file_id
+        return self._invoke_api_post(api_authorization, _LIST_UNFINISHED_RELATIVE_URL, json)
+
+
+    def _invoke_api_post(self, api_authorization, relative_url, json):
+        url = f'{api_authorization.api_url}/{relative_url}'
+        response = self._requests.post(url, headers={'Authorization': api_authorization.token}, json=json)
+        raise_if_authorization_expired(response)
+        if response.status_code in (400, 404):
+            raise ContentNotFoundError()  # BackBlaze answers 400 to malformed file ids
+        if response.status_code != 200:
+            raise ContentUploadFailedError()
+        return response.json()
@@ -0,0 +1,156 @@
+import os
+import threading
+
+from .authorization import _ENV_BUCKET_ID
+from .cache import ExpiringCache
+from ..exceptions import ContentUploadFailedError
+
+
+
+_ENV_UPLOAD_URL_POOL_SIZE = 'BACKBLAZE_UPLOAD_URL_POOL_SIZE'
+_DEFAULT_UPLOAD_URL_POOL_SIZE = 10
+_CHECKOUT_TIMEOUT_SECONDS = 60
+_ENV_UPLOAD_URL_POOL_MAX_CREDENTIALS = 'BACKBLAZE_UPLOAD_URL_POOL_MAX_CREDENTIALS'
+_DEFAULT_UPLOAD_URL_POOL_MAX_CREDENTIALS = 1000
+_IDLE_TTL_SECONDS = 23 * 60 * 60
+
+
+
+
+class UploadUrlPool(object):
+    """
+    Pool of BackBlaze upload url/token pairs. BackBlaze allows a pair to be reused
+    by one uploader at a time until it answers 401 or 5xx, so urls are checked out
+    for the duration of one upload, then checked back in or discarded if broken.
+
+    Upload tokens inherit the name prefix restriction of the application key that
+    requested them, so the pool for a bucket is further divided per credential string.
+    The pool grows on demand up to max_size urls per bucket and credential, after that
+    checkouts wait for an url to be returned.
+
+    Idle urls are kept for the max_credentials most recently used credentials
+    and dropped before BackBlaze expires them after 24 hours. Counts of checked
+    out urls are dropped as soon as they reach zero.
+
+    Lent urls are remembered per credential so only those exact url/token pairs
+    are taken back, a client can't slip its own url into the pool.
+
+    Clock is used for testing only and should not be passed in production code.
+    """
+    def __init__(self, authorizer, max_size=None, max_credentials=None, clock=None):
+        self._authorizer = authorizer
+        self._max_size = max_size or int(os.environ.get(_ENV_UPLOAD_URL_POOL_SIZE, _DEFAULT_UPLOAD_URL_POOL_SIZE))
+        max_credentials = max_credentials or int(os.environ.get(_ENV_UPLOAD_URL_POOL_MAX_CREDENTIALS,
+                                                                _DEFAULT_UPLOAD_URL_POOL_MAX_CREDENTIALS))
+        self._idle = ExpiringCache(max_credentials, _IDLE_TTL_SECONDS, clock)
+        self._lent = ExpiringCache(max_credentials * self._max_size, _IDLE_TTL_SECONDS, clock)
+        self._checked_out = {}
+        self._condition = threading.Condition()
+        self.created = 0
+        self.discarded = 0
+
+
+    @property
+    def stats(self):
+        with self._condition:
+            return {
+                'idle': sum(len(upload_urls) for key, upload_urls in self._idle.items()),
+                'checked_out': sum(self._checked_out.values()),
+                'created': self.created,
+                'discarded': self.discarded
+            }
+
+
+    def checkout(self, credentials, api_authorization):
+        key = self._get_key(credentials)
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._can_checkout(key), _CHECKOUT_TIMEOUT_SECONDS):
+                raise ContentUploadFailedError()
+            self._checked_out[key] = self._checked_out.get(key, 0) + 1
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        try:
+            upload_authorization = self._authorizer.authorize_upload(api_authorization)
+        except Exception:
+            self._release(key)
+            raise
+        with self._condition:
+            self.created += 1
+        return upload_authorization
+
+
+    def lend(self, credentials, api_authorization):
+        """
+        Hands an url to an uploader outside of this process, e.g. the mobile app.
+        It no longer counts against the pool since it may never come back.
+        """
+        key = self._get_key(credentials)
+        upload_authorization = self.checkout(credentials, api_authorization)
+        self._lent.put(self._get_lent_key(key, upload_authorization), upload_authorization)
+        self._release(key)
+        return upload_authorization
+
+
+    def give_back(self, credentials, upload_authorization):
+        """
+        Takes back an url lent for the same credentials if the pool has room
+        for it, anything else is ignored
+        """
+        key = self._get_key(credentials)
+        lent_key = self._get_lent_key(key, upload_authorization)
+        with self._condition:
+            lent = self._lent.get(lent_key)
+            if lent is None:
+                return
+            self._lent.invalidate(lent_key)
+            idle = self._get_idle(key)
+            if len(idle) + self._checked_out.get(key, 0) < self._max_size:
+                idle.append(lent)
+                self._condition.notify()
+
+
+    def checkin(self, credentials, upload_authorization):
+        key = self._get_key(credentials)
+        with self._condition:
+            self._get_idle(key).append(upload_authorization)
+        self._release(key)
+
+
+    def discard(self, credentials, upload_authorization):
+        key = self._get_key(credentials)
+        with self._condition:
+            self.discarded += 1
+        self._release(key)
+
+
+    def _can_checkout(self, key):
+        return self._idle.get(key) or self._checked_out.get(key, 0) < self._max_size
+
+
+    def _get_idle(self, key):
+        """
+        The list is not put again when urls are added, so none outlives the
+        time to live of the list it was added to
+        """
+        idle = self._idle.get(key)
+        if idle is None:
+            idle = []
+            self._idle.put(key, idle)
+        return idle
+
+
+    def _release(self, key):
+        with self._condition:
+            self._checked_out[key] -= 1
+            if not self._checked_out[key]:
+                del self._checked_out[key]
+            self._condition.notify()
+
+
+    def _get_lent_key(self, key, upload_authorization):
+        return key, upload_authorization.upload_url, upload_authorization.token
+
+
+    def _get_key(self, credentials):
+        return os.environ.get(_ENV_BUCKET_ID), credentials
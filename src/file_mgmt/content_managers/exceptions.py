@@ -5,9 +5,30 @@ class ContentManagerAuthorizationError(Exception):
     pass
 
 
+class ContentDownloadFailedError(Exception):
+    pass
+
+
 class ContentNotFoundError(Exception):
     pass
 
 
+class ContentRangeNotSatisfiableError(Exception):
+    pass
+
+
 class ContentUploadFailedError(Exception):
     pass
+
+
+class InvalidUploadError(Exception):
+    pass
+
+
+class UploadOffsetConflictError(Exception):
+    """
+    Raised when a chunk doesn't continue a resumable upload, offset is where it has to continue
+    """
+    def __init__(self, offset):
+        super(UploadOffsetConflictError, self).__init__(offset)
+        self.offset = offset
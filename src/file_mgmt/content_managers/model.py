@@ -0,0 +1,6 @@
+from collections import namedtuple
+
+
+UploadedContent = namedtuple('UploadedContent', ['content_id', 'content_name', 'size', 'sha1', 'content_type'])
+UploadSession = namedtuple('UploadSession', ['upload_url', 'token', 'content_name_prefix'])
+ResumableUpload = namedtuple('ResumableUpload', ['upload_id', 'filename', 'size', 'offset', 'part_size'])
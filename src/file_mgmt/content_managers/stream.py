@@ -0,0 +1,30 @@
+_CHUNK_SIZE = 64 * 1024
+
+
+
+class ContentStream(object):
+    """
+    Iterable over the body of a streamed requests response, yielding chunks as
+    they arrive so memory use does not depend on the size of the content.
+    The underlying connection is released once iteration finishes or close is called.
+    content_range is the Content-Range of a partial download and None otherwise.
+    """
+    def __init__(self, response, chunk_size=_CHUNK_SIZE):
+        self._response = response
+        self._chunk_size = chunk_size
+        content_length = response.headers.get('Content-Length')
+        self.content_length = int(content_length) if content_length else None
+        self.content_type = response.headers.get('Content-Type')
+        self.content_range = response.headers.get('Content-Range')
+
+
+    def __iter__(self):
+        try:
+            for chunk in self._response.iter_content(self._chunk_size):
+                yield chunk
+        finally:
+            self.close()
+
+
+    def close(self):
+        self._response.close()
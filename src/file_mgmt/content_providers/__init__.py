@@ -1 +1,3 @@
+from .direct_link.provider import DirectLinkContentProvider
 from .imgur.provider import ImgurContentProvider
+from .registry import ContentProviderRegistry, create_default_registry
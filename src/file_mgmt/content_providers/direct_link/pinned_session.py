@@ -0,0 +1,47 @@
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+
+def open_pinned_session(hostname, address):
+    """
+    A requests session that sends requests for hostname to address only.
+    Proxies from the environment are ignored, they would connect elsewhere
+    """
+    session = requests.Session()
+    session.trust_env = False
+    adapter = PinnedAddressAdapter(hostname, address)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+
+class PinnedAddressAdapter(HTTPAdapter):
+    """
+    Connects to an address that was checked beforehand instead of resolving the
+    url's host again, so the host can't be pointed at another address between
+    the check and the connection (DNS rebinding). The Host header, TLS SNI and
+    the certificate check still use the hostname
+    """
+    def __init__(self, hostname, address, **kwargs):
+        self._hostname = hostname
+        self._address = address
+        super(PinnedAddressAdapter, self).__init__(**kwargs)
+
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(PinnedAddressAdapter, self).init_poolmanager(*args, server_hostname=self._hostname,
+                                                           assert_hostname=self._hostname, **kwargs)
+
+
+    def send(self, request, **kwargs):
+        parts = urllib.parse.urlsplit(request.url)
+        if parts.hostname != self._hostname:
+            raise requests.exceptions.InvalidURL(f'Session is pinned to {self._hostname}')
+        host = f'[{self._address}]' if ':' in self._address else self._address
+        request.headers['Host'] = parts.netloc.rpartition('@')[2]
+        request.url = urllib.parse.urlunsplit(parts._replace(netloc=f'{host}:{parts.port}' if parts.port else host))
+        return super(PinnedAddressAdapter, self).send(request, **kwargs)
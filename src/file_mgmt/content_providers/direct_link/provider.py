@@ -0,0 +1,107 @@
+import ipaddress
+import os
+import socket
+import urllib.parse
+
+from ..exceptions import ContentDownloadFailedError, ContentTooLargeError
+from ..remote_file import open_remote_file
+import src.config_manager as config_manager
+
+
+_MAX_REDIRECTS = 5
+_REDIRECT_STATUS_CODES = {301, 302, 303, 307, 308}
+_DEFAULT_FILENAME = 'download'
+
+
+class DirectLinkContentProvider(object):
+    """
+    Downloads the single file an http(s) link points to. A HEAD request checks
+    the size first so oversized files are refused without downloading them,
+    then the body is streamed, see RemoteFile. Files are limited to
+    FILEZAP_MAX_FILE_SIZE bytes.
+
+    The server fetches these urls itself, so links to and redirects towards
+    private, loopback and link local addresses are refused. Redirects are
+    followed by hand to check every hop, and every request is sent to the
+    address that was checked instead of resolving the host again, see
+    PinnedAddressAdapter.
+
+    Both open_session and resolve are used for testing only
+    and should not be passed in production code
+    """
+    def __init__(self, open_session=None, max_size=None, resolve=None):
+        self._open_session = open_session or _open_pinned_session
+        self._max_size = max_size if max_size is not None else config_manager.get_config().get('FILEZAP_MAX_FILE_SIZE')
+        self._resolve = resolve or _resolve
+
+
+    def get_links(self, url):
+        return [url]
+
+
+    def download(self, link):
+        head = self._request('head', link)
+        head.close()
+        content_length = head.headers.get('Content-Length')
+        if head.status_code == 200 and content_length and self._max_size and int(content_length) > self._max_size:
+            raise ContentTooLargeError(link)
+        url = head.url if head.status_code == 200 else link
+        response = self._request('get', url, stream=True)
+        if response.status_code != 200:
+            response.close()
+            raise ContentDownloadFailedError(link)
+        return open_remote_file(response, self._get_filename(response.url), self._max_size)
+
+
+    def _request(self, method, url, **kwargs):
+        for redirect in range(_MAX_REDIRECTS + 1):
+            hostname = urllib.parse.urlsplit(url).hostname
+            session = self._open_session(hostname, self._get_checked_address(url))
+            try:
+                response = getattr(session, method)(url, allow_redirects=False, **kwargs)
+            finally:
+                # Every hop has a session of its own. A streamed response keeps its connection
+                # after this and closes it when it is closed, since the pool it came from is gone
+                session.close()
+            if response.status_code not in _REDIRECT_STATUS_CODES:
+                response.url = url
+                return response
+            response.close()
+            url = urllib.parse.urljoin(url, response.headers.get('Location', ''))
+        raise ContentDownloadFailedError(url)
+
+
+    def _get_checked_address(self, url):
+        """
+        Refuses the url if any address of its host is not public, a host could
+        otherwise alternate between a public and a private address
+        """
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ContentDownloadFailedError(url)
+        addresses = sorted(self._resolve(parts.hostname) or ())
+        if not addresses:
+            raise ContentDownloadFailedError(url)
+        for address in addresses:
+            ip = ipaddress.ip_address(address.split('%')[0])  # Drop the zone of scoped IPv6 addresses
+            if not ip.is_global or ip.is_multicast:
+                raise ContentDownloadFailedError(url)
+        return addresses[0]
+
+
+    def _get_filename(self, url):
+        path = urllib.parse.unquote(urllib.parse.urlsplit(url).path)
+        return os.path.basename(path) or _DEFAULT_FILENAME
+
+
+
+def _open_pinned_session(hostname, address):
+    from .pinned_session import open_pinned_session  # requests is slow to import on a cold start
+    return open_pinned_session(hostname, address)
+
+
+def _resolve(hostname):
+    try:
+        return {info[4][0] for info in socket.getaddrinfo(hostname, None)}
+    except socket.gaierror:
+        raise ContentDownloadFailedError(hostname)
@@ -0,0 +1,6 @@
+class ContentDownloadFailedError(Exception):
+    pass
+
+
+class ContentTooLargeError(Exception):
+    pass
@@ -1,34 +1,44 @@
-from io import BytesIO
 import os
 
+from ..exceptions import ContentDownloadFailedError
+from ..remote_file import open_remote_file
+import src.config_manager as config_manager
+import src.file_mgmt.http_sessions as http_sessions
+
 
 class ImgurContentProvider(object):
     """
-    Takes an imgur gallery url and downloads each file in it
+    Takes an imgur gallery url and downloads each file in it. Files are
+    streamed, see RemoteFile, and limited to FILEZAP_MAX_FILE_SIZE bytes
 
     Both client_class and requests_lib are used for testing only
     and should not be passed in production code
     """
-    def __init__(self, client_class=None, requests_lib=None):
+    def __init__(self, client_class=None, requests_lib=None, max_size=None):
         client_id = os.environ.get('IMGUR_CLIENT_ID')
         client_secret = os.environ.get('IMGUR_CLIENT_SECRET')
         if not client_class:
             import imgurpython
             client_class = imgurpython.ImgurClient
         self._client = client_class(client_id, client_secret)
-        self._requests = requests_lib
-        if not self._requests:
-            import requests
-            self._requests = requests
+        self._requests = requests_lib or http_sessions.get_shared_sessions()
+        self._max_size = max_size if max_size is not None else config_manager.get_config().get('FILEZAP_MAX_FILE_SIZE')
 
 
 
     def get_files(self, url):
+        for link in self.get_links(url):
+            yield self.download(link)
+
+
+    def get_links(self, url):
         album_id = url.split('/')[-1]
-        images = self._client.get_album_images(album_id)
-        for image in images:
-            r = self._requests.get(image.link)
-            file = BytesIO(r.content)
-            file.filename = image.link.split('/')[-1]
-            file.mimetype = r.headers.get('Content-Type')
-            yield file
+        return [image.link for image in self._client.get_album_images(album_id)]
+
+
+    def download(self, link):
+        r = self._requests.get(link, stream=True)
+        if r.status_code != 200:
+            r.close()
+            raise ContentDownloadFailedError(link)
+        return open_remote_file(r, link.split('/')[-1], self._max_size)
@@ -0,0 +1,50 @@
+import re
+import threading
+
+from .direct_link.provider import DirectLinkContentProvider
+from .imgur.provider import ImgurContentProvider
+
+
+_IMGUR_PATTERN = r'^https://(www\.)?imgur\.com/'
+_DIRECT_LINK_PATTERN = r'^https?://'
+
+
+class ContentProviderRegistry(object):
+    """
+    Finds the content provider for a url. Providers are registered with a url
+    pattern and a factory, patterns are tried in registration order and each
+    provider is created the first time one of its urls is seen, then reused
+    """
+    def __init__(self):
+        self._entries = []
+        self._providers = {}
+        self._lock = threading.Lock()
+
+
+    def register(self, pattern, factory):
+        self._entries.append((re.compile(pattern), factory))
+
+
+    def get_provider(self, url):
+        for pattern, factory in self._entries:
+            if pattern.match(url):
+                return self._get_or_create(pattern, factory)
+
+
+    def _get_or_create(self, pattern, factory):
+        with self._lock:
+            provider = self._providers.get(pattern)
+            if provider is None:
+                provider = self._providers[pattern] = factory()
+            return provider
+
+
+
+def create_default_registry():
+    """
+    Imgur albums first, any other http(s) link is downloaded as a single file
+    """
+    registry = ContentProviderRegistry()
+    registry.register(_IMGUR_PATTERN, ImgurContentProvider)
+    registry.register(_DIRECT_LINK_PATTERN, DirectLinkContentProvider)
+    return registry
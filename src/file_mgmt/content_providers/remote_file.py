@@ -0,0 +1,95 @@
+import io
+import shutil
+import tempfile
+
+from .exceptions import ContentDownloadFailedError, ContentTooLargeError
+
+
+_CHUNK_SIZE = 64 * 1024
+_SPOOL_MAX_MEMORY = 1024 * 1024
+
+
+def open_remote_file(response, filename, max_size=None):
+    """
+    Wraps a streamed requests response in a file object uploads can read from.
+
+    Content managers need the size before uploading, so a response without a
+    reliable Content-Length is copied into a temporary file first. That copy
+    only keeps the first megabyte in memory and spills the rest to disk.
+    """
+    remote_file = RemoteFile(response, filename, max_size)
+    if remote_file.content_length is not None:
+        return remote_file
+    spooled_file = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
+    try:
+        shutil.copyfileobj(remote_file, spooled_file, _CHUNK_SIZE)
+    except Exception:
+        spooled_file.close()
+        raise
+    finally:
+        remote_file.close()
+    spooled_file.seek(0)
+    spooled_file.filename = filename
+    spooled_file.mimetype = remote_file.mimetype
+    return spooled_file
+
+
+
+class RemoteFile(object):
+    """
+    Read once file object over the body of a streamed requests response, so
+    remote content passes through in chunks instead of being loaded whole.
+
+    The download is aborted with ContentTooLargeError as soon as the announced
+    or received size exceeds max_size, and with ContentDownloadFailedError if
+    the body ends before Content-Length bytes arrived.
+    """
+    def __init__(self, response, filename, max_size=None):
+        self._response = response
+        self._max_size = max_size
+        self._position = 0
+        self.filename = filename
+        self.mimetype = response.headers.get('Content-Type')
+        self.content_length = self._get_content_length(response)
+        if max_size and self.content_length and self.content_length > max_size:
+            self.close()
+            raise ContentTooLargeError(filename)
+
+
+    def read(self, size=-1):
+        data = self._response.raw.read(size if size is not None and size >= 0 else None, decode_content=True)
+        self._position += len(data)
+        if self._max_size and self._position > self._max_size:
+            self.close()
+            raise ContentTooLargeError(self.filename)
+        if not data and size != 0 and self.content_length and self._position < self.content_length:
+            self.close()
+            raise ContentDownloadFailedError(self.filename)
+        return data
+
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """
+        Only rewinding an unread file is supported, that is all a first upload attempt does
+        """
+        if offset == 0 and whence == io.SEEK_SET and self._position == 0:
+            return 0
+        raise io.UnsupportedOperation('RemoteFile can only be read once')
+
+
+    def tell(self):
+        return self._position
+
+
+    def close(self):
+        self._response.close()
+
+
+    def _get_content_length(self, response):
+        """
+        Content-Length counts encoded bytes, which differ from what read returns
+        when the body is compressed
+        """
+        content_length = response.headers.get('Content-Length')
+        if content_length and response.headers.get('Content-Encoding', 'identity') == 'identity':
+            return int(content_length)
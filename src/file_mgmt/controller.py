@@ -1,53 +1,229 @@
-from .model import File
+from .importer import ConcurrentImporter
+from .model import File, ImportResult
+from .zip_stream import ZipStream
 import src.file_mgmt.content_providers as content_providers
+import src.file_mgmt.datastore as datastore
+from src.jobs import JobRunner, TaskFailedError
+
+
+_IMPORT_JOB = 'import'
+_IMPORT_REUSE_SECONDS = 5 * 60
+_ZIP_PAGE_SIZE = 100
 
 
 
 class FileMgmtController(object):
 
-    def __init__(self, data_store, content_manager):
+    def __init__(self, data_store, content_manager, importer=None, job_runner=None, provider_registry=None):
         self._data_store = data_store
         self._content_manager = content_manager
+        self._provider_registry = provider_registry or content_providers.create_default_registry()
+        self._importer = importer or ConcurrentImporter()
+        self._job_runner = job_runner or JobRunner()
 
 
     def get_files(self, username):
         return self._data_store.get_files(username)
 
 
+    def get_files_page(self, username, page_size, continuation_token=None):
+        return self._data_store.get_files_page(username, page_size, continuation_token)
+
+
+    def get_file_info(self, content_id, user):
+        return self._data_store.get_file(content_id, user.username)
+
+
     def get_file(self, content_id, user):
-        file = self._data_store.get_file(content_id, user.username)
-        file.content = self._content_manager.get_content(content_id, user.content_credentials)
+        return self.load_content(self.get_file_info(content_id, user), user)
+
+
+    def load_content(self, file, user, byte_range=None):
+        """
+        Attaches the content to a file already read with get_file_info, which
+        saves reading the metadata twice when it was needed first. See the
+        content manager's get_content for byte_range
+        """
+        file.content = self._content_manager.get_content(file.content_id, user.content_credentials, byte_range)
         return file
 
 
+    def get_download_url(self, content_id, user):
+        return self.get_file_download_url(self.get_file_info(content_id, user), user)
+
+
+    def get_file_download_url(self, file, user):
+        return self._content_manager.get_download_url(file.content_id, user, file.filename, file.content_name)
+
+
+    def get_zip(self, content_ids, user):
+        """
+        Returns a ZipStream of the user's files with the given content ids, or of
+        all their files if content_ids is None. File metadata is read while the
+        archive is sent, unknown content ids are left out
+        """
+        files = self._iter_files(user) if content_ids is None else self._iter_files_by_id(content_ids, user)
+        return ZipStream(files, lambda file: self._content_manager.get_content(file.content_id, user.content_credentials))
+
+
     def delete_file(self, content_id, user):
-        self._content_manager.delete_content(content_id, user.content_credentials)
+        content_name = self._get_content_name(content_id, user)
+        self._content_manager.delete_content(content_id, user.content_credentials, content_name)
         self._data_store.remove_file(content_id, user.username)
 
 
     def save_file(self, raw_file, user):
-        content_id = self._content_manager.upload_content(raw_file, user)
-        file = File(user.username, raw_file.filename, content_id)
+        uploaded = self._content_manager.upload_content(raw_file, user)
+        file = self._make_file(raw_file.filename, uploaded, user)
         self._data_store.add_file(file)
 
 
-    def save_file_from(self, content_url, user):
+    def save_files(self, raw_files, user):
+        """
+        Uploads the files concurrently, retrying each one on its own like an
+        import, then stores the metadata of every uploaded file in batched
+        writes. Returns an ImportResult with the saved files and the raw files
+        that could not be uploaded
+        """
+        saved, failed = self._importer.run(raw_files, lambda raw_file: self._upload_file(raw_file, user))
+        self._data_store.add_files(saved)
+        return ImportResult(saved, failed)
+
+
+    def create_upload_session(self, user):
+        return self._content_manager.create_upload_session(user)
+
+
+    def end_upload_session(self, user, upload_url, token):
+        self._content_manager.end_upload_session(user, upload_url, token)
+
+
+    def complete_upload(self, content_id, filename, user):
+        uploaded = self._content_manager.verify_upload(content_id, user)
+        file = self._make_file(filename, uploaded, user)
+        self._data_store.add_file(file)
+        return file
+
+
+    def create_resumable_upload(self, filename, size, content_type, user):
+        return self._content_manager.create_resumable_upload(user, filename, size, content_type)
+
+
+    def get_resumable_upload(self, upload_id, user):
+        return self._content_manager.get_resumable_upload(user, upload_id)
+
+
+    def append_to_resumable_upload(self, upload_id, offset, stream, length, user):
+        return self._content_manager.append_to_resumable_upload(user, upload_id, offset, stream, length)
+
+
+    def finish_resumable_upload(self, upload_id, user):
+        filename, uploaded = self._content_manager.finish_resumable_upload(user, upload_id)
+        file = self._make_file(filename, uploaded, user)
+        self._data_store.add_file(file)
+        return file
+
+
+    def cancel_resumable_upload(self, upload_id, user):
+        self._content_manager.cancel_resumable_upload(user, upload_id)
+
+
+    def save_file_from(self, content_url, user, progress=None):
+        """
+        Downloads and uploads the files behind content_url concurrently, see
+        ConcurrentImporter. Returns an ImportResult with the saved files and
+        the links of the files that could not be saved
+        """
         content_provider = self._get_content_provider(content_url)
-        for file in content_provider.get_files(content_url):
-            self.save_file(file, user)
+        links = content_provider.get_links(content_url)
+        saved, failed = self._importer.run(links, lambda link: self._import_file(content_provider, link, user), progress)
+        self._data_store.add_files(saved)
+        return ImportResult(saved, failed)
+
+
+    def start_import(self, content_url, user):
+        """
+        Runs save_file_from as a background job and returns the job. The same
+        user posting the same url again gets the running job back, or the
+        finished one if it succeeded in the last few minutes, so client retries
+        don't import an album twice
+        """
+        self._get_content_provider(content_url)  # Unsupported urls fail right away instead of in the job
+        return self._job_runner.submit(_IMPORT_JOB, self._run_import, content_url, user,
+                                       key=f'{_IMPORT_JOB}:{user.username}:{content_url}',
+                                       owner=user.username,
+                                       reuse_seconds=_IMPORT_REUSE_SECONDS)
+
+
+    def get_job(self, job_id, user):
+        job = self._job_runner.get(job_id)
+        if job and job.owner == user.username:
+            return job
+
+
+    def _run_import(self, job, content_url, user):
+        """
+        The job fails if any file could not be imported, still listing the saved ones
+        """
+        result = self.save_file_from(content_url, user, job.progress)
+        job_result = {'saved': [file.filename for file in result.saved], 'failed': result.failed}
+        if result.failed:
+            raise ImportIncompleteError(job_result)
+        return job_result
+
+
+    def _upload_file(self, raw_file, user):
+        raw_file.seek(0)  # A retry starts over
+        uploaded = self._content_manager.upload_content(raw_file, user)
+        return self._make_file(raw_file.filename, uploaded, user)
+
+
+    def _import_file(self, content_provider, link, user):
+        raw_file = content_provider.download(link)
+        uploaded = self._content_manager.upload_content(raw_file, user)
+        return self._make_file(raw_file.filename, uploaded, user)
+
+
+    def _make_file(self, filename, uploaded, user):
+        return File(user.username, filename, uploaded.content_id,
+                    content_name=uploaded.content_name,
+                    size=uploaded.size,
+                    sha1=uploaded.sha1,
+                    content_type=uploaded.content_type)
+
+
+    def _iter_files(self, user):
+        page = self.get_files_page(user.username, _ZIP_PAGE_SIZE)
+        yield from page.files
+        while page.continuation_token:
+            page = self.get_files_page(user.username, _ZIP_PAGE_SIZE, page.continuation_token)
+            yield from page.files
+
+
+    def _iter_files_by_id(self, content_ids, user):
+        for content_id in content_ids:
+            try:
+                yield self.get_file_info(content_id, user)
+            except datastore.FileNotFoundError:
+                continue
+
+
+    def _get_content_name(self, content_id, user):
+        try:
+            return self.get_file_info(content_id, user).content_name
+        except datastore.FileNotFoundError:
+            return None
 
 
     def _get_content_provider(self, content_url):
-        content_provider = None
-        if content_url.startswith('https://imgur.com'):
-            content_provider = self._get_imgur_provider()
+        content_provider = self._provider_registry.get_provider(content_url)
         if not content_provider: raise URLNotSupportedError(content_url)
         return content_provider
 
 
-    def _get_imgur_provider(self):
-        return content_providers.ImgurContentProvider()
+class URLNotSupportedError(Exception):
+    pass
 
 
-class URLNotSupportedError(Exception):
+class ImportIncompleteError(TaskFailedError):
     pass
@@ -1,26 +1,56 @@
-from boto3.dynamodb.conditions import Attr
+import base64
+import binascii
+import json
+import time
 
 import src.file_mgmt.model as model
 
 
+OWNER_INDEX = 'owner-index'
+_BATCH_WRITE_SIZE = 25
+_BATCH_WRITE_ATTEMPTS = 6
+_BATCH_WRITE_BACKOFF_SECONDS = 0.05
 
-class FileDataStore(object):
 
-    def __init__(self, config, dynamodb=None):
+class FileDataStore(object):
+    """
+    Sleep is used for testing only and should not be passed in production code
+    """
+    def __init__(self, config, dynamodb=None, sleep=None):
         if not dynamodb:
             import boto3
             dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-        self._table = dynamodb.Table(config.get('FILE_DB_TABLE'))
+        self._dynamodb = dynamodb
+        self._table_name = config.get('FILE_DB_TABLE')
+        self._table = dynamodb.Table(self._table_name)
+        self._sleep = sleep or time.sleep
 
 
     def add_file(self, file):
         self._table.put_item(Item=file.to_dict())
 
 
+    def add_files(self, files):
+        """
+        Writes files with BatchWriteItem, 25 at a time which is the most one request
+        may hold. Items DynamoDB leaves unprocessed, e.g. when throttled, are sent
+        again with exponential backoff as AWS recommends
+        """
+        self._batch_write_all([{'PutRequest': {'Item': file.to_dict()}} for file in files])
+
+
     def remove_file(self, content_id, owner):
         self._table.delete_item(Key={'content_id': content_id, 'owner': owner})
 
 
+    def remove_files(self, files):
+        """
+        Deletes file records in batches the same way add_files writes them
+        """
+        self._batch_write_all([{'DeleteRequest': {'Key': {'content_id': file.content_id, 'owner': file.owner}}}
+                               for file in files])
+
+
     def get_file(self, content_id, owner):
         lookup_key = {'content_id': content_id, 'owner': owner}
         file_dict = self._table.get_item(Key=lookup_key).get('Item')
@@ -29,10 +59,74 @@ class FileDataStore(object):
 
 
     def get_files(self, owner):
-        response = self._table.scan(FilterExpression=Attr('owner').eq(owner))
-        return [model.File.from_dict(file_dict) for file_dict in response.get('Items')]
+        """
+        Queries the owner index so only the owner's files are read,
+        see migrations.add_owner_index for existing tables
+        """
+        files = []
+        page = self.get_files_page(owner)
+        files.extend(page.files)
+        while page.continuation_token:
+            page = self.get_files_page(owner, continuation_token=page.continuation_token)
+            files.extend(page.files)
+        return files
+
+
+    def get_files_page(self, owner, page_size=None, continuation_token=None):
+        """
+        Returns up to page_size files and an opaque token for the next page,
+        the token is None once there are no more files
+        """
+        from boto3.dynamodb.conditions import Key  # Imported on first use, boto3 is slow to import on a cold start
+        query = {'IndexName': OWNER_INDEX, 'KeyConditionExpression': Key('owner').eq(owner)}
+        if page_size:
+            query['Limit'] = page_size
+        if continuation_token:
+            query['ExclusiveStartKey'] = self._decode_continuation_token(continuation_token, owner)
+        response = self._table.query(**query)
+        files = [model.File.from_dict(file_dict) for file_dict in response.get('Items')]
+        return model.FilePage(files, self._encode_continuation_token(response.get('LastEvaluatedKey')))
+
+
+    def _batch_write_all(self, write_requests):
+        for start in range(0, len(write_requests), _BATCH_WRITE_SIZE):
+            self._batch_write(write_requests[start:start + _BATCH_WRITE_SIZE])
+
+
+    def _batch_write(self, write_requests):
+        for attempt in range(_BATCH_WRITE_ATTEMPTS):
+            if attempt:
+                self._sleep(_BATCH_WRITE_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            response = self._dynamodb.batch_write_item(RequestItems={self._table_name: write_requests})
+            write_requests = response.get('UnprocessedItems', {}).get(self._table_name)
+            if not write_requests:
+                return
+        raise UnprocessedItemsError(len(write_requests))
+
+
+    def _encode_continuation_token(self, last_evaluated_key):
+        if last_evaluated_key:
+            return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+
+    def _decode_continuation_token(self, continuation_token, owner):
+        try:
+            start_key = json.loads(base64.urlsafe_b64decode(continuation_token.encode()).decode())
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise InvalidContinuationTokenError()
+        if not isinstance(start_key, dict) or start_key.get('owner') != owner:
+            raise InvalidContinuationTokenError()
+        return start_key
 
 
 
 class FileNotFoundError(Exception):
     pass
+
+
+class InvalidContinuationTokenError(Exception):
+    pass
+
+
+class UnprocessedItemsError(Exception):
+    pass
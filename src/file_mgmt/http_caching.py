@@ -0,0 +1,86 @@
+"""
+Conditional and range requests for stored files. BackBlaze content never
+changes once uploaded, so the validators are computed from the file's
+metadata and a client that already has the file is answered without
+contacting BackBlaze
+"""
+from datetime import timezone
+
+from flask import Response
+
+
+CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+
+def get_etag(file):
+    """
+    The SHA1 recorded at upload if there is one, large files and files stored
+    before metadata was recorded fall back to the immutable content id
+    """
+    return file.sha1 or file.content_id
+
+
+def is_not_modified(request, file):
+    """
+    If-None-Match takes precedence over If-Modified-Since and uses the weak
+    comparison, as in RFC 7232
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(get_etag(file))
+    if request.if_modified_since:
+        return file.created_at.replace(microsecond=0) <= _to_naive_utc(request.if_modified_since)
+    return False
+
+
+def get_byte_range(request, file):
+    """
+    Returns the (start, stop) of the requested byte range in the form taken by
+    the content manager's get_content, or None to send the whole file. That is
+    also the answer to requests for several ranges, which RFC 7233 allows
+    servers to ignore, and to an If-Range that no longer matches the file
+    """
+    byte_range = request.range
+    if not byte_range or byte_range.units != 'bytes' or len(byte_range.ranges) != 1:
+        return None
+    if not _if_range_matches(request, file):
+        return None
+    return byte_range.ranges[0]
+
+
+def add_cache_headers(response, file):
+    """
+    Only successful and not modified responses are marked cacheable, an error must never be kept as the file
+    """
+    if response.status_code not in (200, 206, 304):
+        return response
+    response.set_etag(get_etag(file))
+    response.last_modified = file.created_at
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def make_not_modified_response(file):
+    return add_cache_headers(Response(status=304), file)
+
+
+
+def _if_range_matches(request, file):
+    """
+    If-Range needs a strong match, Werkzeug drops the W/ of weak etags so it is checked on the raw header
+    """
+    if_range = request.if_range
+    if if_range.etag:
+        return not request.headers.get('If-Range', '').startswith('W/') and if_range.etag == get_etag(file)
+    if if_range.date:
+        return file.created_at.replace(microsecond=0) == _to_naive_utc(if_range.date)
+    return True
+
+
+def _to_naive_utc(date):
+    """
+    created_at is naive, Werkzeug parses HTTP dates as naive or aware UTC depending on its version
+    """
+    if date.tzinfo:
+        return date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
@@ -0,0 +1,100 @@
+import os
+import threading
+import urllib.parse
+
+from src.file_mgmt.content_managers.backblaze.cache import ExpiringCache
+
+
+_ENV_POOL_SIZE = 'FILEZAP_HTTP_POOL_SIZE'
+_DEFAULT_POOL_SIZE = 10
+_ENV_MAX_HOSTS = 'FILEZAP_HTTP_MAX_HOSTS'
+_DEFAULT_MAX_HOSTS = 50
+_SESSION_TTL_SECONDS = 60 * 60
+
+_shared_sessions = None
+_shared_sessions_lock = threading.Lock()
+
+
+
+def get_shared_sessions():
+    """
+    Returns the process wide HostSessions used for all outbound traffic
+    """
+    global _shared_sessions
+    with _shared_sessions_lock:
+        if not _shared_sessions:
+            _shared_sessions = HostSessions()
+        return _shared_sessions
+
+
+
+
+class HostSessions(object):
+    """
+    Drop in replacement for the requests module that keeps one requests.Session
+    per upstream host, so connections to BackBlaze and Imgur are kept alive and
+    reused instead of paying a TCP and TLS handshake for every call.
+
+    BackBlaze hands out upload urls on many pod hosts, so sessions are kept
+    for the max_hosts most recently used hosts and at most an hour. Dropped
+    sessions are closed, which releases their connections.
+
+    Session factory and clock are used for testing only and should not be passed in production code.
+    """
+    def __init__(self, pool_size=None, session_factory=None, max_hosts=None, clock=None):
+        self._pool_size = pool_size or int(os.environ.get(_ENV_POOL_SIZE, _DEFAULT_POOL_SIZE))
+        self._session_factory = session_factory or self._make_session
+        max_hosts = max_hosts or int(os.environ.get(_ENV_MAX_HOSTS, _DEFAULT_MAX_HOSTS))
+        self._sessions = ExpiringCache(max_hosts, _SESSION_TTL_SECONDS, clock, on_evict=lambda host, session: session.close())
+        self._lock = threading.Lock()
+
+
+    @property
+    def stats(self):
+        """
+        Connections opened and requests sent per host, requests well above
+        connections means connections are being reused
+        """
+        return {host: self._get_session_stats(session) for host, session in self._sessions.items()}
+
+
+    def get(self, url, **kwargs):
+        return self._get_session(url).get(url, **kwargs)
+
+
+    def post(self, url, **kwargs):
+        return self._get_session(url).post(url, **kwargs)
+
+
+    def head(self, url, **kwargs):
+        return self._get_session(url).head(url, **kwargs)
+
+
+    def _get_session(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if not session:
+                session = self._session_factory(self._pool_size)
+                self._sessions.put(host, session)
+        return session
+
+
+    def _make_session(self, pool_size):
+        import requests
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+
+    def _get_session_stats(self, session):
+        stats = {'connections': 0, 'requests': 0}
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                stats['connections'] += pool.num_connections
+                stats['requests'] += pool.num_requests
+        return stats
@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+
+
+PENDING = 'pending'
+SAVED = 'saved'
+FAILED = 'failed'
+
+_ENV_CONCURRENCY = 'FILEZAP_IMPORT_CONCURRENCY'
+_ENV_ATTEMPTS = 'FILEZAP_IMPORT_ATTEMPTS'
+_DEFAULT_CONCURRENCY = 4
+_DEFAULT_ATTEMPTS = 3
+_RETRY_BACKOFF_SECONDS = 0.5
+
+
+class ConcurrentImporter(object):
+    """
+    Imports the files of one album or link list a few at a time. Each run gets
+    its own pool of `concurrency` threads, so one album never has more than that
+    many files downloading or uploading, and at most that many held in memory.
+    A file that fails is retried on its own, with backoff, up to `attempts` times.
+
+    Sleep is used for testing only and should not be passed in production code
+    """
+    def __init__(self, concurrency=None, attempts=None, sleep=None):
+        self.concurrency = concurrency or int(os.environ.get(_ENV_CONCURRENCY, _DEFAULT_CONCURRENCY))
+        self.attempts = attempts or int(os.environ.get(_ENV_ATTEMPTS, _DEFAULT_ATTEMPTS))
+        self._sleep = sleep or time.sleep
+        self._lock = threading.Lock()
+
+
+    def run(self, items, import_item, progress=None):
+        """
+        Calls import_item for every item and returns the results of the items
+        that succeeded and the items that failed every attempt, both in item order.
+
+        Progress, if given, is a dict kept up to date with saved and failed
+        counts and the state of each item: pending, saved or failed
+        """
+        items = list(items)
+        progress = progress if progress is not None else {}
+        progress.update({'total': len(items), 'saved': 0, 'failed': 0, 'items': {item: PENDING for item in items}})
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            outcomes = list(executor.map(lambda item: self._import_item(item, import_item, progress), items))
+        succeeded = [result for item, result, is_imported in outcomes if is_imported]
+        failed = [item for item, result, is_imported in outcomes if not is_imported]
+        return succeeded, failed
+
+
+    def _import_item(self, item, import_item, progress):
+        outcome = self._import_with_retries(item, import_item)
+        with self._lock:
+            state = SAVED if outcome[2] else FAILED
+            progress[state] += 1
+            progress['items'][item] = state
+        return outcome
+
+
+    def _import_with_retries(self, item, import_item):
+        for attempt in range(self.attempts):
+            if attempt:
+                self._sleep(_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            try:
+                return item, import_item(item), True
+            except Exception:
+                continue
+        return item, None, False
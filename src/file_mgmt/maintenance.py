@@ -0,0 +1,24 @@
+"""
+Periodic cleanup. Zappa runs these on the schedule in zappa_settings.json,
+a server running elsewhere has to run python -m src.file_mgmt.maintenance
+from cron instead.
+"""
+from src.file_mgmt.content_managers import BackBlazeContentManager
+
+
+
+def cancel_expired_uploads(event=None, context=None, content_manager=None):
+    """
+    Cancels resumable uploads that were not finished within their expiry, see
+    ResumableUploads. Zappa passes the scheduled event and the Lambda context,
+    neither is used.
+
+    :param content_manager: Only used for test mocking, do not pass in production code
+    """
+    content_manager = content_manager or BackBlazeContentManager()
+    return content_manager.cancel_expired_resumable_uploads()
+
+
+
+if __name__ == '__main__':
+    print(f'Cancelled {cancel_expired_uploads()} expired uploads')
@@ -0,0 +1,73 @@
+"""
+One off migrations for the files table. Run with: python -m src.file_mgmt.migrations
+"""
+import time
+
+import src.config_manager as config_manager
+from src.file_mgmt.datastore import OWNER_INDEX
+
+
+_POLL_INTERVAL_SECONDS = 15
+
+
+
+def add_owner_index(config, dynamodb_client=None, sleep=time.sleep):
+    """
+    Adds the owner index FileDataStore.get_files queries. DynamoDB backfills a new
+    global secondary index from the existing items, this waits until that is done.
+
+    :param dynamodb_client: Only used for test mocking, do not pass in production code
+    :param sleep: Only used for test mocking, do not pass in production code
+    """
+    if not dynamodb_client:
+        import boto3
+        dynamodb_client = boto3.client('dynamodb', region_name='us-east-1')
+    table_name = config.get('FILE_DB_TABLE')
+    table = dynamodb_client.describe_table(TableName=table_name).get('Table')
+    if not _get_index(table):
+        dynamodb_client.update_table(TableName=table_name,
+                                     AttributeDefinitions=_INDEX_ATTRIBUTE_DEFINITIONS,
+                                     GlobalSecondaryIndexUpdates=[{'Create': _make_index(table)}])
+    while _get_index_status(dynamodb_client, table_name) != 'ACTIVE':
+        sleep(_POLL_INTERVAL_SECONDS)
+
+
+def _make_index(table):
+    index = {
+        'IndexName': OWNER_INDEX,
+        'KeySchema': [
+            {'AttributeName': 'owner', 'KeyType': 'HASH'},
+            {'AttributeName': 'created_at', 'KeyType': 'RANGE'}
+        ],
+        'Projection': {'ProjectionType': 'ALL'}
+    }
+    if table.get('BillingModeSummary', {}).get('BillingMode') != 'PAY_PER_REQUEST':
+        throughput = table.get('ProvisionedThroughput')
+        index['ProvisionedThroughput'] = {
+            'ReadCapacityUnits': throughput.get('ReadCapacityUnits'),
+            'WriteCapacityUnits': throughput.get('WriteCapacityUnits')
+        }
+    return index
+
+
+def _get_index(table):
+    for index in table.get('GlobalSecondaryIndexes', []):
+        if index.get('IndexName') == OWNER_INDEX:
+            return index
+
+
+def _get_index_status(dynamodb_client, table_name):
+    table = dynamodb_client.describe_table(TableName=table_name).get('Table')
+    return _get_index(table).get('IndexStatus')
+
+
+
+_INDEX_ATTRIBUTE_DEFINITIONS = [
+    {'AttributeName': 'owner', 'AttributeType': 'S'},
+    {'AttributeName': 'created_at', 'AttributeType': 'S'}
+]
+
+
+
+if __name__ == '__main__':
+    add_owner_index(config_manager.get_config())
@@ -1,25 +1,39 @@
+from collections import namedtuple
 from datetime import datetime
 
 
 DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+_CONTENT_METADATA_KEYS = ('content_name', 'size', 'sha1', 'content_type')
 
 class File(object):
-
-    def __init__(self, owner, filename, content_id, created_at=None):
+    """
+    Content metadata (content_name, size, sha1, content_type) is recorded at upload
+    time and is None for files stored before it was introduced
+    """
+    def __init__(self, owner, filename, content_id, created_at=None,
+                 content_name=None, size=None, sha1=None, content_type=None):
         self.owner = owner
         self.filename = filename
         self.content_id = content_id
         self.created_at = created_at or self._get_current_timestamp()
+        self.content_name = content_name
+        self.size = size
+        self.sha1 = sha1
+        self.content_type = content_type
         self.content = None
 
 
     def to_dict(self):
-        return {
+        file_dict = {
             'owner': self.owner,
             'filename': self.filename,
             'created_at': self.created_at.strftime(DATE_FORMAT),
             'content_id': self.content_id
         }
+        for key in _CONTENT_METADATA_KEYS:
+            if getattr(self, key) is not None:
+                file_dict[key] = getattr(self, key)
+        return file_dict
 
 
     @classmethod
@@ -28,8 +42,19 @@ class File(object):
         filename = file_dict.get('filename')
         content_id = file_dict.get('content_id')
         created_at = datetime.strptime(file_dict.get('created_at'), DATE_FORMAT)
-        return cls(owner, filename, content_id, created_at)
+        size = file_dict.get('size')
+        return cls(owner, filename, content_id, created_at,
+                   content_name=file_dict.get('content_name'),
+                   size=int(size) if size is not None else None,  # DynamoDB returns numbers as Decimal
+                   sha1=file_dict.get('sha1'),
+                   content_type=file_dict.get('content_type'))
 
 
     def _get_current_timestamp(self):
         return datetime.now()
+
+
+
+
+FilePage = namedtuple('FilePage', ['files', 'continuation_token'])
+ImportResult = namedtuple('ImportResult', ['saved', 'failed'])
@@ -0,0 +1,100 @@
+"""
+Enforces FILEZAP_MAX_FILE_SIZE on uploads before they reach BackBlaze.
+
+Requests announcing more than the limit are answered with 413 before the body
+is read, and multipart bodies are parsed into files that count the bytes
+written to them, so a body without a Content-Length is cut off as soon as one
+of its files passes the limit. Parsed files keep at most a megabyte in memory
+and spill the rest to disk. Views marked with takes_many_files accept requests
+with up to FILEZAP_MAX_FILES_PER_REQUEST files of that size.
+"""
+import tempfile
+
+from flask import Request, abort, current_app, request
+
+
+MULTIPART_OVERHEAD = 64 * 1024
+_SPOOL_MAX_MEMORY = 1024 * 1024
+_MAX_FORM_MEMORY_SIZE = 1024 * 1024
+
+
+
+class UploadLimitedRequest(Request):
+    """
+    Form fields other than files are kept in memory and limited to a megabyte
+    """
+    max_form_memory_size = _MAX_FORM_MEMORY_SIZE
+
+
+    @property
+    def max_content_length(self):
+        return get_max_request_size(current_app.container.config, _get_max_files())
+
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        max_file_size = current_app.container.config.get('FILEZAP_MAX_FILE_SIZE')
+        if max_file_size and content_length and content_length > max_file_size:
+            abort(413)
+        return SizeLimitedSpooledFile(max_file_size)
+
+
+
+
+class SizeLimitedSpooledFile(tempfile.SpooledTemporaryFile):
+    """
+    Aborts with 413 once more than max_file_size bytes are written, a falsy
+    max_file_size means no limit
+    """
+    def __init__(self, max_file_size):
+        super(SizeLimitedSpooledFile, self).__init__(max_size=_SPOOL_MAX_MEMORY)
+        self._max_file_size = max_file_size
+        self._written = 0
+
+
+    def write(self, data):
+        self._written += len(data)
+        if self._max_file_size and self._written > self._max_file_size:
+            self.close()
+            abort(413)
+        return super(SizeLimitedSpooledFile, self).write(data)
+
+
+
+
+def takes_many_files(view):
+    """
+    Marks a view whose requests may hold up to FILEZAP_MAX_FILES_PER_REQUEST
+    files. Apply it below login_required, which copies the mark
+    """
+    view.takes_many_files = True
+    return view
+
+
+def get_max_request_size(config, max_files=1):
+    """
+    FILEZAP_MAX_REQUEST_SIZE if set, otherwise max_files files of
+    FILEZAP_MAX_FILE_SIZE with room for the multipart headers and boundaries.
+    None means no limit
+    """
+    if config.get('FILEZAP_MAX_REQUEST_SIZE'):
+        return config.get('FILEZAP_MAX_REQUEST_SIZE')
+    if config.get('FILEZAP_MAX_FILE_SIZE'):
+        return config.get('FILEZAP_MAX_FILE_SIZE') * max_files + MULTIPART_OVERHEAD
+    return None
+
+
+def reject_oversized_request():
+    """
+    Runs before every request, ahead of authentication, so an oversized upload
+    costs neither a user lookup nor reading its body
+    """
+    max_request_size = get_max_request_size(current_app.container.config, _get_max_files())
+    if max_request_size and request.content_length and request.content_length > max_request_size:
+        abort(413)
+
+
+def _get_max_files():
+    view = current_app.view_functions.get(request.endpoint)
+    if getattr(view, 'takes_many_files', False):
+        return current_app.container.config.get('FILEZAP_MAX_FILES_PER_REQUEST')
+    return 1
@@ -0,0 +1,194 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import os
+import queue
+import threading
+import zipfile
+
+
+_ENV_READ_AHEAD = 'FILEZAP_ZIP_READ_AHEAD'
+_DEFAULT_READ_AHEAD = 4
+_MAX_BUFFERED_CHUNKS = 16
+_PUT_TIMEOUT_SECONDS = 1
+_EARLIEST_ZIP_YEAR = 1980
+_OPENED = object()
+_END = object()
+
+
+
+class ZipStream(object):
+    """
+    Iterable over a ZIP archive of files, built while it is being sent so the
+    first bytes go out as soon as the first file starts downloading.
+
+    Files are stored without compression, with ZIP64 headers so entries and
+    archives above 4GB work, and their contents are fetched by background
+    threads up to read_ahead files in advance. Each of those buffers at most
+    a few content chunks, so memory use does not depend on the size or number
+    of files. Files whose content can't be opened are left out of the archive.
+
+    open_content is called with a file and returns an iterable of its content
+    chunks, e.g. a content manager's ContentStream
+    """
+    def __init__(self, files, open_content, read_ahead=None):
+        self._files = files
+        self._open_content = open_content
+        self._read_ahead = read_ahead or int(os.environ.get(_ENV_READ_AHEAD, _DEFAULT_READ_AHEAD))
+
+
+    def __iter__(self):
+        output = _ChunkWriter()
+        filenames = _UniqueFilenames()
+        executor = ThreadPoolExecutor(max_workers=self._read_ahead)
+        prefetches = deque()
+        prefetch = None
+        files = iter(self._files)
+        try:
+            with zipfile.ZipFile(output, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+                self._start_prefetches(executor, files, prefetches)
+                while prefetches:
+                    prefetch = prefetches.popleft()
+                    if prefetch.wait_until_opened():
+                        with archive.open(_make_zip_info(prefetch.file, filenames), mode='w', force_zip64=True) as entry:
+                            for chunk in prefetch.chunks():
+                                entry.write(chunk)
+                                yield from output.drain()
+                    self._start_prefetches(executor, files, prefetches)
+                    yield from output.drain()
+            yield from output.drain()
+        finally:
+            # The prefetch of the entry being written was already taken off the queue
+            for pending in ([prefetch] if prefetch else []) + list(prefetches):
+                pending.cancel()
+            executor.shutdown(wait=False)
+
+
+    def _start_prefetches(self, executor, files, prefetches):
+        while len(prefetches) < self._read_ahead:
+            file = next(files, None)
+            if file is None:
+                return
+            prefetch = _Prefetch(file, self._open_content)
+            executor.submit(prefetch.run)
+            prefetches.append(prefetch)
+
+
+
+
+class _Prefetch(object):
+    """
+    Downloads the content of one file into a bounded queue on a background thread
+    """
+    def __init__(self, file, open_content):
+        self.file = file
+        self._open_content = open_content
+        self._queue = queue.Queue(_MAX_BUFFERED_CHUNKS)
+        self._cancelled = threading.Event()
+
+
+    def run(self):
+        try:
+            content = self._open_content(self.file)
+        except Exception as e:
+            self._put(e)
+            return
+        try:
+            if self._put(_OPENED):
+                for chunk in content:
+                    if not self._put(chunk):
+                        break
+                self._put(_END)
+        except Exception as e:
+            self._put(e)
+        finally:
+            if hasattr(content, 'close'):
+                content.close()
+
+
+    def wait_until_opened(self):
+        return self._queue.get() is _OPENED
+
+
+    def chunks(self):
+        """
+        A failure after the entry was started can't be left out anymore and ends the archive
+        """
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+    def cancel(self):
+        self._cancelled.set()
+
+
+    def _put(self, item):
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=_PUT_TIMEOUT_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+
+
+class _ChunkWriter(object):
+    """
+    Unseekable file object collecting what zipfile writes until it is drained,
+    zipfile then writes sizes and checksums after each entry's data
+    """
+    def __init__(self):
+        self._chunks = []
+
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+
+    def flush(self):
+        pass
+
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+
+
+class _UniqueFilenames(object):
+    """
+    Entries are flat, files with the same name get a counter like "photo (1).jpg"
+    """
+    def __init__(self):
+        self._used = set()
+
+
+    def get(self, filename):
+        filename = (filename or 'file').replace('/', '_').replace('\\', '_')
+        name, extension = os.path.splitext(filename)
+        unique_filename = filename
+        counter = 1
+        while unique_filename in self._used:
+            unique_filename = f'{name} ({counter}){extension}'
+            counter += 1
+        self._used.add(unique_filename)
+        return unique_filename
+
+
+
+
+def _make_zip_info(file, filenames):
+    created_at = file.created_at
+    date_time = created_at.timetuple()[:6] if created_at.year >= _EARLIEST_ZIP_YEAR else (_EARLIEST_ZIP_YEAR, 1, 1, 0, 0, 0)
+    zip_info = zipfile.ZipInfo(filenames.get(file.filename), date_time)
+    zip_info.compress_type = zipfile.ZIP_STORED
+    zip_info.external_attr = 0o644 << 16
+    return zip_info
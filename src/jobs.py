@@ -0,0 +1,132 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import time
+import uuid
+
+
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+_ENV_JOB_WORKERS = 'FILEZAP_JOB_WORKERS'
+_DEFAULT_JOB_WORKERS = 4
+_MAX_FINISHED_JOBS = 1000
+
+
+class Job(object):
+    """
+    State of one background task. The task updates progress as it goes
+    and its return value becomes the result.
+    """
+    def __init__(self, name, key=None, owner=None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.key = key
+        self.owner = owner
+        self.status = PENDING
+        self.progress = {}
+        self.result = None
+        self.finished_at = None
+
+
+    @property
+    def finished(self):
+        return self.status in (SUCCEEDED, FAILED)
+
+
+    def to_dict(self):
+        job_dict = {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'progress': dict(self.progress)
+        }
+        if self.result is not None:
+            job_dict['result'] = self.result
+        return job_dict
+
+
+
+
+class JobRunner(object):
+    """
+    Runs tasks on a bounded pool of background threads and keeps their Jobs so
+    clients can poll them. Each task is called with its Job followed by the
+    submitted arguments. A task that raises fails its job, a TaskFailedError
+    also sets the job's result.
+
+    Submitting a task with the key of an unfinished job returns that job instead
+    of starting another one, as does the key of a job that succeeded less than
+    reuse_seconds ago. The executor can be anything with a concurrent.futures
+    style submit, e.g. to hand tasks to a queue, and is passed in tests.
+    """
+    def __init__(self, max_workers=None, executor=None):
+        max_workers = max_workers or int(os.environ.get(_ENV_JOB_WORKERS, _DEFAULT_JOB_WORKERS))
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self._jobs = {}
+        self._jobs_by_key = {}
+        self._finished_ids = []
+        self._lock = threading.Lock()
+
+
+    def submit(self, name, task, *args, key=None, owner=None, reuse_seconds=0):
+        with self._lock:
+            existing_job = self._jobs_by_key.get(key) if key else None
+            if existing_job and self._can_reuse(existing_job, reuse_seconds):
+                return existing_job
+            job = Job(name, key, owner)
+            self._jobs[job.id] = job
+            if key:
+                self._jobs_by_key[key] = job
+        self._executor.submit(self._run, job, task, args)
+        return job
+
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+    def _run(self, job, task, args):
+        job.status = RUNNING
+        try:
+            job.result = task(job, *args)
+            job.status = SUCCEEDED
+        except TaskFailedError as e:
+            job.result = e.result
+            job.progress['error'] = type(e).__name__
+            job.status = FAILED
+        except Exception as e:
+            job.progress['error'] = type(e).__name__
+            job.status = FAILED
+        finally:
+            self._finish(job)
+
+
+    def _can_reuse(self, job, reuse_seconds):
+        if job.finished_at is None:
+            return True
+        return job.status == SUCCEEDED and time.monotonic() - job.finished_at < reuse_seconds
+
+
+    def _finish(self, job):
+        with self._lock:
+            job.finished_at = time.monotonic()
+            self._finished_ids.append(job.id)
+            while len(self._finished_ids) > _MAX_FINISHED_JOBS:
+                forgotten_job = self._jobs.pop(self._finished_ids.pop(0), None)
+                if forgotten_job and self._jobs_by_key.get(forgotten_job.key) is forgotten_job:
+                    self._jobs_by_key.pop(forgotten_job.key)
+
+
+
+
+class TaskFailedError(Exception):
+    """
+    Raised by a task that failed but still has a result to report, e.g. what it did finish
+    """
+    def __init__(self, result):
+        super(TaskFailedError, self).__init__(result)
+        self.result = result
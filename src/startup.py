@@ -0,0 +1,106 @@
+"""
+Cold start profiling. Prints how long a fresh interpreter takes to import the
+app and build the FileZapServer, broken down by module and init phase.
+
+Run with: python -m src.startup
+"""
+from collections import namedtuple
+from contextlib import contextmanager
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+ImportTime = namedtuple('ImportTime', ['module', 'self_seconds', 'cumulative_seconds', 'depth'])
+ColdStart = namedtuple('ColdStart', ['imports', 'phases'])
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_COLD_START_SCRIPT = 'import json, main; print(json.dumps(main.main_app.startup_timer.phases))'
+_IMPORT_TIME_PREFIX = 'import time:'
+_IMPORTTIME_MIN_VERSION = (3, 7)  # Older interpreters ignore -X importtime
+
+
+class PhaseTimer(object):
+    """
+    Records how long each named phase of a startup takes, in the order they ran.
+    Clock is used for testing only and should not be passed in production code.
+    """
+    def __init__(self, clock=None):
+        self._clock = clock or time.perf_counter
+        self.phases = []
+
+
+    @contextmanager
+    def phase(self, name):
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.phases.append((name, self._clock() - start))
+
+
+    @property
+    def total_seconds(self):
+        return sum(seconds for name, seconds in self.phases)
+
+
+
+def measure_cold_start(python=sys.executable):
+    """
+    Imports main in a fresh interpreter with -X importtime, the same thing a
+    cold Lambda container does, and collects the import and init phase timings.
+    python has to be 3.7 or later, older versions don't report imports
+    """
+    result = subprocess.run([python, '-X', 'importtime', '-c', _COLD_START_SCRIPT], cwd=PROJECT_ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    phases = [tuple(phase) for phase in json.loads(result.stdout.splitlines()[-1])]
+    return ColdStart(parse_import_times(result.stderr), phases)
+
+
+def parse_import_times(importtime_output):
+    """
+    Parses the lines written by python -X importtime, each one reads
+    "import time: <self us> | <cumulative us> | <indent><module>"
+    """
+    import_times = []
+    for line in importtime_output.splitlines():
+        if not line.startswith(_IMPORT_TIME_PREFIX):
+            continue
+        self_us, cumulative_us, module = line[len(_IMPORT_TIME_PREFIX):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # Column header
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        import_times.append(ImportTime(module.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6, depth))
+    return import_times
+
+
+def get_top_level_imports(import_times):
+    """
+    Groups import time by top level package, e.g. botocore.session counts towards botocore
+    """
+    totals = {}
+    for import_time in import_times:
+        package = import_time.module.split('.')[0]
+        totals[package] = totals.get(package, 0) + import_time.self_seconds
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def format_report(cold_start, top=15):
+    total_import_seconds = sum(import_time.self_seconds for import_time in cold_start.imports)
+    lines = [f'Imports: {total_import_seconds * 1000:.1f} ms', '']
+    for package, seconds in get_top_level_imports(cold_start.imports)[:top]:
+        lines.append(f'  {seconds * 1000:8.1f} ms  {package}')
+    total_phase_seconds = sum(seconds for name, seconds in cold_start.phases)
+    lines.extend(['', f'FileZapServer init: {total_phase_seconds * 1000:.1f} ms', ''])
+    for name, seconds in cold_start.phases:
+        lines.append(f'  {seconds * 1000:8.1f} ms  {name}')
+    return '\n'.join(lines)
+
+
+
+if __name__ == '__main__':
+    if sys.version_info < _IMPORTTIME_MIN_VERSION:
+        sys.exit('Import times need python -X importtime, which was added in Python 3.7')
+    print(format_report(measure_cold_start()))
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, current_app
+from flask import Blueprint, render_template, request, redirect, jsonify, current_app
 from flask_login import login_required, logout_user, current_user
 
 import src.config_manager as config_manager
@@ -49,6 +49,8 @@ def login_post():
         return redirect('/')
     except controller.InvalidCredentialsError:
         return render_template('login.html', msg='Invalid credentials!')
+    except controller.AccountDeletionPendingError:
+        return render_template('login.html', msg='This account is being deleted.')
 
 
 @blueprint.route('/logout', methods=['GET'])
@@ -68,17 +70,27 @@ def post_delete_account():
     user_mgmt_controller = _get_controller()
     password = request.form.get('password')
     try:
-        user_mgmt_controller.delete_user(current_user, password)
+        job = user_mgmt_controller.delete_user(current_user._get_current_object(), password)  # The job outlives the request
         _do_logout()
-        return render_template('login.html', msg='Your account and all of your files have been deleted.')
+        return render_template('login.html', msg='Your account and all of your files are being deleted.',
+                               deletion_job_id=job.id)
     except controller.InvalidCredentialsError:
         return render_template('delete_account.html', msg='Invalid password')
 
 
+@blueprint.route('/deleteAccount/status', methods=['GET'])
+def get_delete_account_status():
+    """
+    Polled with the job id returned by /deleteAccount since the user is logged out by then
+    """
+    job = _get_controller().get_deletion_job(request.args.get('jobId'))
+    if not job:
+        return "Not Found", 404
+    return jsonify(job.to_dict())
+
+
 def _get_controller():
-    user_manager = current_app.user_manager
-    content_manager = current_app.content_manager
-    return controller.UserMgmtController(user_manager, content_manager)
+    return current_app.container.user_mgmt_controller
 
 
 def _do_logout():
@@ -1,5 +1,6 @@
 import os
 
+from src.jobs import JobRunner
 import src.user_mgmt.authentication as auth
 import src.user_mgmt.model as model
 
@@ -8,10 +9,11 @@ class UserMgmtController(object):
     """
     Login callback is used for testing only and should not be passed in production code
     """
-    def __init__(self, user_manager, content_manager, login_callback=None):
+    def __init__(self, user_manager, content_manager, login_callback=None, job_runner=None):
         self._user_manager = user_manager
         self._content_manager = content_manager
         self._login_callback = self._get_login_callback(login_callback)
+        self._job_runner = job_runner or JobRunner()
 
 
     def register_user(self, username, plaintext_password):
@@ -28,12 +30,37 @@ class UserMgmtController(object):
         if not user:
             raise InvalidCredentialsError()
         self._validate_user_password(user, plaintext_password)
+        if user.deletion_pending:
+            self._start_deletion(user)
+            raise AccountDeletionPendingError()
         self._do_login(user)
 
 
     def delete_user(self, user, plaintext_password):
+        """
+        Deleting thousands of files takes longer than a request may, so the
+        deletion runs as a background job which is returned for polling
+        """
         self._validate_user_password(user, plaintext_password)
-        self._user_manager.delete_user(user, self._content_manager)
+        self._user_manager.mark_for_deletion(user)
+        return self._start_deletion(user)
+
+
+    def get_deletion_job(self, job_id):
+        job = self._job_runner.get(job_id)
+        if job and job.name == DELETE_ACCOUNT_JOB:
+            return job
+
+
+    def _start_deletion(self, user):
+        """
+        Also resumes a deletion interrupted by a restart, jobs only live in memory
+        """
+        return self._job_runner.submit(DELETE_ACCOUNT_JOB, self._delete_user, user, key=f'{DELETE_ACCOUNT_JOB}:{user.username}')
+
+
+    def _delete_user(self, job, user):
+        self._user_manager.delete_user(user, self._content_manager, job.progress)
 
 
     def _get_login_callback(self, login_callback):
@@ -56,5 +83,12 @@ class UserMgmtController(object):
 
 
 
+DELETE_ACCOUNT_JOB = 'delete_account'
+
+
 class InvalidCredentialsError(Exception):
     pass
+
+
+class AccountDeletionPendingError(Exception):
+    pass
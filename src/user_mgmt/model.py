@@ -1,14 +1,20 @@
 import base64
+from concurrent.futures import ThreadPoolExecutor
+
+
+_DELETE_PAGE_SIZE = 100
+_DELETE_WORKERS = 8
 
 
 
 class User(object):
-    def __init__(self, username, password_hash, salt, content_credentials=None, revocation=None):
+    def __init__(self, username, password_hash, salt, content_credentials=None, revocation=None, deletion_pending=False):
         self.is_authenticated = False
         self.username = username
         self.password_hash = password_hash
         self.salt = salt
         self.content_credentials = content_credentials
+        self.deletion_pending = deletion_pending
 
 
     @property
@@ -26,12 +32,15 @@ class User(object):
 
 
     def to_dict(self):
-        return {
+        user_dict = {
             'username': self.username,
             'password_hash': self.password_hash,
             'salt': base64.b64encode(self.salt).decode(),
             'content_credentials': self.content_credentials
         }
+        if self.deletion_pending:
+            user_dict['deletion_pending'] = True
+        return user_dict
 
 
     @classmethod
@@ -39,7 +48,8 @@ class User(object):
         user = cls(user_dict.get('username'),
                    user_dict.get('password_hash'),
                    base64.b64decode(user_dict.get('salt')),
-                   user_dict.get('content_credentials'))
+                   user_dict.get('content_credentials'),
+                   deletion_pending=user_dict.get('deletion_pending', False))
         return user
 
 
@@ -70,11 +80,33 @@ class UserManager(object):
         self._user_data_store.add_user(user)
 
 
-    def delete_user(self, user, content_manager):
-        self._delete_user_files(user, content_manager)
+    def mark_for_deletion(self, user):
+        """
+        Records that the account is being deleted, so an interrupted deletion
+        can be resumed by calling delete_user again
+        """
+        user.deletion_pending = True
+        self._user_data_store.add_user(user)
+
+
+    def delete_user(self, user, content_manager, progress=None):
+        """
+        Deletes the user's files, then the user. Files are removed from the
+        content manager in parallel and from the data store in batches, one page
+        at a time, so a file record only disappears once its content is gone.
+        Files that fail to delete are kept and the user is not deleted, so
+        calling this again resumes where it stopped.
+
+        Progress, if given, is a dict updated with deleted and failed counts
+        """
+        progress = progress if progress is not None else {}
+        progress.update({'deleted': 0, 'failed': 0})
+        self._delete_user_files(user, content_manager, progress)
+        if progress['failed']:
+            raise AccountDeletionIncompleteError(progress['failed'])
         content_manager.revoke_credentials(user)
         self._user_data_store.delete_user(user.username)
-        self._users.pop(user.username)
+        self._users.pop(user.username, None)
 
 
     def _get_user_from_data_store(self, username):
@@ -90,11 +122,36 @@ class UserManager(object):
         self._users[user.username] = user
 
 
-    def _delete_user_files(self, user, content_manager):
-        for file in self._file_data_store.get_files(user.username):
-            content_manager.delete_content(file.content_id, user.content_credentials)
-            self._file_data_store.remove_file(file.content_id, user.username)
+    def _delete_user_files(self, user, content_manager, progress):
+        """
+        Workers share the content manager, which caches the user's authorization,
+        so all deletes run with one authorization
+        """
+        with ThreadPoolExecutor(max_workers=_DELETE_WORKERS) as executor:
+            page = self._file_data_store.get_files_page(user.username, _DELETE_PAGE_SIZE)
+            while True:
+                results = executor.map(lambda file: self._delete_content(file, user, content_manager), page.files)
+                deleted = [file for file, is_deleted in zip(page.files, results) if is_deleted]
+                self._file_data_store.remove_files(deleted)
+                progress['deleted'] += len(deleted)
+                progress['failed'] += len(page.files) - len(deleted)
+                if not page.continuation_token:
+                    break
+                page = self._file_data_store.get_files_page(user.username, _DELETE_PAGE_SIZE, page.continuation_token)
+
+
+    def _delete_content(self, file, user, content_manager):
+        try:
+            content_manager.delete_content(file.content_id, user.content_credentials, file.content_name)
+        except Exception:
+            return False
+        return True
+
 
 
 class DuplicateUserError(Exception):
     pass
+
+
+class AccountDeletionIncompleteError(Exception):
+    pass
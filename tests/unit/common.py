@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+
+import app
+from src.container import AppContainer
+import src.user_mgmt.authentication as auth
+import src.user_mgmt.model as user_model
+
+
+FILE_TABLE = 'the_file_table'
+USER_TABLE = 'the_user_table'
+_JOB_TIMEOUT_SECONDS = 5
+
+
+
+def make_app(content_manager, provider_registry=None, **config):
+    """
+    The real FileZapServer on in-memory tables, so requests go through routing,
+    login and the controllers. Background jobs run on real threads
+    """
+    server = app.FileZapServer()
+    server.testing = True
+    server.container = AppContainer({'FILE_DB_TABLE': FILE_TABLE, 'USER_DB_TABLE': USER_TABLE, **config},
+                                    DynamoDbDouble(), content_manager, provider_registry)
+    return server
+
+
+def add_user(server, username, password):
+    salt = os.urandom(16)
+    user = user_model.User(username, auth.hash_password(password, salt), salt)
+    server.container.user_manager.add_user(user, server.container.content_manager)
+    return user
+
+
+def login(client, username, password):
+    return client.post('/login', data={'username': username, 'password': password})
+
+
+def wait_for_job(server, job_id):
+    deadline = time.monotonic() + _JOB_TIMEOUT_SECONDS
+    job = server.container.job_runner.get(job_id)
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+
+
+class DynamoDbDouble(object):
+    """
+    Keeps items of the file and user tables in memory, queries only support
+    the owner index
+    """
+    def __init__(self):
+        self.tables = {FILE_TABLE: TableDouble(('content_id', 'owner')), USER_TABLE: TableDouble(('username',))}
+
+
+    def Table(self, table_name):
+        return self.tables[table_name]
+
+
+    def batch_write_item(self, RequestItems):
+        for table_name, write_requests in RequestItems.items():
+            table = self.tables[table_name]
+            for write_request in write_requests:
+                if 'PutRequest' in write_request:
+                    table.put_item(Item=write_request['PutRequest']['Item'])
+                else:
+                    table.delete_item(Key=write_request['DeleteRequest']['Key'])
+        return {}
+
+
+
+class TableDouble(object):
+
+    def __init__(self, key_names):
+        self.key_names = key_names
+        self.items = {}
+        self._lock = threading.Lock()
+
+
+    def put_item(self, Item):
+        with self._lock:
+            self.items[self._get_key(Item)] = dict(Item)
+
+
+    def get_item(self, Key):
+        with self._lock:
+            item = self.items.get(self._get_key(Key))
+        return {'Item': dict(item)} if item else {}
+
+
+    def delete_item(self, Key):
+        with self._lock:
+            self.items.pop(self._get_key(Key), None)
+
+
+    def query(self, IndexName, KeyConditionExpression, Limit=None, ExclusiveStartKey=None):
+        key, owner = KeyConditionExpression.get_expression()['values']
+        with self._lock:
+            items = [item for item in self.items.values() if item.get('owner') == owner]
+        if ExclusiveStartKey:
+            keys = [self._get_key(item) for item in items]
+            items = items[keys.index(self._get_key(ExclusiveStartKey)) + 1:]
+        if Limit and len(items) > Limit:
+            items = items[:Limit]
+            return {'Items': items, 'LastEvaluatedKey': {name: items[-1][name] for name in self.key_names}}
+        return {'Items': items}
+
+
+    def _get_key(self, item):
+        return tuple(item.get(name) for name in self.key_names)
@@ -41,4 +41,70 @@ class TestConfigManager(unittest.TestCase):
         os.environ['FILEZAP_MAX_FILE_SIZE'] = '4000000'
         config = config_manager.get_config()
         self.assertEqual(config.get('FILEZAP_MAX_FILE_SIZE'), 4000000)
-        os.environ.pop('FILEZAP_MAX_FILE_SIZE')
\ No newline at end of file
+        os.environ.pop('FILEZAP_MAX_FILE_SIZE')
+
+
+    def test_max_request_size_defaults_to_zero(self):
+        config = config_manager.get_config()
+        self.assertEqual(config.get('FILEZAP_MAX_REQUEST_SIZE'), 0)
+
+
+    def test_max_request_size_is_configured_by_environment_variable(self):
+        os.environ['FILEZAP_MAX_REQUEST_SIZE'] = '9000000'
+        config = config_manager.get_config()
+        self.assertEqual(config.get('FILEZAP_MAX_REQUEST_SIZE'), 9000000)
+        os.environ.pop('FILEZAP_MAX_REQUEST_SIZE')
+
+
+    def test_max_files_per_request_defaults_to_twenty(self):
+        config = config_manager.get_config()
+        self.assertEqual(config.get('FILEZAP_MAX_FILES_PER_REQUEST'), 20)
+
+
+    def test_max_files_per_request_is_configured_by_environment_variable(self):
+        os.environ['FILEZAP_MAX_FILES_PER_REQUEST'] = '5'
+        config = config_manager.get_config()
+        self.assertEqual(config.get('FILEZAP_MAX_FILES_PER_REQUEST'), 5)
+        os.environ.pop('FILEZAP_MAX_FILES_PER_REQUEST')
+
+
+    def test_download_mode_defaults_to_proxy(self):
+        config = config_manager.get_config()
+        self.assertEqual(config.get('FILEZAP_DOWNLOAD_MODE'), config_manager.DOWNLOAD_MODE_PROXY)
+
+
+    def test_download_mode_is_configured_by_environment_variable(self):
+        os.environ['FILEZAP_DOWNLOAD_MODE'] = 'redirect'
+        config = config_manager.get_config()
+        self.assertEqual(config.get('FILEZAP_DOWNLOAD_MODE'), config_manager.DOWNLOAD_MODE_REDIRECT)
+        os.environ.pop('FILEZAP_DOWNLOAD_MODE')
+
+
+    def test_unknown_download_mode_falls_back_to_proxy(self):
+        os.environ['FILEZAP_DOWNLOAD_MODE'] = 'teleport'
+        config = config_manager.get_config()
+        self.assertEqual(config.get('FILEZAP_DOWNLOAD_MODE'), config_manager.DOWNLOAD_MODE_PROXY)
+        os.environ.pop('FILEZAP_DOWNLOAD_MODE')
+
+
+    def test_page_size_defaults_to_fifty(self):
+        config = config_manager.get_config()
+        self.assertEqual(config.get('FILEZAP_PAGE_SIZE'), 50)
+
+
+    def test_page_size_is_configured_by_environment_variable(self):
+        os.environ['FILEZAP_PAGE_SIZE'] = '20'
+        config = config_manager.get_config()
+        self.assertEqual(config.get('FILEZAP_PAGE_SIZE'), 20)
+        os.environ.pop('FILEZAP_PAGE_SIZE')
+
+    def test_startup_mode_defaults_to_lazy(self):
+        config = config_manager.get_config()
+        self.assertEqual(config.get('FILEZAP_STARTUP_MODE'), config_manager.STARTUP_MODE_LAZY)
+
+
+    def test_startup_mode_is_configured_by_environment_variable(self):
+        os.environ['FILEZAP_STARTUP_MODE'] = config_manager.STARTUP_MODE_EAGER
+        config = config_manager.get_config()
+        self.assertEqual(config.get('FILEZAP_STARTUP_MODE'), config_manager.STARTUP_MODE_EAGER)
+        os.environ.pop('FILEZAP_STARTUP_MODE')
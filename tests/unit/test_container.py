@@ -0,0 +1,147 @@
+import threading
+import unittest
+
+import src.container as container
+
+
+class TestAppContainer(unittest.TestCase):
+
+    def setUp(self):
+        self.config = {'FILE_DB_TABLE': 'the_file_table', 'USER_DB_TABLE': 'the_user_table'}
+        self.dynamodb = DynamoDbDouble()
+        self.content_manager = object()
+        self.container = container.AppContainer(self.config, self.dynamodb, self.content_manager)
+
+
+    def test_uses_given_config(self):
+        self.assertIs(self.container.config, self.config)
+
+
+    def test_builds_file_data_store_once(self):
+        self.assertIs(self.container.file_data_store, self.container.file_data_store)
+        self.assertEqual(self.dynamodb.invoked_tables, ['the_file_table'])
+
+
+    def test_builds_user_data_store_on_configured_table(self):
+        self.container.user_data_store
+        self.assertEqual(self.dynamodb.invoked_tables, ['the_user_table'])
+
+
+    def test_user_manager_shares_data_stores(self):
+        user_manager = self.container.user_manager
+        self.assertIs(user_manager._user_data_store, self.container.user_data_store)
+        self.assertIs(user_manager._file_data_store, self.container.file_data_store)
+
+
+    def test_builds_file_mgmt_controller_once(self):
+        controller = self.container.file_mgmt_controller
+        self.assertIs(controller, self.container.file_mgmt_controller)
+        self.assertIs(controller._data_store, self.container.file_data_store)
+        self.assertIs(controller._content_manager, self.content_manager)
+
+
+    def test_builds_user_mgmt_controller_once(self):
+        controller = self.container.user_mgmt_controller
+        self.assertIs(controller, self.container.user_mgmt_controller)
+        self.assertIs(controller._user_manager, self.container.user_manager)
+        self.assertIs(controller._content_manager, self.content_manager)
+
+
+    def test_builds_nothing_until_first_use(self):
+        self.assertEqual(self.dynamodb.invoked_tables, [])
+
+
+    def test_warm_up_builds_every_table(self):
+        self.container.warm_up()
+        self.assertEqual(sorted(self.dynamodb.invoked_tables), ['the_file_table', 'the_user_table'])
+
+
+    def test_threads_share_one_data_store(self):
+        data_stores = []
+        threads = [threading.Thread(target=lambda: data_stores.append(self.container.file_data_store)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(map(id, data_stores))), 1)
+        self.assertEqual(self.dynamodb.invoked_tables, ['the_file_table'])
+
+
+
+class TestThreadLocalResource(unittest.TestCase):
+
+    def setUp(self):
+        self.created_resources = []
+        self.resource = container.ThreadLocalResource(self.make_resource)
+
+
+    def make_resource(self):
+        resource = DynamoDbDouble()
+        self.created_resources.append(resource)
+        return resource
+
+
+    def run_in_threads(self, target, count=4):
+        threads = [threading.Thread(target=target) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+    def test_builds_nothing_until_first_use(self):
+        self.resource.Table('the_file_table')
+        self.assertEqual(self.created_resources, [])
+
+
+    def test_reuses_resource_and_table_within_thread(self):
+        table = self.resource.Table('the_file_table')
+        table.put_item(Item={'a': 1})
+        table.put_item(Item={'b': 2})
+        self.assertEqual(len(self.created_resources), 1)
+        self.assertEqual(self.created_resources[0].invoked_tables, ['the_file_table'])
+
+
+    def test_builds_one_resource_per_thread(self):
+        table = self.resource.Table('the_file_table')
+        self.run_in_threads(lambda: table.put_item(Item={}))
+        self.assertEqual(len(self.created_resources), 4)
+        self.assertEqual(len(set(map(id, self.created_resources))), 4)
+
+
+    def test_forwards_other_calls_to_thread_resource(self):
+        self.resource.batch_write_item(RequestItems={})
+        self.assertEqual(self.created_resources[0].invoked_batch_writes, [{}])
+
+
+    def test_dynamodb_resources_of_threads_share_one_client(self):
+        dynamodb = container._create_dynamodb()
+        resources = []
+        self.run_in_threads(lambda: resources.append(dynamodb.get_resource()), 2)
+        self.assertIsNot(resources[0], resources[1])
+        self.assertIs(resources[0].meta.client, resources[1].meta.client)
+
+
+
+
+class DynamoDbDouble(object):
+
+    def __init__(self):
+        self.invoked_tables = []
+        self.invoked_batch_writes = []
+
+
+    def Table(self, table_name):
+        self.invoked_tables.append(table_name)
+        return TableDouble()
+
+
+    def batch_write_item(self, RequestItems):
+        self.invoked_batch_writes.append(RequestItems)
+
+
+
+class TableDouble(object):
+
+    def put_item(self, Item):
+        pass
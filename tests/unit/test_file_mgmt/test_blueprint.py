@@ -0,0 +1,487 @@
+import base64
+from io import BytesIO
+import os
+import unittest
+import zipfile
+
+import src.file_mgmt.content_managers.exceptions as content_manager_exceptions
+from src.file_mgmt.content_managers.model import ResumableUpload, UploadedContent, UploadSession
+from src.file_mgmt.content_providers import ContentProviderRegistry
+from src.file_mgmt.model import File
+import src.file_mgmt.importer as importer
+import src.jobs as jobs
+import tests.unit.common as common
+
+
+
+class TestBlueprintBase(unittest.TestCase):
+
+    def setUp(self):
+        os.environ[importer._ENV_ATTEMPTS] = '1'  # No retry backoff
+        self.content_manager = ContentManagerDouble()
+        self.content_provider = ContentProviderDouble()
+        provider_registry = ContentProviderRegistry()
+        provider_registry.register(r'^https://album\.example\.com/', lambda: self.content_provider)
+        self.app = common.make_app(self.content_manager, provider_registry)
+        self.client = self.app.test_client()
+        common.add_user(self.app, 'bob', 'bobs_password')
+        common.login(self.client, 'bob', 'bobs_password')
+        self.files_table = self.app.container.dynamodb.Table(common.FILE_TABLE)
+
+
+    def tearDown(self):
+        os.environ.pop(importer._ENV_ATTEMPTS)
+
+
+    def add_stored_file(self, filename, content):
+        content_id = f'{filename}-id'
+        self.files_table.put_item(Item=File('bob', filename, content_id, size=len(content)).to_dict())
+        self.content_manager.contents[content_id] = content
+
+
+    def get_stored_filenames(self):
+        return sorted(item['filename'] for item in self.files_table.items.values())
+
+
+
+
+class TestImportFromUrl(TestBlueprintBase):
+
+    def start_import(self, url='https://album.example.com/a'):
+        response = self.client.post('/from_url', json={'url': url})
+        return response, common.wait_for_job(self.app, response.get_json()['id'])
+
+
+    def test_imports_every_file_in_background_job(self):
+        response, job = self.start_import()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(job.status, jobs.SUCCEEDED)
+        self.assertEqual(self.get_stored_filenames(), ['first.jpg', 'second.jpg'])
+        self.assertEqual(self.content_manager.uploaded, [('bob:credentials', 'first.jpg'), ('bob:credentials', 'second.jpg')])
+
+
+    def test_job_reports_saved_files(self):
+        response, job = self.start_import()
+        status = self.client.get(response.headers['Location']).get_json()
+        self.assertEqual(status['result'], {'saved': ['first.jpg', 'second.jpg'], 'failed': []})
+
+
+    def test_job_fails_if_a_file_could_not_be_imported(self):
+        self.content_provider.links.append('https://album.example.com/missing.jpg')
+        response, job = self.start_import()
+        status = self.client.get(response.headers['Location']).get_json()
+        self.assertEqual(status['status'], jobs.FAILED)
+        self.assertEqual(status['result'], {'saved': ['first.jpg', 'second.jpg'],
+                                            'failed': ['https://album.example.com/missing.jpg']})
+        self.assertEqual(self.get_stored_filenames(), ['first.jpg', 'second.jpg'])
+
+
+    def test_rejects_unsupported_url(self):
+        response = self.client.post('/from_url', json={'url': 'ftp://example.com/a'})
+        self.assertEqual(response.status_code, 400)
+
+
+
+
+class TestSaveFiles(TestBlueprintBase):
+
+    def setUp(self):
+        super(TestSaveFiles, self).setUp()
+        self.app.container.config.update({'FILEZAP_MAX_FILE_SIZE': 10, 'FILEZAP_MAX_FILES_PER_REQUEST': 3})
+
+
+    def save_files(self, *filenames):
+        files = [(BytesIO(b'0123456789'), filename) for filename in filenames]
+        return self.client.post('/save_files', data={'file': files})
+
+
+    def test_saves_every_file(self):
+        response = self.save_files('a.jpg', 'b.jpg', 'c.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {
+            'saved': [{'filename': 'a.jpg', 'contentId': 'a.jpg-id'}, {'filename': 'b.jpg', 'contentId': 'b.jpg-id'},
+                      {'filename': 'c.jpg', 'contentId': 'c.jpg-id'}],
+            'failed': []
+        })
+        self.assertEqual(self.get_stored_filenames(), ['a.jpg', 'b.jpg', 'c.jpg'])
+        self.assertEqual({credentials for credentials, filename in self.content_manager.uploaded}, {'bob:credentials'})
+
+
+    def test_reports_files_that_failed(self):
+        self.content_manager.failing_filenames = {'b.jpg'}
+        response = self.save_files('a.jpg', 'b.jpg')
+        self.assertEqual(response.get_json()['failed'], ['b.jpg'])
+        self.assertEqual(self.get_stored_filenames(), ['a.jpg'])
+
+
+    def test_rejects_more_files_than_allowed(self):
+        response = self.save_files('a.jpg', 'b.jpg', 'c.jpg', 'd.jpg')
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.content_manager.uploaded, [])
+
+
+    def test_rejects_without_files(self):
+        self.assertEqual(self.client.post('/save_files', data={}).status_code, 400)
+
+
+
+
+class TestConditionalGet(TestBlueprintBase):
+
+    def setUp(self):
+        super(TestConditionalGet, self).setUp()
+        self.add_stored_file('a.txt', b'0123456789')
+
+
+    def test_sends_file_with_validators(self):
+        response = self.client.get('/get_file?contentId=a.txt-id')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(), b'0123456789')
+        self.assertEqual(response.headers['ETag'], '"a.txt-id"')
+        self.assertIn('Last-Modified', response.headers)
+
+
+    def test_answers_not_modified_to_matching_etag_without_downloading(self):
+        etag = self.client.get('/get_file?contentId=a.txt-id').headers['ETag']
+        self.content_manager.downloaded_credentials.clear()
+        response = self.client.get('/get_file?contentId=a.txt-id', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(self.content_manager.downloaded_credentials, set())
+
+
+    def test_answers_not_modified_since_last_modified(self):
+        last_modified = self.client.get('/get_file?contentId=a.txt-id').headers['Last-Modified']
+        response = self.client.get('/get_file?contentId=a.txt-id', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+
+    def test_answers_bad_gateway_without_validators_if_download_fails(self):
+        self.content_manager.failing_download_content_ids.add('a.txt-id')
+        response = self.client.get('/get_file?contentId=a.txt-id')
+        self.assertEqual(response.status_code, 502)
+        self.assertNotIn('ETag', response.headers)
+        self.assertNotIn('Cache-Control', response.headers)
+
+
+    def test_sends_file_for_other_etag(self):
+        response = self.client.get('/get_file?contentId=a.txt-id', headers={'If-None-Match': '"other"'})
+        self.assertEqual(response.status_code, 200)
+
+
+
+
+class TestRangeGet(TestBlueprintBase):
+
+    def setUp(self):
+        super(TestRangeGet, self).setUp()
+        self.add_stored_file('a.txt', b'0123456789')
+
+
+    def test_sends_requested_range(self):
+        response = self.client.get('/get_file?contentId=a.txt-id', headers={'Range': 'bytes=2-5'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.get_data(), b'2345')
+        self.assertEqual(response.headers['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response.headers['Content-Length'], '4')
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+
+
+    def test_sends_suffix_range(self):
+        response = self.client.get('/get_file?contentId=a.txt-id', headers={'Range': 'bytes=-3'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.get_data(), b'789')
+        self.assertEqual(response.headers['Content-Range'], 'bytes 7-9/10')
+
+
+    def test_answers_range_not_satisfiable_past_end(self):
+        response = self.client.get('/get_file?contentId=a.txt-id', headers={'Range': 'bytes=20-'})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers['Content-Range'], 'bytes */10')
+
+
+    def test_resumes_while_if_range_matches(self):
+        etag = self.client.get('/get_file?contentId=a.txt-id').headers['ETag']
+        response = self.client.get('/get_file?contentId=a.txt-id', headers={'Range': 'bytes=8-', 'If-Range': etag})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.get_data(), b'89')
+
+
+    def test_sends_whole_file_if_range_no_longer_matches(self):
+        response = self.client.get('/get_file?contentId=a.txt-id', headers={'Range': 'bytes=8-',
+                                                                           'If-Range': '"old-etag"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(), b'0123456789')
+        self.assertNotIn('Content-Range', response.headers)
+
+
+
+
+class TestDownloadZip(TestBlueprintBase):
+
+    def setUp(self):
+        super(TestDownloadZip, self).setUp()
+        self.add_stored_file('a.txt', b'first file')
+        self.add_stored_file('b.txt', b'second file')
+
+
+    def download_zip(self, query):
+        response = self.client.get(f'/download_zip?{query}')
+        return response, zipfile.ZipFile(BytesIO(response.get_data()))
+
+
+    def test_streams_every_file_with_all(self):
+        response, archive = self.download_zip('all=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Disposition'], 'attachment; filename=bob-files.zip')
+        self.assertEqual(sorted(archive.namelist()), ['a.txt', 'b.txt'])
+        self.assertEqual(archive.read('b.txt'), b'second file')
+        self.assertEqual(self.content_manager.downloaded_credentials, {'bob:credentials'})
+
+
+    def test_streams_files_with_given_ids(self):
+        response, archive = self.download_zip('ids=b.txt-id,unknown-id')
+        self.assertEqual(archive.namelist(), ['b.txt'])
+
+
+    def test_leaves_out_files_that_fail_to_download(self):
+        self.content_manager.failing_download_content_ids.add('a.txt-id')
+        response, archive = self.download_zip('all=true')
+        self.assertEqual(archive.namelist(), ['b.txt'])
+
+
+    def test_rejects_request_without_files(self):
+        self.assertEqual(self.client.get('/download_zip').status_code, 400)
+
+
+
+
+class TestDirectUpload(TestBlueprintBase):
+    """
+    The mobile app authenticates every request with basic auth instead of logging in
+    """
+    def setUp(self):
+        super(TestDirectUpload, self).setUp()
+        self.client = self.app.test_client()
+        credentials = base64.b64encode(b'bob:bobs_password').decode()
+        self.headers = {'Authorization': f'Basic {credentials}'}
+
+
+    def test_hands_out_upload_url_and_name_prefix(self):
+        response = self.client.post('/upload_session', headers=self.headers)
+        self.assertEqual(response.get_json(), {'uploadUrl': 'https://upload.example.com/1', 'authorizationToken': 'upload_token',
+                                               'fileNamePrefix': 'bob/'})
+
+
+    def test_completed_upload_is_stored_and_upload_url_given_back(self):
+        upload = {'fileId': 'uploaded-id', 'filename': 'photo.jpg',
+                  'uploadUrl': 'https://upload.example.com/1', 'authorizationToken': 'upload_token'}
+        response = self.client.post('/upload_complete', json=upload, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_stored_filenames(), ['photo.jpg'])
+        self.assertEqual(self.content_manager.ended_upload_sessions,
+                         [('bob', 'https://upload.example.com/1', 'upload_token')])
+
+
+    def test_rejects_upload_missing_from_user_prefix(self):
+        response = self.client.post('/upload_complete', json={'fileId': 'unknown-id', 'filename': 'photo.jpg'},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.get_stored_filenames(), [])
+
+
+    def test_rejects_wrong_password(self):
+        credentials = base64.b64encode(b'bob:wrong_password').decode()
+        response = self.client.post('/upload_session', headers={'Authorization': f'Basic {credentials}'})
+        self.assertEqual(response.status_code, 302)
+
+
+
+
+class TestResumableUploads(TestBlueprintBase):
+
+    def create_upload(self, size=10):
+        return self.client.post('/uploads', json={'filename': 'video.mp4', 'size': size, 'contentType': 'video/mp4'})
+
+
+    def append(self, chunk, offset):
+        return self.client.patch('/uploads/an-upload-id', data=chunk, headers={'Upload-Offset': str(offset)})
+
+
+    def test_uploads_file_in_chunks(self):
+        response = self.create_upload()
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.headers['Location'].endswith('/uploads/an-upload-id'))
+        self.assertEqual(response.get_json()['partSize'], 4)
+        for offset in (0, 4, 8):
+            self.assertEqual(self.append(b'0123456789'[offset:offset + 4], offset).status_code, 204)
+        response = self.client.post('/uploads/an-upload-id/finish')
+        self.assertEqual(response.get_json(), {'contentId': 'video.mp4-id'})
+        self.assertEqual(self.get_stored_filenames(), ['video.mp4'])
+        self.assertEqual(self.content_manager.contents['video.mp4-id'], b'0123456789')
+
+
+    def test_head_reports_offset_to_resume_from(self):
+        self.create_upload()
+        self.append(b'0123', 0)
+        response = self.client.head('/uploads/an-upload-id')
+        self.assertEqual(response.headers['Upload-Offset'], '4')
+        self.assertEqual(response.headers['Upload-Length'], '10')
+
+
+    def test_chunk_at_wrong_offset_conflicts_with_current_offset(self):
+        self.create_upload()
+        response = self.append(b'4567', 4)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.headers['Upload-Offset'], '0')
+
+
+    def test_finishing_incomplete_upload_conflicts(self):
+        self.create_upload()
+        self.append(b'0123', 0)
+        response = self.client.post('/uploads/an-upload-id/finish')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.get_stored_filenames(), [])
+
+
+    def test_cancels_upload(self):
+        self.create_upload()
+        self.assertEqual(self.client.delete('/uploads/an-upload-id').status_code, 204)
+        self.assertEqual(self.client.get('/uploads/an-upload-id').status_code, 404)
+
+
+    def test_rejects_upload_over_max_file_size(self):
+        self.app.container.config['FILEZAP_MAX_FILE_SIZE'] = 9
+        self.assertEqual(self.create_upload().status_code, 413)
+
+
+    def test_requires_login(self):
+        self.client.get('/logout')
+        self.assertEqual(self.create_upload().status_code, 302)
+
+
+
+
+class ContentManagerDouble(object):
+
+    def __init__(self):
+        self.uploaded = []
+        self.failing_filenames = set()
+        self.contents = {}
+        self.downloaded_credentials = set()
+        self.failing_download_content_ids = set()
+        self.resumable_uploads = {}
+        self.ended_upload_sessions = []
+
+
+    def generate_credentials(self, user):
+        user.content_credentials = f'{user.username}:credentials'
+
+
+    def upload_content(self, raw_file, user):
+        if raw_file.filename in self.failing_filenames:
+            raise IOError()
+        content = raw_file.read()
+        self.uploaded.append((user.content_credentials, raw_file.filename))
+        return UploadedContent(f'{raw_file.filename}-id', f'{user.username}/{raw_file.filename}', len(content), 'a-sha1',
+                               'image/jpeg')
+
+
+    def create_upload_session(self, user):
+        return UploadSession('https://upload.example.com/1', 'upload_token', f'{user.username}/')
+
+
+    def end_upload_session(self, user, upload_url, token):
+        self.ended_upload_sessions.append((user.username, upload_url, token))
+
+
+    def verify_upload(self, content_id, user):
+        if content_id != 'uploaded-id':
+            raise content_manager_exceptions.ContentNotFoundError()
+        return UploadedContent(content_id, f'{user.username}/photo.jpg', 10, 'a-sha1', 'image/jpeg')
+
+
+    def create_resumable_upload(self, user, filename, size, content_type=None):
+        self.resumable_uploads['an-upload-id'] = (filename, size, b'')
+        return ResumableUpload('an-upload-id', filename, size, 0, 4)
+
+
+    def get_resumable_upload(self, user, upload_id):
+        if upload_id not in self.resumable_uploads:
+            raise content_manager_exceptions.ContentNotFoundError()
+        filename, size, content = self.resumable_uploads[upload_id]
+        return ResumableUpload(upload_id, filename, size, len(content), 4)
+
+
+    def append_to_resumable_upload(self, user, upload_id, offset, stream, length):
+        upload = self.get_resumable_upload(user, upload_id)
+        if offset != upload.offset:
+            raise content_manager_exceptions.UploadOffsetConflictError(upload.offset)
+        filename, size, content = self.resumable_uploads[upload_id]
+        self.resumable_uploads[upload_id] = (filename, size, content + stream.read(length))
+        return offset + length
+
+
+    def finish_resumable_upload(self, user, upload_id):
+        upload = self.get_resumable_upload(user, upload_id)
+        if upload.offset != upload.size:
+            raise content_manager_exceptions.UploadOffsetConflictError(upload.offset)
+        filename, size, content = self.resumable_uploads.pop(upload_id)
+        self.contents[f'{filename}-id'] = content
+        return filename, UploadedContent(f'{filename}-id', f'{user.username}/{filename}', size, None, 'video/mp4')
+
+
+    def cancel_resumable_upload(self, user, upload_id):
+        self.get_resumable_upload(user, upload_id)
+        self.resumable_uploads.pop(upload_id)
+
+
+    def get_content(self, content_id, credentials, byte_range=None):
+        self.downloaded_credentials.add(credentials)
+        if content_id in self.failing_download_content_ids:
+            raise content_manager_exceptions.ContentDownloadFailedError(503)
+        content = self.contents[content_id]
+        if not byte_range:
+            return ContentDouble(content)
+        start, stop = byte_range
+        start = max(len(content) + start, 0) if start < 0 else start
+        if start >= len(content):
+            raise content_manager_exceptions.ContentRangeNotSatisfiableError()
+        stop = min(stop or len(content), len(content))
+        return ContentDouble(content[start:stop], f'bytes {start}-{stop - 1}/{len(content)}')
+
+
+
+class ContentProviderDouble(object):
+
+    def __init__(self):
+        self.links = ['https://album.example.com/first.jpg', 'https://album.example.com/second.jpg']
+
+
+    def get_links(self, url):
+        return self.links
+
+
+    def download(self, link):
+        if link.endswith('missing.jpg'):
+            raise IOError()
+        return RawFileDouble(link.rsplit('/', 1)[-1], b'image bytes')
+
+
+
+class ContentDouble(list):
+
+    def __init__(self, content, content_range=None):
+        super(ContentDouble, self).__init__([content])
+        self.content_length = len(content)
+        self.content_type = 'text/plain'
+        self.content_range = content_range
+
+
+
+class RawFileDouble(BytesIO):
+
+    def __init__(self, filename, content):
+        super(RawFileDouble, self).__init__(content)
+        self.filename = filename
+        self.mimetype = 'image/jpeg'
@@ -8,8 +8,10 @@ class RequestsDouble(object):
         self.invoked_get_headers = None
         self.invoked_post_headers = None
         self.invoked_get_params = None
+        self.invoked_get_stream = None
         self.invoked_post_json = None
         self.invoked_post_data = None
+        self.post_error = None
         self._get_response_class = get_response_class or ResponseDouble
         self._post_response_class = post_response_class or ResponseDouble
 
@@ -18,6 +20,7 @@ class RequestsDouble(object):
         self.invoked_get_url = url
         self.invoked_get_headers = kwargs.get('headers')
         self.invoked_get_params = kwargs.get('params')
+        self.invoked_get_stream = kwargs.get('stream')
         return self._get_response_class(self.get_status_code)
 
 
@@ -26,10 +29,28 @@ class RequestsDouble(object):
         self.invoked_post_headers = kwargs.get('headers')
         self.invoked_post_json = kwargs.get('json')
         self.invoked_post_data = kwargs.get('data')
+        if self.post_error:
+            raise self.post_error
         return self._post_response_class(self.post_status_code)
 
 
 class ResponseDouble(object):
 
     def __init__(self, status_code):
-        self.status_code = status_code
\ No newline at end of file
+        self.status_code = status_code
+        self.headers = {}
+        self.closed = False
+
+
+    def close(self):
+        self.closed = True
+
+
+class ClockDouble(object):
+
+    def __init__(self):
+        self.now = 1000
+
+
+    def __call__(self):
+        return self.now
@@ -29,13 +29,86 @@ class TestAuthorizeApi(unittest.TestCase):
     def test_raises_exception_if_bad_status_code_received(self):
         self.requests.get_status_code = "<anything that isn't 200>"
         with self.assertRaises(exceptions.ContentManagerAuthorizationError):
-            self.authorizer.authorize_api(self.credentials)
+            self.authorizer.authorize_api('other_app_id:other_secret_key')
+
+
+    def test_returns_cached_authorization_for_same_credentials(self):
+        self.requests.invoked_get_url = None
+        authorize_response = self.authorizer.authorize_api(self.credentials)
+        self.assertIsNone(self.requests.invoked_get_url)
+        self.assertIs(authorize_response, self.authorize_response)
+        self.assertEqual(self.authorizer.cache_stats, {'hits': 1, 'misses': 1, 'size': 1})
+
+
+    def test_queries_api_again_after_invalidation(self):
+        self.requests.invoked_get_url = None
+        self.authorizer.invalidate_api_authorization(self.credentials)
+        self.authorizer.authorize_api(self.credentials)
+        self.assertEqual(self.requests.invoked_get_url, authorization._AUTH_URL)
+
+
+    def test_queries_api_again_once_cached_authorization_expires(self):
+        clock = common.ClockDouble()
+        cache = authorization.ExpiringCache(10, authorization._AUTH_CACHE_TTL_SECONDS, clock)
+        authorizer = authorization.Authorizer(self.requests, cache)
+        authorizer.authorize_api(self.credentials)
+        clock.now += authorization._AUTH_CACHE_TTL_SECONDS
+        self.requests.invoked_get_url = None
+        authorizer.authorize_api(self.credentials)
+        self.assertEqual(self.requests.invoked_get_url, authorization._AUTH_URL)
 
 
     def test_returns_response_data_on_success(self):
         self.assertEqual(self.authorize_response.download_url, 'https://f002.example.com')
         self.assertEqual(self.authorize_response.token, 'a-token')
         self.assertEqual(self.authorize_response.api_url, 'https://api002.example.com')
+        self.assertEqual(self.authorize_response.bucket_name, 'filezap-server')
+
+
+
+class TestAuthorizeDownload(unittest.TestCase):
+
+    def setUp(self):
+        os.environ[authorization._ENV_BUCKET_ID] = 'bucket_id'
+        self.requests = common.RequestsDouble(AuthorizeApiResponseDouble, AuthorizeDownloadResponseDouble)
+        self.authorizer = authorization.Authorizer(self.requests)
+        self.api_authorization = self.authorizer.authorize_api('app_id:secret_key')
+        self.download_authorization = self.authorizer.authorize_download(self.api_authorization, 'bob/', 3600)
+
+
+    def tearDown(self):
+        os.environ.pop(authorization._ENV_BUCKET_ID)
+
+
+    def test_request_invokes_download_authorization_api(self):
+        expected_url = f'{self.api_authorization.api_url}/{authorization._DOWNLOAD_AUTH_RELATIVE_URL}'
+        self.assertEqual(self.requests.invoked_post_url, expected_url)
+        self.assertEqual(self.requests.invoked_post_headers, {'Authorization': self.api_authorization.token})
+        expected_json = {'bucketId': 'bucket_id', 'fileNamePrefix': 'bob/', 'validDurationInSeconds': 3600}
+        self.assertEqual(self.requests.invoked_post_json, expected_json)
+
+
+    def test_returns_download_authorization_token(self):
+        self.assertEqual(self.download_authorization, 'a-download-token')
+
+
+    def test_raises_exception_if_authorization_fails(self):
+        self.requests.post_status_code = 400
+        with self.assertRaises(exceptions.BackBlazeAuthorizationError):
+            self.authorizer.authorize_download(self.api_authorization, 'bob/', 3600)
+
+
+
+class TestRaiseIfAuthorizationExpired(unittest.TestCase):
+
+    def test_raises_if_token_expired(self):
+        with self.assertRaises(exceptions.BackBlazeAuthorizationExpiredError):
+            authorization.raise_if_authorization_expired(ErrorResponseDouble(401, 'expired_auth_token'))
+
+
+    def test_does_not_raise_for_other_errors(self):
+        authorization.raise_if_authorization_expired(ErrorResponseDouble(401, 'bad_auth_token'))
+        authorization.raise_if_authorization_expired(ErrorResponseDouble(404, 'not_found'))
 
 
 
@@ -72,6 +145,16 @@ class TestAuthorizeUpload(unittest.TestCase):
         self.assertEqual(self.authorize_response.token, 'an-upload-token')
 
 
+    def test_authorize_upload_part_invokes_upload_part_api(self):
+        part_authorization = self.authorizer.authorize_upload_part(self.api_authorization, 'a-large-file-id')
+        expected_url = f'{self.api_authorization.api_url}/{authorization._UPLOAD_PART_AUTH_RELATIVE_URL}'
+        self.assertEqual(self.requests.invoked_get_url, expected_url)
+        self.assertEqual(self.requests.invoked_get_headers, {'Authorization': self.api_authorization.token})
+        self.assertEqual(self.requests.invoked_get_params, {'fileId': 'a-large-file-id'})
+        self.assertEqual(part_authorization.upload_url, 'https://upload.example.com')
+        self.assertEqual(part_authorization.token, 'an-upload-token')
+
+
 
 
 class TestCreateUserCredentials(unittest.TestCase):
@@ -103,8 +186,13 @@ class TestCreateUserCredentials(unittest.TestCase):
 
     def test_raises_exception_if_master_authorization_fails(self):
         self.requests.get_status_code = '<anything not 200>'
+        authorizer = authorization.Authorizer(self.requests)
         with self.assertRaises(exceptions.BackBlazeAuthorizationError):
-            self.authorizer.create_user_credentials('bob')
+            authorizer.create_user_credentials('bob')
+
+
+    def test_master_credentials_come_from_environment(self):
+        self.assertEqual(self.authorizer.master_credentials, 'master app id:master secret key')
 
 
     def test_authorizes_with_master_credentials(self):
@@ -187,8 +275,9 @@ class TestDeleteUserCredentials(unittest.TestCase):
 
     def test_raises_exception_if_master_authorization_fails(self):
         self.requests.get_status_code = '<anything not 200>'
+        authorizer = authorization.Authorizer(self.requests)
         with self.assertRaises(exceptions.BackBlazeAuthorizationError):
-            self.authorizer.delete_user_credentials(self.application_key_id)
+            authorizer.delete_user_credentials(self.application_key_id)
 
 
     def test_authorizes_with_master_credentials(self):
@@ -233,7 +322,7 @@ class AuthorizeApiResponseDouble(common.ResponseDouble):
             "accountId": "some_id",
             "allowed": {
                 "bucketId": None,
-                "bucketName": None,
+                "bucketName": "filezap-server",
                 "capabilities": [
                     "writeKeys"
                 ],
@@ -248,6 +337,19 @@ class AuthorizeApiResponseDouble(common.ResponseDouble):
 
 
 
+class ErrorResponseDouble(common.ResponseDouble):
+
+    def __init__(self, status_code, code):
+        super(ErrorResponseDouble, self).__init__(status_code)
+        self.code = code
+
+
+    def json(self):
+        return {'status': self.status_code, 'code': self.code, 'message': 'an error'}
+
+
+
+
 class AuthorizeUploadResponseDouble(common.ResponseDouble):
 
     def json(self):
@@ -258,6 +360,17 @@ class AuthorizeUploadResponseDouble(common.ResponseDouble):
 
 
 
+class AuthorizeDownloadResponseDouble(common.ResponseDouble):
+
+    def json(self):
+        return {
+            'bucketId': 'bucket_id',
+            'fileNamePrefix': 'bob/',
+            'authorizationToken': 'a-download-token'
+        }
+
+
+
 class PostResponseDouble(common.ResponseDouble):
 
     def json(self):
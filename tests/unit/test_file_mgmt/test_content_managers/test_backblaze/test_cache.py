@@ -0,0 +1,70 @@
+import unittest
+
+import src.file_mgmt.content_managers.backblaze.cache as cache
+import tests.unit.test_file_mgmt.test_content_managers.common as common
+
+
+
+class TestExpiringCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = common.ClockDouble()
+        self.cache = cache.ExpiringCache(2, 60, self.clock)
+
+
+    def test_returns_none_and_counts_miss_for_unknown_key(self):
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.stats, {'hits': 0, 'misses': 1, 'size': 0})
+
+
+    def test_returns_cached_value_and_counts_hit(self):
+        self.cache.put('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.stats, {'hits': 1, 'misses': 0, 'size': 1})
+
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.put('key', 'value')
+        self.clock.now += 60
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.size, 0)
+
+
+    def test_entries_can_override_ttl(self):
+        self.cache.put('key', 'value', ttl_seconds=120)
+        self.clock.now += 90
+        self.assertEqual(self.cache.get('key'), 'value')
+
+
+    def test_evicts_least_recently_used_entry_when_full(self):
+        self.cache.put('first', 1)
+        self.cache.put('second', 2)
+        self.cache.get('first')
+        self.cache.put('third', 3)
+        self.assertIsNone(self.cache.get('second'))
+        self.assertEqual(self.cache.get('first'), 1)
+        self.assertEqual(self.cache.get('third'), 3)
+
+
+    def test_invalidate_removes_entry(self):
+        self.cache.put('key', 'value')
+        self.cache.invalidate('key')
+        self.assertIsNone(self.cache.get('key'))
+
+
+    def test_items_skips_expired_entries(self):
+        self.cache.put('key', 'value')
+        self.cache.put('short', 'lived', ttl_seconds=10)
+        self.clock.now += 30
+        self.assertEqual(self.cache.items(), [('key', 'value')])
+        self.assertEqual(self.cache.stats['hits'], 0)
+
+
+    def test_calls_on_evict_for_entries_dropped_when_full_or_expired(self):
+        evicted = []
+        evicting_cache = cache.ExpiringCache(1, 60, self.clock, on_evict=lambda key, value: evicted.append((key, value)))
+        evicting_cache.put('first', 1)
+        evicting_cache.put('second', 2)
+        self.clock.now += 60
+        evicting_cache.get('second')
+        self.assertEqual(evicted, [('first', 1), ('second', 2)])
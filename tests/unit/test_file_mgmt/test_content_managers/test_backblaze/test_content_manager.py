@@ -1,5 +1,6 @@
 from collections import namedtuple
 import hashlib
+from io import BytesIO, SEEK_SET, UnsupportedOperation
 import unittest
 
 import urllib
@@ -75,14 +76,104 @@ class TestGetContent(TestContentManagerBase):
         self.assertEqual(self.requests.invoked_get_params, expected_params)
 
 
+    def test_streams_download(self):
+        self.assertTrue(self.requests.invoked_get_stream)
+
+
     def test_raises_exception_if_file_not_found(self):
         self.requests.get_status_code = 404
         with self.assertRaises(exceptions.ContentNotFoundError):
             self.content_manager.get_content(self.content_id, self.credentials)
 
 
-    def test_returns_file_content(self):
-        self.assertEqual(self.file_content, b'some file content')
+    def test_returns_file_content_as_stream(self):
+        self.assertEqual(self.file_content.content_length, 17)
+        self.assertEqual(self.file_content.content_type, 'image/png')
+        self.assertEqual(list(self.file_content), [b'some ', b'file ', b'content'])
+
+
+    def test_retries_once_with_fresh_authorization_if_token_expired(self):
+        requests = ExpiredThenDownloadRequestsDouble()
+        self.content_manager = content_manager.ContentManager(self.authorizer, requests)
+        file_content = self.content_manager.get_content(self.content_id, self.credentials)
+        self.assertEqual(self.authorizer.invalidated_credentials, self.credentials)
+        self.assertEqual(self.authorizer.authorize_count, 3)
+        self.assertEqual(b''.join(file_content), b'some file content')
+
+
+    def test_exposes_authorization_cache_stats(self):
+        expected_stats = {'hits': 0, 'misses': 1, 'size': 1}
+        self.assertEqual(self.content_manager.stats['authorization_cache'], expected_stats)
+
+
+    def test_passes_byte_range_to_download_api(self):
+        self.content_manager.get_content(self.content_id, self.credentials, (10, 20))
+        self.assertEqual(self.requests.invoked_get_headers, {'Authorization': 'api_token', 'Range': 'bytes=10-19'})
+
+
+    def test_passes_open_ended_byte_range(self):
+        self.content_manager.get_content(self.content_id, self.credentials, (10, None))
+        self.assertEqual(self.requests.invoked_get_headers['Range'], 'bytes=10-')
+
+
+    def test_passes_suffix_byte_range(self):
+        self.content_manager.get_content(self.content_id, self.credentials, (-500, None))
+        self.assertEqual(self.requests.invoked_get_headers['Range'], 'bytes=-500')
+
+
+    def test_returns_content_range_of_partial_content(self):
+        self.requests.get_status_code = 206
+        file_content = self.content_manager.get_content(self.content_id, self.credentials, (0, 5))
+        self.assertEqual(file_content.content_range, 'bytes 0-4/17')
+
+
+    def test_raises_exception_if_range_not_satisfiable(self):
+        self.requests.get_status_code = 416
+        with self.assertRaises(exceptions.ContentRangeNotSatisfiableError):
+            self.content_manager.get_content(self.content_id, self.credentials, (100, None))
+
+
+    def test_raises_exception_instead_of_returning_error_body(self):
+        self.requests.get_status_code = 503
+        with self.assertRaises(exceptions.ContentDownloadFailedError):
+            self.content_manager.get_content(self.content_id, self.credentials)
+
+
+
+class TestGetDownloadUrl(TestContentManagerBase):
+
+    def setUp(self):
+        requests = common.RequestsDouble(FileInfoResponseDouble)
+        super(TestGetDownloadUrl, self).setUp(requests)
+        self.download_url = self.content_manager.get_download_url(self.content_id, self.user, 'my file.png', 'bob/my+file.png')
+
+
+    def test_invokes_authorizer(self):
+        self.assertEqual(self.authorizer.invoked_credentials, self.credentials)
+
+
+    def test_authorizes_downloads_for_user_prefix(self):
+        self.assertEqual(self.authorizer.invoked_download_prefix, 'bob/')
+        self.assertEqual(self.authorizer.invoked_download_duration, content_manager._DOWNLOAD_AUTH_DURATION_SECONDS)
+
+
+    def test_returns_download_by_name_url_with_authorization_and_disposition(self):
+        expected_url = ('https://f002.example.com/file/filezap-server/bob/my%2Bfile.png'
+                        '?Authorization=download_token'
+                        '&b2ContentDisposition=attachment%3B+filename%2A%3DUTF-8%27%27my%2520file.png')
+        self.assertEqual(self.download_url, expected_url)
+
+
+    def test_reuses_cached_download_authorization(self):
+        self.authorizer.invoked_download_prefix = None
+        self.content_manager.get_download_url(self.content_id, self.user, 'other.png', 'bob/other.png')
+        self.assertIsNone(self.authorizer.invoked_download_prefix)
+
+
+    def test_looks_up_content_name_if_not_known(self):
+        download_url = self.content_manager.get_download_url(self.content_id, self.user, 'bobfile1.png')
+        self.assertEqual(self.requests.invoked_get_url, f'https://api.example.com/{content_manager._FILE_INFO_RELATIVE_URL}')
+        self.assertTrue(download_url.startswith('https://f002.example.com/file/filezap-server/bobfile1.png?'))
 
 
 
@@ -98,6 +189,13 @@ class TestDeleteContent(TestContentManagerBase):
         self.assertEqual(self.authorizer.invoked_credentials, self.credentials)
 
 
+    def test_uses_given_content_name_without_calling_get_file_api(self):
+        self.requests.invoked_get_url = None
+        self.content_manager.delete_content(self.content_id, self.credentials, 'bob/known.png')
+        self.assertIsNone(self.requests.invoked_get_url)
+        self.assertEqual(self.requests.invoked_post_json, {'fileId': self.content_id, 'fileName': 'bob/known.png'})
+
+
     def test_calls_get_file_api(self):
         expected_url = f'https://api.example.com/{content_manager._FILE_INFO_RELATIVE_URL}'
         self.assertEqual(self.requests.invoked_get_url, expected_url)
@@ -127,7 +225,7 @@ class TestUploadContent(TestContentManagerBase):
         requests = common.RequestsDouble(None, UploadFileResponseDouble)
         super(TestUploadContent, self).setUp(requests)
         self.raw_file = FileDouble()
-        self.content_id = self.content_manager.upload_content(self.raw_file, self.user)
+        self.uploaded = self.content_manager.upload_content(self.raw_file, self.user)
 
 
     def test_gets_upload_authorization_from_api_authorization(self):
@@ -143,14 +241,29 @@ class TestUploadContent(TestContentManagerBase):
             'Authorization': 'upload_token',
             'X-Bz-File-Name': f'{self.user.username}/{encoded_filename}',
             'Content-Type': self.raw_file.mimetype,
-            'Content-Length': str(len(self.raw_file.content)),
-            'X-Bz-Content-Sha1': hashlib.sha1(self.raw_file.content).hexdigest(),
+            'Content-Length': str(len(self.raw_file.content) + 40),
+            'X-Bz-Content-Sha1': 'hex_digits_at_end',
 
         }
         self.assertEqual(self.requests.invoked_post_headers, expected_headers)
 
-        expected_data = self.raw_file.content
-        self.assertEqual(self.requests.invoked_post_data, expected_data)
+
+    def test_streams_file_followed_by_its_sha1(self):
+        self.raw_file.seek(0)
+        self.content_manager.upload_content(self.raw_file, self.user)
+        expected_data = self.raw_file.content + hashlib.sha1(self.raw_file.content).hexdigest().encode()
+        self.assertEqual(b''.join(self.requests.invoked_post_data), expected_data)
+
+
+    def test_ignores_content_length_claimed_by_client(self):
+        self.raw_file.content_length = 5
+        self.content_manager.upload_content(self.raw_file, self.user)
+        self.assertEqual(self.requests.invoked_post_headers['Content-Length'], str(len(self.raw_file.content) + 40))
+
+
+    def test_uses_content_length_of_read_once_file(self):
+        self.content_manager.upload_content(ReadOnceFileDouble(), self.user)
+        self.assertEqual(self.requests.invoked_post_headers['Content-Length'], str(len(self.raw_file.content) + 40))
 
 
     def test_raises_exception_if_file_upload_failed(self):
@@ -159,8 +272,160 @@ class TestUploadContent(TestContentManagerBase):
             self.content_manager.upload_content(self.raw_file, self.user)
 
 
-    def test_returns_content_id_if_upload_succeeds(self):
-        self.assertEqual(self.content_id, 'a-new-content-id')
+    def test_returns_uploaded_content_if_upload_succeeds(self):
+        self.assertEqual(self.uploaded.content_id, 'a-new-content-id')
+        self.assertEqual(self.uploaded.content_name, 'bob/index+with+spaces.html')
+        self.assertEqual(self.uploaded.size, 19)
+        self.assertEqual(self.uploaded.sha1, 'a-sha1')
+        self.assertEqual(self.uploaded.content_type, 'text/html')
+
+
+    def test_reuses_upload_url_for_later_uploads(self):
+        self.authorizer.invoked_authorization = None
+        self.content_manager.upload_content(self.raw_file, self.user)
+        self.assertIsNone(self.authorizer.invoked_authorization)
+        self.assertEqual(self.content_manager.stats['upload_url_pool']['created'], 1)
+
+
+    def test_discards_broken_upload_url_and_retries_with_a_new_one(self):
+        self.requests.post_status_code = 503
+        self.authorizer.upload_authorization_count = 0
+        with self.assertRaises(exceptions.ContentUploadFailedError):
+            self.content_manager.upload_content(self.raw_file, self.user)
+        # The first attempt reuses the url pooled during setUp
+        self.assertEqual(self.authorizer.upload_authorization_count, content_manager._UPLOAD_ATTEMPTS - 1)
+        pool_stats = self.content_manager.stats['upload_url_pool']
+        self.assertEqual(pool_stats['discarded'], content_manager._UPLOAD_ATTEMPTS)
+        self.assertEqual(pool_stats['idle'], 0)
+        self.assertEqual(pool_stats['checked_out'], 0)
+
+
+    def test_uploads_files_above_threshold_as_large_files(self):
+        large_files = LargeFileUploaderDouble(threshold=len(self.raw_file.content) - 1)
+        self.content_manager._large_files = large_files
+        uploaded = self.content_manager.upload_content(self.raw_file, self.user)
+        self.assertEqual(uploaded.content_id, 'a-large-content-id')
+        self.assertIsNone(uploaded.sha1)
+        self.assertEqual(large_files.invoked_authorization.token, 'api_token')
+        self.assertIs(large_files.invoked_file, self.raw_file)
+        self.assertEqual(large_files.invoked_b2_filename, 'bob/index+with+spaces.html')
+        self.assertEqual(large_files.invoked_content_type, 'text/html')
+
+
+    def test_uploads_files_up_to_threshold_in_one_request(self):
+        large_files = LargeFileUploaderDouble(threshold=len(self.raw_file.content))
+        self.content_manager._large_files = large_files
+        self.content_manager.upload_content(self.raw_file, self.user)
+        self.assertIsNone(large_files.invoked_file)
+
+
+    def test_discards_upload_url_on_connection_error(self):
+        self.requests.post_error = ConnectionError()
+        with self.assertRaises(exceptions.ContentUploadFailedError):
+            self.content_manager.upload_content(self.raw_file, self.user)
+        self.assertEqual(self.content_manager.stats['upload_url_pool']['idle'], 0)
+
+
+    def test_discards_upload_url_if_reading_the_file_fails(self):
+        self.requests.post_error = ValueError()
+        for attempt in range(3):
+            with self.assertRaises(ValueError):
+                self.content_manager.upload_content(self.raw_file, self.user)
+        pool_stats = self.content_manager.stats['upload_url_pool']
+        self.assertEqual(pool_stats['checked_out'], 0)
+        self.assertEqual(pool_stats['discarded'], 3)
+
+
+    def test_read_once_file_does_not_leak_upload_url_when_retry_is_impossible(self):
+        self.requests.post_status_code = 503
+        with self.assertRaises(UnsupportedOperation):
+            self.content_manager.upload_content(ReadOnceFileDouble(), self.user)
+        self.assertEqual(self.content_manager.stats['upload_url_pool']['checked_out'], 0)
+
+
+
+
+class TestUploadSession(TestContentManagerBase):
+
+    def setUp(self):
+        super(TestUploadSession, self).setUp()
+        self.upload_session = self.content_manager.create_upload_session(self.user)
+
+
+    def test_invokes_authorizer(self):
+        self.assertEqual(self.authorizer.invoked_credentials, self.credentials)
+        self.assertEqual(self.authorizer.invoked_authorization.token, 'api_token')
+
+
+    def test_returns_upload_url_and_user_prefix(self):
+        self.assertEqual(self.upload_session.upload_url, 'https://some.long.upload.url')
+        self.assertEqual(self.upload_session.token, 'upload_token')
+        self.assertEqual(self.upload_session.content_name_prefix, 'bob/')
+
+
+    def test_upload_url_returned_at_end_of_session_is_reused(self):
+        self.content_manager.end_upload_session(self.user, self.upload_session.upload_url, self.upload_session.token)
+        self.content_manager.create_upload_session(self.user)
+        self.assertEqual(self.authorizer.upload_authorization_count, 1)
+
+
+    def test_upload_url_that_was_not_handed_out_is_ignored(self):
+        self.content_manager.end_upload_session(self.user, 'https://returned.upload.url', 'returned_token')
+        upload_session = self.content_manager.create_upload_session(self.user)
+        self.assertEqual(upload_session.upload_url, 'https://some.long.upload.url')
+        self.assertEqual(self.authorizer.upload_authorization_count, 2)
+
+
+
+class TestVerifyUpload(TestContentManagerBase):
+
+    def setUp(self):
+        requests = common.RequestsDouble(UploadedFileInfoResponseDouble)
+        super(TestVerifyUpload, self).setUp(requests)
+        self.uploaded = self.content_manager.verify_upload(self.content_id, self.user)
+
+
+    def test_invokes_authorizer(self):
+        self.assertEqual(self.authorizer.invoked_credentials, self.credentials)
+
+
+    def test_calls_get_file_api(self):
+        self.assertEqual(self.requests.invoked_get_url, f'https://api.example.com/{content_manager._FILE_INFO_RELATIVE_URL}')
+        self.assertEqual(self.requests.invoked_get_params, {'fileId': self.content_id})
+
+
+    def test_returns_uploaded_content(self):
+        self.assertEqual(self.uploaded.content_id, self.content_id)
+        self.assertEqual(self.uploaded.content_name, 'bob/direct.png')
+        self.assertEqual(self.uploaded.size, 7)
+
+
+    def test_raises_if_content_is_outside_user_prefix(self):
+        self.user.username = 'alice'
+        with self.assertRaises(exceptions.ContentNotFoundError):
+            self.content_manager.verify_upload(self.content_id, self.user)
+
+
+    def test_raises_if_content_does_not_exist(self):
+        self.requests.get_status_code = 404
+        with self.assertRaises(exceptions.ContentNotFoundError):
+            self.content_manager.verify_upload(self.content_id, self.user)
+
+
+
+class TestCancelExpiredResumableUploads(TestContentManagerBase):
+
+    def setUp(self):
+        super(TestCancelExpiredResumableUploads, self).setUp()
+        self.resumable_uploads = ResumableUploadsDouble()
+        self.content_manager._resumable_uploads = self.resumable_uploads
+        self.credentials = self.authorizer.master_credentials
+        self.cancelled = self.content_manager.cancel_expired_resumable_uploads()
+
+
+    def test_cancels_expired_uploads_of_every_user_with_master_key(self):
+        self.assertEqual(self.cancelled, 2)
+        self.assertEqual(self.resumable_uploads.invoked_authorization.token, 'api_token')
 
 
 
@@ -169,7 +434,39 @@ class DownloadFileResponseDouble(common.ResponseDouble):
 
     def __init__(self, status_code):
         super(DownloadFileResponseDouble, self).__init__(status_code)
-        self.content = b'some file content'
+        self.chunks = [b'some ', b'file ', b'content']
+        self.headers = {'Content-Length': '17', 'Content-Type': 'image/png'}
+        if status_code == 206:
+            self.chunks = [b'some ']
+            self.headers = {'Content-Length': '5', 'Content-Type': 'image/png', 'Content-Range': 'bytes 0-4/17'}
+
+
+    def iter_content(self, chunk_size):
+        return iter(self.chunks)
+
+
+
+class ExpiredThenDownloadRequestsDouble(common.RequestsDouble):
+    """
+    Answers the first request with an expired token error, every later one succeeds
+    """
+    def __init__(self):
+        super(ExpiredThenDownloadRequestsDouble, self).__init__(DownloadFileResponseDouble)
+        self.get_count = 0
+
+
+    def get(self, url, **kwargs):
+        self.get_count += 1
+        if self.get_count == 1:
+            return ExpiredTokenResponseDouble(401)
+        return super(ExpiredThenDownloadRequestsDouble, self).get(url, **kwargs)
+
+
+
+class ExpiredTokenResponseDouble(common.ResponseDouble):
+
+    def json(self):
+        return {'status': 401, 'code': 'expired_auth_token', 'message': 'token expired'}
 
 
 
@@ -180,23 +477,88 @@ class FileInfoResponseDouble(common.ResponseDouble):
 
 
 
+class UploadedFileInfoResponseDouble(common.ResponseDouble):
+
+    def json(self):
+        return {
+            'fileId': 'a_content_id',
+            'fileName': 'bob/direct.png',
+            'contentLength': 7,
+            'contentSha1': 'a-sha1',
+            'contentType': 'image/png'
+        }
+
+
+
 class UploadFileResponseDouble(common.ResponseDouble):
 
     def json(self):
-        return {'fileId': 'a-new-content-id'}
+        return {
+            'fileId': 'a-new-content-id',
+            'fileName': 'bob/index+with+spaces.html',
+            'contentLength': 19,
+            'contentSha1': 'a-sha1',
+            'contentType': 'text/html'
+        }
 
 
 
-class FileDouble(object):
+class FileDouble(BytesIO):
 
-    def __init__(self):
+    def __init__(self, content=b'uploaded file bytes'):
+        super(FileDouble, self).__init__(content)
         self.filename = 'index with spaces.html'
         self.mimetype = 'text/html'
-        self.content = b'uploaded file bytes'
+        self.content = content
+
+
+class ReadOnceFileDouble(FileDouble):
+    """
+    Knows its size and, like a RemoteFile, can only be rewound before it is
+    handed to an upload
+    """
+    def __init__(self):
+        super(ReadOnceFileDouble, self).__init__()
+        self.content_length = len(self.content)
+        self.handed_out = False
+
 
+    def seek(self, offset, whence=SEEK_SET):
+        if offset != 0 or whence != SEEK_SET or self.handed_out:
+            raise UnsupportedOperation()
+        self.handed_out = True
+        return 0
+
+
+class LargeFileUploaderDouble(object):
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.invoked_authorization = None
+        self.invoked_file = None
+        self.invoked_b2_filename = None
+        self.invoked_content_type = None
+
+
+    def upload(self, api_authorization, file, b2_filename, content_type):
+        self.invoked_authorization = api_authorization
+        self.invoked_file = file
+        self.invoked_b2_filename = b2_filename
+        self.invoked_content_type = content_type
+        return {'fileId': 'a-large-content-id', 'contentSha1': 'none'}
+
+
+
+class ResumableUploadsDouble(object):
+
+    def __init__(self):
+        self.invoked_authorization = None
+
+
+    def cancel_expired(self, api_authorization):
+        self.invoked_authorization = api_authorization
+        return 2
 
-    def read(self):
-        return self.content
 
 
 class AuthorizerDouble(object):
@@ -206,6 +568,13 @@ class AuthorizerDouble(object):
         self.invoked_user = None
         self.invoked_authorization = None
         self.invoked_application_key_id = None
+        self.invalidated_credentials = None
+        self.authorize_count = 0
+        self.upload_authorization_count = 0
+        self.invoked_download_prefix = None
+        self.invoked_download_duration = None
+        self.cache_stats = {'hits': 0, 'misses': 1, 'size': 1}
+        self.master_credentials = 'master:creds'
 
 
     def create_user_credentials(self, user):
@@ -218,17 +587,29 @@ class AuthorizerDouble(object):
 
     def authorize_api(self, credentials):
         self.invoked_credentials = credentials
-        return Authorization('https://api.example.com', 'https://f002.example.com', 'api_token')
+        self.authorize_count += 1
+        return Authorization('https://api.example.com', 'https://f002.example.com', 'api_token', 'filezap-server')
+
+
+    def authorize_download(self, authorization, file_name_prefix, duration_seconds):
+        self.invoked_download_prefix = file_name_prefix
+        self.invoked_download_duration = duration_seconds
+        return 'download_token'
+
+
+    def invalidate_api_authorization(self, credentials):
+        self.invalidated_credentials = credentials
 
 
     def authorize_upload(self, authorization):
         self.invoked_authorization = authorization
+        self.upload_authorization_count += 1
         return UploadAuthorization('https://some.long.upload.url', 'upload_token')
 
 
 
 
-Authorization = namedtuple('Authorization', ['api_url', 'download_url', 'token'])
+Authorization = namedtuple('Authorization', ['api_url', 'download_url', 'token', 'bucket_name'])
 UploadAuthorization = namedtuple('UploadAuthorization', ['upload_url', 'token'])
 
 
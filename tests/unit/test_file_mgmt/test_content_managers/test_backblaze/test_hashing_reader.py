@@ -0,0 +1,39 @@
+import hashlib
+from io import BytesIO
+import unittest
+
+import src.file_mgmt.content_managers.backblaze.hashing_reader as hashing_reader
+
+
+
+class TestHashingReader(unittest.TestCase):
+
+    def setUp(self):
+        self.content = b'some uploaded content'
+        self.reader = hashing_reader.HashingReader(BytesIO(self.content), len(self.content), chunk_size=8)
+        self.expected_body = self.content + hashlib.sha1(self.content).hexdigest().encode()
+
+
+    def test_length_includes_hex_digest(self):
+        self.assertEqual(len(self.reader), len(self.content) + 40)
+
+
+    def test_read_returns_content_followed_by_hex_digest(self):
+        body = b''
+        chunk = self.reader.read(5)
+        while chunk:
+            body += chunk
+            chunk = self.reader.read(5)
+        self.assertEqual(body, self.expected_body)
+
+
+    def test_iterates_in_chunks(self):
+        chunks = list(self.reader)
+        self.assertEqual(b''.join(chunks), self.expected_body)
+        self.assertTrue(all(len(chunk) <= 8 for chunk in chunks))
+
+
+    def test_read_without_size_returns_remaining_digest_at_end(self):
+        self.reader.read(len(self.content))
+        self.assertEqual(self.reader.read(), hashlib.sha1(self.content).hexdigest().encode())
+        self.assertEqual(self.reader.read(), b'')
@@ -0,0 +1,189 @@
+from collections import namedtuple
+import hashlib
+from io import BytesIO
+import os
+import threading
+import unittest
+
+import src.file_mgmt.content_managers.backblaze.large_file as large_file
+import src.file_mgmt.content_managers.exceptions as exceptions
+import tests.unit.test_file_mgmt.test_content_managers.common as common
+
+
+
+class TestLargeFileUploaderBase(unittest.TestCase):
+
+    def setUp(self):
+        os.environ[large_file._ENV_BUCKET_ID] = 'bucket_id'
+        self.requests = LargeFileRequestsDouble()
+        self.authorizer = AuthorizerDouble()
+        self.uploader = large_file.LargeFileUploader(self.authorizer, self.requests, part_size=1, concurrency=2)
+        self.uploader.part_size = 4  # Bypass the BackBlaze minimum part size
+        self.api_authorization = Authorization('https://api.example.com', 'https://f002.example.com', 'api_token')
+        self.content = b'0123456789'
+
+
+    def tearDown(self):
+        os.environ.pop(large_file._ENV_BUCKET_ID)
+
+
+    def upload(self):
+        return self.uploader.upload(self.api_authorization, BytesIO(self.content), 'bob/big.bin', 'application/zip')
+
+
+
+class TestLargeFileUploaderConfiguration(TestLargeFileUploaderBase):
+
+    def test_uses_configured_threshold_and_concurrency(self):
+        self.assertEqual(self.uploader.threshold, large_file._DEFAULT_THRESHOLD)
+        self.assertEqual(self.uploader.concurrency, 2)
+
+
+    def test_part_size_is_at_least_backblaze_minimum(self):
+        uploader = large_file.LargeFileUploader(self.authorizer, self.requests, part_size=1)
+        self.assertEqual(uploader.part_size, large_file._MINIMUM_PART_SIZE)
+
+
+    def test_reads_configuration_from_environment(self):
+        os.environ[large_file._ENV_THRESHOLD] = '123'
+        os.environ[large_file._ENV_PART_SIZE] = '6000000'
+        os.environ[large_file._ENV_CONCURRENCY] = '8'
+        try:
+            uploader = large_file.LargeFileUploader(self.authorizer, self.requests)
+        finally:
+            os.environ.pop(large_file._ENV_THRESHOLD)
+            os.environ.pop(large_file._ENV_PART_SIZE)
+            os.environ.pop(large_file._ENV_CONCURRENCY)
+        self.assertEqual(uploader.threshold, 123)
+        self.assertEqual(uploader.part_size, 6000000)
+        self.assertEqual(uploader.concurrency, 8)
+
+
+
+class TestUpload(TestLargeFileUploaderBase):
+
+    def test_starts_large_file(self):
+        self.upload()
+        url, headers, json = self.requests.api_calls[0]
+        self.assertEqual(url, f'https://api.example.com/{large_file._START_RELATIVE_URL}')
+        self.assertEqual(headers, {'Authorization': 'api_token'})
+        self.assertEqual(json, {'bucketId': 'bucket_id', 'fileName': 'bob/big.bin', 'contentType': 'application/zip'})
+
+
+    def test_uploads_each_part_with_its_own_hash(self):
+        self.upload()
+        parts = sorted(self.requests.uploaded_parts)
+        self.assertEqual(parts, [('1', b'0123'), ('2', b'4567'), ('3', b'89')])
+        for part_number, part in parts:
+            headers = self.requests.part_headers[part_number]
+            self.assertEqual(headers['X-Bz-Content-Sha1'], hashlib.sha1(part).hexdigest())
+            self.assertEqual(headers['Content-Length'], str(len(part)))
+            self.assertEqual(headers['Authorization'], 'part_token')
+
+
+    def test_requests_part_urls_for_started_file(self):
+        self.upload()
+        self.assertEqual(self.authorizer.invoked_file_ids, {'a-large-file-id'})
+        self.assertLessEqual(self.authorizer.part_url_count, self.uploader.concurrency)
+
+
+    def test_finishes_large_file_with_part_hashes_in_order(self):
+        self.upload()
+        url, headers, json = self.requests.api_calls[-1]
+        expected_hashes = [hashlib.sha1(part).hexdigest() for part in (b'0123', b'4567', b'89')]
+        self.assertEqual(url, f'https://api.example.com/{large_file._FINISH_RELATIVE_URL}')
+        self.assertEqual(json, {'fileId': 'a-large-file-id', 'partSha1Array': expected_hashes})
+
+
+    def test_returns_finished_file_info(self):
+        self.assertEqual(self.upload(), {'fileId': 'a-large-file-id'})
+
+
+    def test_retries_failed_part_with_new_part_url(self):
+        self.requests.failures = {'2': 1}
+        self.upload()
+        self.assertIn(('2', b'4567'), self.requests.uploaded_parts)
+        self.assertEqual(self.requests.part_attempts['2'], 2)
+
+
+    def test_cancels_large_file_if_a_part_keeps_failing(self):
+        self.requests.failures = {'2': large_file._PART_ATTEMPTS}
+        with self.assertRaises(exceptions.ContentUploadFailedError):
+            self.upload()
+        url, headers, json = self.requests.api_calls[-1]
+        self.assertEqual(url, f'https://api.example.com/{large_file._CANCEL_RELATIVE_URL}')
+        self.assertEqual(json, {'fileId': 'a-large-file-id'})
+
+
+    def test_stores_file_info_with_started_file(self):
+        file_id = self.uploader.start_large_file(self.api_authorization, 'bob/big.bin', None, {'upload_length': '10'})
+        url, headers, json = self.requests.api_calls[0]
+        self.assertEqual(json['fileInfo'], {'upload_length': '10'})
+        self.assertEqual(json['contentType'], 'b2/x-auto')
+        self.assertEqual(file_id, 'a-large-file-id')
+
+
+    def test_raises_if_large_file_cannot_be_started(self):
+        self.requests.post_status_code = 400
+        with self.assertRaises(exceptions.ContentUploadFailedError):
+            self.upload()
+
+
+
+
+class LargeFileRequestsDouble(object):
+
+    def __init__(self):
+        self.post_status_code = 200
+        self.api_calls = []
+        self.uploaded_parts = []
+        self.part_headers = {}
+        self.part_attempts = {}
+        self.failures = {}
+        self._lock = threading.Lock()
+
+
+    def post(self, url, headers, json=None, data=None):
+        with self._lock:
+            if url == 'https://upload.example.com/part':
+                return self._upload_part(headers, data)
+            self.api_calls.append((url, headers, json))
+            return LargeFileResponseDouble(self.post_status_code)
+
+
+    def _upload_part(self, headers, data):
+        part_number = headers['X-Bz-Part-Number']
+        self.part_attempts[part_number] = self.part_attempts.get(part_number, 0) + 1
+        if self.part_attempts[part_number] <= self.failures.get(part_number, 0):
+            return LargeFileResponseDouble(503)
+        self.uploaded_parts.append((part_number, data))
+        self.part_headers[part_number] = headers
+        return LargeFileResponseDouble(200)
+
+
+
+class LargeFileResponseDouble(common.ResponseDouble):
+
+    def json(self):
+        return {'fileId': 'a-large-file-id'}
+
+
+
+class AuthorizerDouble(object):
+
+    def __init__(self):
+        self.invoked_file_ids = set()
+        self.part_url_count = 0
+        self._lock = threading.Lock()
+
+
+    def authorize_upload_part(self, api_authorization, file_id):
+        with self._lock:
+            self.invoked_file_ids.add(file_id)
+            self.part_url_count += 1
+        return UploadAuthorization('https://upload.example.com/part', 'part_token')
+
+
+
+Authorization = namedtuple('Authorization', ['api_url', 'download_url', 'token'])
+UploadAuthorization = namedtuple('UploadAuthorization', ['upload_url', 'token'])
@@ -0,0 +1,301 @@
+from collections import namedtuple
+import hashlib
+from io import BytesIO
+import os
+import unittest
+
+import src.file_mgmt.content_managers.backblaze.resumable as resumable
+import src.file_mgmt.content_managers.exceptions as exceptions
+import tests.unit.test_file_mgmt.test_content_managers.common as common
+
+
+
+class TestResumableUploadsBase(unittest.TestCase):
+
+    def setUp(self):
+        os.environ[resumable._ENV_BUCKET_ID] = 'bucket_id'
+        self.requests = ResumableRequestsDouble()
+        self.large_files = LargeFileUploaderDouble()
+        self.now = 1000000.0
+        self.uploads = resumable.ResumableUploads(AuthorizerDouble(), self.requests, self.large_files,
+                                                  expiry_seconds=3600, clock=lambda: self.now)
+        self.api_authorization = Authorization('https://api.example.com', 'api_token')
+        self.requests.unfinished_files = [{
+            'fileId': 'an-upload-id',
+            'fileName': 'bob/my+video.mp4',
+            'fileInfo': {'upload_length': '10'},
+            'uploadTimestamp': (self.now - 60) * 1000
+        }]
+
+
+    def tearDown(self):
+        os.environ.pop(resumable._ENV_BUCKET_ID)
+
+
+    def add_parts(self, *parts):
+        for part in parts:
+            part_number = len(self.requests.parts) + 1
+            self.requests.parts.append({'partNumber': part_number, 'contentLength': len(part),
+                                        'contentSha1': hashlib.sha1(part).hexdigest()})
+
+
+
+
+class TestCreate(TestResumableUploadsBase):
+
+    def test_starts_large_file_with_declared_size(self):
+        upload = self.uploads.create(self.api_authorization, 'bob', 'my video.mp4', 10, 'video/mp4')
+        self.assertEqual(self.large_files.started, [('bob/my+video.mp4', 'video/mp4', {'upload_length': '10'})])
+        self.assertEqual(upload, ('a-large-file-id', 'my video.mp4', 10, 0, 4))
+
+
+    def test_rejects_files_fitting_in_one_part(self):
+        with self.assertRaises(exceptions.InvalidUploadError):
+            self.uploads.create(self.api_authorization, 'bob', 'small.jpg', 4, 'image/jpeg')
+        self.assertEqual(self.large_files.started, [])
+
+
+    def test_cancels_expired_uploads_of_user(self):
+        self.requests.unfinished_files.append({'fileId': 'an-old-upload-id', 'fileName': 'bob/old.mp4',
+                                               'uploadTimestamp': (self.now - 7200) * 1000})
+        self.uploads.create(self.api_authorization, 'bob', 'my video.mp4', 10, 'video/mp4')
+        self.assertEqual(self.large_files.cancelled, ['an-old-upload-id'])
+        self.assertEqual(self.requests.listings[0]['namePrefix'], 'bob/')
+
+
+
+
+class TestCancelExpired(TestResumableUploadsBase):
+
+    def setUp(self):
+        super(TestCancelExpired, self).setUp()
+        for index in range(250):
+            self.requests.unfinished_files.append({'fileId': f'old-upload-id-{index}', 'fileName': f'user{index}/old.mp4',
+                                                   'uploadTimestamp': (self.now - 7200) * 1000})
+
+
+    def test_pages_through_uploads_of_every_user(self):
+        cancelled = self.uploads.cancel_expired(self.api_authorization)
+        self.assertEqual(cancelled, 250)
+        self.assertEqual(self.large_files.cancelled, [f'old-upload-id-{index}' for index in range(250)])
+        self.assertEqual([listing['namePrefix'] for listing in self.requests.listings], ['', '', ''])
+
+
+    def test_cancels_only_uploads_with_prefix(self):
+        self.assertEqual(self.uploads.cancel_expired(self.api_authorization, 'user12/'), 1)
+        self.assertEqual(self.large_files.cancelled, ['old-upload-id-12'])
+
+
+
+
+class TestGet(TestResumableUploadsBase):
+
+    def test_offset_is_size_of_uploaded_parts(self):
+        self.add_parts(b'0123', b'4567')
+        upload = self.uploads.get(self.api_authorization, 'bob', 'an-upload-id')
+        self.assertEqual(upload, ('an-upload-id', 'my video.mp4', 10, 8, 4))
+
+
+    def test_lists_from_upload_id_in_user_prefix(self):
+        self.uploads.get(self.api_authorization, 'bob', 'an-upload-id')
+        self.assertEqual(self.requests.listings[0], {'bucketId': 'bucket_id', 'namePrefix': 'bob/',
+                                                     'maxFileCount': 1, 'startFileId': 'an-upload-id'})
+
+
+    def test_offset_stops_at_first_missing_part(self):
+        self.add_parts(b'0123', b'4567')
+        self.requests.parts[1]['partNumber'] = 3
+        self.assertEqual(self.uploads.get(self.api_authorization, 'bob', 'an-upload-id').offset, 4)
+
+
+    def test_pages_through_parts(self):
+        self.requests.parts_page_size = 1
+        self.add_parts(b'0123', b'4567', b'89')
+        self.assertEqual(self.uploads.get(self.api_authorization, 'bob', 'an-upload-id').offset, 10)
+
+
+    def test_raises_if_upload_is_not_listed_first(self):
+        with self.assertRaises(exceptions.ContentNotFoundError):
+            self.uploads.get(self.api_authorization, 'bob', 'another-upload-id')
+
+
+    def test_raises_if_upload_id_is_malformed(self):
+        self.requests.list_status_code = 400
+        with self.assertRaises(exceptions.ContentNotFoundError):
+            self.uploads.get(self.api_authorization, 'bob', 'not an id')
+
+
+    def test_cancels_expired_upload(self):
+        self.now += 3600
+        with self.assertRaises(exceptions.ContentNotFoundError):
+            self.uploads.get(self.api_authorization, 'bob', 'an-upload-id')
+        self.assertEqual(self.large_files.cancelled, ['an-upload-id'])
+
+
+
+
+class TestAppend(TestResumableUploadsBase):
+
+    def append(self, offset, chunk):
+        return self.uploads.append(self.api_authorization, 'bob', 'an-upload-id', offset, BytesIO(chunk), len(chunk))
+
+
+    def test_streams_chunk_as_next_part(self):
+        self.add_parts(b'0123')
+        new_offset = self.append(4, b'4567')
+        self.assertEqual(new_offset, 8)
+        headers, body = self.requests.uploaded_parts[0]
+        self.assertEqual(headers['X-Bz-Part-Number'], '2')
+        self.assertEqual(headers['X-Bz-Content-Sha1'], 'hex_digits_at_end')
+        self.assertEqual(headers['Content-Length'], '44')
+        self.assertEqual(body, b'4567' + hashlib.sha1(b'4567').hexdigest().encode())
+
+
+    def test_accepts_shorter_last_chunk(self):
+        self.add_parts(b'0123', b'4567')
+        self.assertEqual(self.append(8, b'89'), 10)
+
+
+    def test_raises_with_current_offset_if_offset_differs(self):
+        self.add_parts(b'0123')
+        with self.assertRaises(exceptions.UploadOffsetConflictError) as context:
+            self.append(0, b'0123')
+        self.assertEqual(context.exception.offset, 4)
+        self.assertEqual(self.requests.uploaded_parts, [])
+
+
+    def test_rejects_chunks_that_are_not_one_part(self):
+        with self.assertRaises(exceptions.InvalidUploadError):
+            self.append(0, b'012')
+        self.assertEqual(self.requests.uploaded_parts, [])
+
+
+    def test_raises_if_part_upload_fails(self):
+        self.requests.part_status_code = 503
+        with self.assertRaises(exceptions.ContentUploadFailedError):
+            self.append(0, b'0123')
+
+
+
+
+class TestFinish(TestResumableUploadsBase):
+
+    def test_finishes_large_file_with_part_hashes(self):
+        self.add_parts(b'0123', b'4567', b'89')
+        upload, file_info = self.uploads.finish(self.api_authorization, 'bob', 'an-upload-id')
+        expected_hashes = [hashlib.sha1(part).hexdigest() for part in (b'0123', b'4567', b'89')]
+        self.assertEqual(self.large_files.finished, [('an-upload-id', expected_hashes)])
+        self.assertEqual(upload.filename, 'my video.mp4')
+        self.assertEqual(file_info, {'fileId': 'an-upload-id'})
+
+
+    def test_raises_with_current_offset_if_incomplete(self):
+        self.add_parts(b'0123')
+        with self.assertRaises(exceptions.UploadOffsetConflictError) as context:
+            self.uploads.finish(self.api_authorization, 'bob', 'an-upload-id')
+        self.assertEqual(context.exception.offset, 4)
+        self.assertEqual(self.large_files.finished, [])
+
+
+
+
+class TestCancel(TestResumableUploadsBase):
+
+    def test_cancels_large_file(self):
+        self.uploads.cancel(self.api_authorization, 'bob', 'an-upload-id')
+        self.assertEqual(self.large_files.cancelled, ['an-upload-id'])
+
+
+    def test_does_not_cancel_uploads_of_others(self):
+        with self.assertRaises(exceptions.ContentNotFoundError):
+            self.uploads.cancel(self.api_authorization, 'bob', 'another-upload-id')
+        self.assertEqual(self.large_files.cancelled, [])
+
+
+
+
+class ResumableRequestsDouble(object):
+
+    def __init__(self):
+        self.unfinished_files = []
+        self.parts = []
+        self.parts_page_size = 1000
+        self.listings = []
+        self.uploaded_parts = []
+        self.list_status_code = 200
+        self.part_status_code = 200
+
+
+    def post(self, url, headers, json=None, data=None):
+        if url == 'https://upload.example.com/part':
+            self.uploaded_parts.append((headers, b''.join(data)))
+            return ResponseDouble(self.part_status_code)
+        if url.endswith(resumable._LIST_UNFINISHED_RELATIVE_URL):
+            return self._list_unfinished_files(json)
+        return self._list_parts(json)
+
+
+    def _list_unfinished_files(self, json):
+        self.listings.append(json)
+        files = [unfinished_file for unfinished_file in self.unfinished_files
+                 if unfinished_file['fileName'].startswith(json['namePrefix'])]
+        if 'startFileId' in json:
+            file_ids = [unfinished_file['fileId'] for unfinished_file in files]
+            files = files[file_ids.index(json['startFileId']):] if json['startFileId'] in file_ids else []
+        next_file_id = files[json['maxFileCount']]['fileId'] if len(files) > json['maxFileCount'] else None
+        return ResponseDouble(self.list_status_code, {'files': files[:json['maxFileCount']], 'nextFileId': next_file_id})
+
+
+    def _list_parts(self, json):
+        start = json['startPartNumber'] - 1
+        parts = self.parts[start:start + self.parts_page_size]
+        next_part_number = start + self.parts_page_size + 1 if start + self.parts_page_size < len(self.parts) else None
+        return ResponseDouble(200, {'parts': parts, 'nextPartNumber': next_part_number})
+
+
+
+class ResponseDouble(common.ResponseDouble):
+
+    def __init__(self, status_code, json=None):
+        super(ResponseDouble, self).__init__(status_code)
+        self._json = json or {}
+
+
+    def json(self):
+        return self._json
+
+
+
+class LargeFileUploaderDouble(object):
+
+    def __init__(self):
+        self.part_size = 4
+        self.started = []
+        self.finished = []
+        self.cancelled = []
+
+
+    def start_large_file(self, api_authorization, b2_filename, content_type, file_info=None):
+        self.started.append((b2_filename, content_type, file_info))
+        return 'a-large-file-id'
+
+
+    def finish_large_file(self, api_authorization, file_id, part_hashes):
+        self.finished.append((file_id, part_hashes))
+        return {'fileId': file_id}
+
+
+    def cancel_large_file(self, api_authorization, file_id):
+        self.cancelled.append(file_id)
+
+
+
+class AuthorizerDouble(object):
+
+    def authorize_upload_part(self, api_authorization, file_id):
+        return UploadAuthorization('https://upload.example.com/part', 'part_token')
+
+
+
+Authorization = namedtuple('Authorization', ['api_url', 'token'])
+UploadAuthorization = namedtuple('UploadAuthorization', ['upload_url', 'token'])
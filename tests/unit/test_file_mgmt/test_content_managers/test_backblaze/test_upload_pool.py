@@ -0,0 +1,171 @@
+from collections import namedtuple
+import os
+import unittest
+
+import src.file_mgmt.content_managers.backblaze.upload_pool as upload_pool
+import src.file_mgmt.content_managers.exceptions as exceptions
+import tests.unit.test_file_mgmt.test_content_managers.common as common
+
+
+
+class TestUploadUrlPool(unittest.TestCase):
+
+    def setUp(self):
+        os.environ[upload_pool._ENV_BUCKET_ID] = 'bucket_id'
+        self.authorizer = AuthorizerDouble()
+        self.clock = common.ClockDouble()
+        self.pool = upload_pool.UploadUrlPool(self.authorizer, max_size=2, max_credentials=2, clock=self.clock)
+        self.api_authorization = 'api authorization'
+
+
+    def tearDown(self):
+        os.environ.pop(upload_pool._ENV_BUCKET_ID)
+
+
+    def test_requests_new_upload_url_when_pool_is_empty(self):
+        upload_authorization = self.pool.checkout('my:creds', self.api_authorization)
+        self.assertEqual(upload_authorization.upload_url, 'https://upload.example.com/1')
+        self.assertEqual(self.authorizer.invoked_authorization, self.api_authorization)
+
+
+    def test_reuses_checked_in_upload_url(self):
+        upload_authorization = self.pool.checkout('my:creds', self.api_authorization)
+        self.pool.checkin('my:creds', upload_authorization)
+        self.assertIs(self.pool.checkout('my:creds', self.api_authorization), upload_authorization)
+        self.assertEqual(self.authorizer.upload_count, 1)
+
+
+    def test_does_not_share_upload_urls_between_credentials(self):
+        upload_authorization = self.pool.checkout('my:creds', self.api_authorization)
+        self.pool.checkin('my:creds', upload_authorization)
+        other_authorization = self.pool.checkout('other:creds', self.api_authorization)
+        self.assertIsNot(other_authorization, upload_authorization)
+
+
+    def test_does_not_reuse_discarded_upload_url(self):
+        upload_authorization = self.pool.checkout('my:creds', self.api_authorization)
+        self.pool.discard('my:creds', upload_authorization)
+        self.assertIsNot(self.pool.checkout('my:creds', self.api_authorization), upload_authorization)
+        self.assertEqual(self.pool.stats['discarded'], 1)
+
+
+    def test_grows_on_demand_while_upload_urls_are_checked_out(self):
+        first = self.pool.checkout('my:creds', self.api_authorization)
+        second = self.pool.checkout('my:creds', self.api_authorization)
+        self.assertIsNot(first, second)
+        self.assertEqual(self.pool.stats, {'idle': 0, 'checked_out': 2, 'created': 2, 'discarded': 0})
+
+
+    def test_raises_if_no_upload_url_is_returned_once_pool_is_full(self):
+        self.pool.checkout('my:creds', self.api_authorization)
+        self.pool.checkout('my:creds', self.api_authorization)
+        upload_pool._CHECKOUT_TIMEOUT_SECONDS, timeout = 0, upload_pool._CHECKOUT_TIMEOUT_SECONDS
+        try:
+            with self.assertRaises(exceptions.ContentUploadFailedError):
+                self.pool.checkout('my:creds', self.api_authorization)
+        finally:
+            upload_pool._CHECKOUT_TIMEOUT_SECONDS = timeout
+
+
+    def test_lent_upload_url_does_not_count_against_pool(self):
+        lent = self.pool.lend('my:creds', self.api_authorization)
+        self.assertEqual(lent.upload_url, 'https://upload.example.com/1')
+        self.assertEqual(self.pool.stats['checked_out'], 0)
+
+
+    def test_lends_idle_upload_url_if_available(self):
+        upload_authorization = self.pool.checkout('my:creds', self.api_authorization)
+        self.pool.checkin('my:creds', upload_authorization)
+        self.assertIs(self.pool.lend('my:creds', self.api_authorization), upload_authorization)
+        self.assertEqual(self.pool.stats['idle'], 0)
+
+
+    def test_takes_back_lent_upload_url(self):
+        lent = self.pool.lend('my:creds', self.api_authorization)
+        self.pool.give_back('my:creds', lent)
+        self.assertIs(self.pool.checkout('my:creds', self.api_authorization), lent)
+
+
+    def test_takes_back_lent_upload_url_only_once(self):
+        lent = self.pool.lend('my:creds', self.api_authorization)
+        self.pool.give_back('my:creds', lent)
+        self.pool.give_back('my:creds', lent)
+        self.assertEqual(self.pool.stats['idle'], 1)
+
+
+    def test_ignores_upload_url_that_was_not_lent(self):
+        self.pool.give_back('my:creds', UploadAuthorization('https://attacker.example.com', 'upload_token'))
+        self.assertEqual(self.pool.stats['idle'], 0)
+
+
+    def test_ignores_lent_upload_url_with_other_token(self):
+        lent = self.pool.lend('my:creds', self.api_authorization)
+        self.pool.give_back('my:creds', UploadAuthorization(lent.upload_url, 'other_token'))
+        self.assertEqual(self.pool.stats['idle'], 0)
+
+
+    def test_ignores_upload_url_lent_for_other_credentials(self):
+        lent = self.pool.lend('other:creds', self.api_authorization)
+        self.pool.give_back('my:creds', lent)
+        self.assertEqual(self.pool.stats['idle'], 0)
+
+
+    def test_drops_given_back_upload_url_if_pool_is_full(self):
+        lent = self.pool.lend('my:creds', self.api_authorization)
+        self.pool.checkout('my:creds', self.api_authorization)
+        self.pool.checkout('my:creds', self.api_authorization)
+        self.pool.give_back('my:creds', lent)
+        self.assertEqual(self.pool.stats['idle'], 0)
+
+
+    def test_drops_idle_upload_urls_of_least_recently_used_credentials(self):
+        for credentials in ('first:creds', 'second:creds', 'third:creds'):
+            self.pool.checkin(credentials, self.pool.checkout(credentials, self.api_authorization))
+        self.assertEqual(self.pool.stats['idle'], 2)
+        self.pool.checkout('first:creds', self.api_authorization)
+        self.assertEqual(self.authorizer.upload_count, 4)
+
+
+    def test_drops_idle_upload_urls_before_backblaze_expires_them(self):
+        self.pool.checkin('my:creds', self.pool.checkout('my:creds', self.api_authorization))
+        self.clock.now += upload_pool._IDLE_TTL_SECONDS
+        self.pool.checkout('my:creds', self.api_authorization)
+        self.assertEqual(self.authorizer.upload_count, 2)
+
+
+    def test_forgets_credentials_without_checked_out_upload_urls(self):
+        self.pool.discard('my:creds', self.pool.checkout('my:creds', self.api_authorization))
+        self.assertEqual(self.pool._checked_out, {})
+
+
+    def test_releases_slot_if_upload_authorization_fails(self):
+        self.authorizer.should_raise = True
+        with self.assertRaises(ExceptionDummy):
+            self.pool.checkout('my:creds', self.api_authorization)
+        self.assertEqual(self.pool.stats['checked_out'], 0)
+
+
+
+
+class AuthorizerDouble(object):
+
+    def __init__(self):
+        self.invoked_authorization = None
+        self.upload_count = 0
+        self.should_raise = False
+
+
+    def authorize_upload(self, api_authorization):
+        self.invoked_authorization = api_authorization
+        if self.should_raise:
+            raise ExceptionDummy()
+        self.upload_count += 1
+        return UploadAuthorization(f'https://upload.example.com/{self.upload_count}', 'upload_token')
+
+
+
+UploadAuthorization = namedtuple('UploadAuthorization', ['upload_url', 'token'])
+
+
+class ExceptionDummy(Exception):
+    pass
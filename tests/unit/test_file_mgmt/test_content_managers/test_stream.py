@@ -0,0 +1,60 @@
+import unittest
+
+import src.file_mgmt.content_managers.stream as stream
+import tests.unit.test_file_mgmt.test_content_managers.common as common
+
+
+
+class TestContentStream(unittest.TestCase):
+
+    def setUp(self):
+        self.response = StreamedResponseDouble(200)
+        self.stream = stream.ContentStream(self.response, chunk_size=4)
+
+
+    def test_reads_length_and_type_from_headers(self):
+        self.assertEqual(self.stream.content_length, 8)
+        self.assertEqual(self.stream.content_type, 'text/plain')
+
+
+    def test_content_range_is_none_for_whole_content(self):
+        self.assertIsNone(self.stream.content_range)
+
+
+    def test_reads_content_range_of_partial_content(self):
+        self.response.headers['Content-Range'] = 'bytes 0-7/20'
+        self.assertEqual(stream.ContentStream(self.response).content_range, 'bytes 0-7/20')
+
+
+    def test_content_length_is_none_if_not_sent(self):
+        self.response.headers = {}
+        self.assertIsNone(stream.ContentStream(self.response).content_length)
+
+
+    def test_yields_chunks_of_configured_size(self):
+        self.assertEqual(list(self.stream), [b'some', b'text'])
+        self.assertEqual(self.response.invoked_chunk_size, 4)
+
+
+    def test_closes_response_once_exhausted(self):
+        list(self.stream)
+        self.assertTrue(self.response.closed)
+
+
+    def test_close_releases_response(self):
+        self.stream.close()
+        self.assertTrue(self.response.closed)
+
+
+
+class StreamedResponseDouble(common.ResponseDouble):
+
+    def __init__(self, status_code):
+        super(StreamedResponseDouble, self).__init__(status_code)
+        self.headers = {'Content-Length': '8', 'Content-Type': 'text/plain'}
+        self.invoked_chunk_size = None
+
+
+    def iter_content(self, chunk_size):
+        self.invoked_chunk_size = chunk_size
+        return iter([b'some', b'text'])
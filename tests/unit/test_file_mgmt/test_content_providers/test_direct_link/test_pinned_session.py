@@ -0,0 +1,62 @@
+import http.server
+import threading
+import unittest
+
+import requests
+
+import src.file_mgmt.content_providers.direct_link.pinned_session as pinned_session
+
+
+
+class TestPinnedSession(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.HTTPServer(('127.0.0.1', 0), HostEchoHandler)
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+        self.session = pinned_session.open_pinned_session('files.invalid', '127.0.0.1')
+
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+    def test_connects_to_pinned_address_with_original_host_header(self):
+        response = self.session.get(f'http://files.invalid:{self.server.server_port}/a.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, f'files.invalid:{self.server.server_port}')
+
+
+    def test_streamed_response_can_be_read_after_session_is_closed(self):
+        response = self.session.get(f'http://files.invalid:{self.server.server_port}/a.png', stream=True)
+        self.session.close()
+        self.assertEqual(response.raw.read(), f'files.invalid:{self.server.server_port}'.encode())
+        response.close()
+
+
+    def test_refuses_other_hosts(self):
+        with self.assertRaises(requests.exceptions.InvalidURL):
+            self.session.get(f'http://other.invalid:{self.server.server_port}/a.png')
+
+
+    def test_verifies_tls_against_hostname(self):
+        pool = self.session.get_adapter('https://files.invalid').poolmanager.connection_from_url('https://127.0.0.1/')
+        self.assertEqual(pool.assert_hostname, 'files.invalid')
+        self.assertEqual(pool.conn_kw['server_hostname'], 'files.invalid')
+
+
+
+
+class HostEchoHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        body = self.headers['Host'].encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, format, *args):
+        pass
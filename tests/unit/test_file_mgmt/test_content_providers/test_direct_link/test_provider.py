@@ -0,0 +1,172 @@
+from io import BytesIO
+import unittest
+
+import src.file_mgmt.content_providers as providers
+from src.file_mgmt.content_providers.exceptions import ContentDownloadFailedError, ContentTooLargeError
+
+
+class TestDirectLinkContentProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = RequestsDouble()
+        self.opened_sessions = []
+        self.addresses = {'example.com': {'93.184.216.34'}, 'cdn.example.com': {'93.184.216.35'}}
+        self.provider = providers.DirectLinkContentProvider(self.open_session, max_size=100, resolve=self.addresses.get)
+        self.url = 'https://example.com/pictures/a%20cat.png'
+
+
+    def open_session(self, hostname, address):
+        self.opened_sessions.append((hostname, address))
+        return self.requests
+
+
+    def test_link_is_the_only_file(self):
+        self.assertEqual(self.provider.get_links(self.url), [self.url])
+
+
+    def test_checks_size_with_head_before_streaming_body(self):
+        file = self.provider.download(self.url)
+        self.assertEqual(self.requests.invocations, [('head', self.url), ('get', self.url)])
+        self.assertTrue(self.requests.invoked_stream)
+        self.assertEqual(file.filename, 'a cat.png')
+        self.assertEqual(file.mimetype, 'image/png')
+        self.assertEqual(file.read(), b'some file content')
+
+
+    def test_closes_head_response_and_session_of_every_hop(self):
+        self.requests.redirects[self.url] = 'https://cdn.example.com/cat.png'
+        self.provider.download(self.url)
+        self.assertEqual(self.requests.close_count, len(self.opened_sessions))
+        self.assertTrue(all(response.closed for response in self.requests.responses[:-1]))
+
+
+    def test_refuses_file_larger_than_max_size_without_downloading_it(self):
+        self.requests.head_headers['Content-Length'] = '101'
+        with self.assertRaises(ContentTooLargeError):
+            self.provider.download(self.url)
+        self.assertEqual(self.requests.invocations, [('head', self.url)])
+
+
+    def test_downloads_even_if_head_is_not_allowed(self):
+        self.requests.head_status_code = 405
+        file = self.provider.download(self.url)
+        self.assertEqual(file.read(), b'some file content')
+
+
+    def test_raises_if_download_fails(self):
+        self.requests.get_status_code = 404
+        with self.assertRaises(ContentDownloadFailedError):
+            self.provider.download(self.url)
+
+
+    def test_follows_redirects(self):
+        self.requests.redirects[self.url] = 'https://cdn.example.com/cat.png'
+        file = self.provider.download(self.url)
+        self.assertEqual(self.requests.invocations[-1], ('get', 'https://cdn.example.com/cat.png'))
+        self.assertEqual(file.filename, 'cat.png')
+
+
+    def test_sends_every_request_to_checked_address(self):
+        self.requests.redirects[self.url] = 'https://cdn.example.com/cat.png'
+        self.provider.download(self.url)
+        self.assertEqual(self.opened_sessions, [('example.com', '93.184.216.34'), ('cdn.example.com', '93.184.216.35'),
+                                                ('cdn.example.com', '93.184.216.35')])
+
+
+    def test_refuses_host_with_any_private_address(self):
+        self.addresses['example.com'] = {'93.184.216.34', '10.0.0.12'}
+        with self.assertRaises(ContentDownloadFailedError):
+            self.provider.download(self.url)
+        self.assertEqual(self.opened_sessions, [])
+
+
+    def test_refuses_host_without_addresses(self):
+        self.addresses['example.com'] = set()
+        with self.assertRaises(ContentDownloadFailedError):
+            self.provider.download(self.url)
+
+
+    def test_refuses_links_to_private_addresses(self):
+        self.addresses['metadata'] = {'169.254.169.254'}
+        self.addresses['localhost'] = {'127.0.0.1', '::1'}
+        self.addresses['intranet'] = {'10.0.0.12'}
+        for url in ('http://metadata/latest/', 'http://localhost:8080/file', 'https://intranet/file'):
+            with self.assertRaises(ContentDownloadFailedError):
+                self.provider.download(url)
+        self.assertEqual(self.requests.invocations, [])
+
+
+    def test_refuses_redirects_to_private_addresses(self):
+        self.addresses['localhost'] = {'127.0.0.1'}
+        self.requests.redirects[self.url] = 'http://localhost/admin'
+        with self.assertRaises(ContentDownloadFailedError):
+            self.provider.download(self.url)
+        self.assertNotIn(('get', 'http://localhost/admin'), self.requests.invocations)
+
+
+    def test_gives_up_after_too_many_redirects(self):
+        self.requests.redirects[self.url] = self.url
+        with self.assertRaises(ContentDownloadFailedError):
+            self.provider.download(self.url)
+
+
+
+
+class RequestsDouble(object):
+
+    def __init__(self):
+        self.invocations = []
+        self.invoked_stream = False
+        self.redirects = {}
+        self.head_status_code = 200
+        self.head_headers = {'Content-Length': '17'}
+        self.get_status_code = 200
+        self.responses = []
+        self.close_count = 0
+
+
+    def head(self, url, allow_redirects=True):
+        self.invocations.append(('head', url))
+        if url in self.redirects:
+            return self._respond(302, {'Location': self.redirects[url]})
+        return self._respond(self.head_status_code, self.head_headers)
+
+
+    def get(self, url, allow_redirects=True, stream=False):
+        self.invocations.append(('get', url))
+        self.invoked_stream = stream
+        if url in self.redirects:
+            return self._respond(302, {'Location': self.redirects[url]})
+        return self._respond(self.get_status_code, {'Content-Type': 'image/png', 'Content-Length': '17'})
+
+
+    def close(self):
+        self.close_count += 1
+
+
+    def _respond(self, status_code, headers):
+        response = ResponseDouble(status_code, headers)
+        self.responses.append(response)
+        return response
+
+
+
+class ResponseDouble(object):
+
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+        self.raw = RawDouble(b'some file content')
+        self.url = None
+        self.closed = False
+
+
+    def close(self):
+        self.closed = True
+
+
+
+class RawDouble(BytesIO):
+
+    def read(self, size=None, decode_content=False):
+        return super(RawDouble, self).read(size)
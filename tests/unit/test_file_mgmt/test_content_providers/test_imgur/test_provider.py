@@ -1,8 +1,10 @@
+from io import BytesIO
 import os
 import unittest
 
 
 import src.file_mgmt.content_providers as providers
+from src.file_mgmt.content_providers.exceptions import ContentDownloadFailedError, ContentTooLargeError
 
 
 
@@ -12,7 +14,7 @@ class TestImgurContentProvider(unittest.TestCase):
         os.environ['IMGUR_CLIENT_ID'] = 'a-client-id'
         os.environ['IMGUR_CLIENT_SECRET'] = 'a-client-secret'
         self.requests = RequestsDouble()
-        self.provider = providers.ImgurContentProvider(ImgurClientDouble, self.requests)
+        self.provider = providers.ImgurContentProvider(ImgurClientDouble, self.requests, max_size=0)
         self.client = self.provider._client
         self.url = 'https://imgur.com/a/oUVDxci'
         self.files = list(self.provider.get_files(self.url))
@@ -36,6 +38,11 @@ class TestImgurContentProvider(unittest.TestCase):
         self.assertEqual(self.requests.invoked_get_urls, ['url/to/file1.png', 'url/to/file2.jpg'])
 
 
+    def test_streams_downloads(self):
+        self.assertTrue(self.requests.invoked_stream)
+        self.assertEqual(self.files[0].content_length, len(b'some file content'))
+
+
     def test_returns_file_objects(self):
         file_1 = self.files[0]
         self.assertEqual(file_1.filename, 'file1.png')
@@ -47,6 +54,30 @@ class TestImgurContentProvider(unittest.TestCase):
         self.assertEqual(file_2.read(), b'some file content')
 
 
+    def test_gets_links_without_downloading(self):
+        self.requests.invoked_get_urls = []
+        self.assertEqual(self.provider.get_links(self.url), ['url/to/file1.png', 'url/to/file2.jpg'])
+        self.assertEqual(self.requests.invoked_get_urls, [])
+
+
+    def test_download_raises_if_image_is_unavailable(self):
+        with self.assertRaises(ContentDownloadFailedError):
+            self.provider.download('url/to/missing.gif')
+
+
+    def test_download_raises_if_image_is_larger_than_max_size(self):
+        provider = providers.ImgurContentProvider(ImgurClientDouble, self.requests, max_size=4)
+        with self.assertRaises(ContentTooLargeError):
+            provider.download('url/to/file1.png')
+
+
+    def test_max_size_defaults_to_configured_max_file_size(self):
+        os.environ['FILEZAP_MAX_FILE_SIZE'] = '4'
+        provider = providers.ImgurContentProvider(ImgurClientDouble, self.requests)
+        os.environ.pop('FILEZAP_MAX_FILE_SIZE')
+        self.assertEqual(provider._max_size, 4)
+
+
 
 class ImgurClientDouble(object):
 
@@ -71,17 +102,33 @@ class RequestsDouble(object):
 
     def __init__(self):
         self.invoked_get_urls = []
+        self.invoked_stream = False
 
 
-    def get(self, url: str):
+    def get(self, url: str, stream=False):
         self.invoked_get_urls.append(url)
+        self.invoked_stream = stream
         if url.endswith('.png'):
             return ResponseDouble('png')
+        if url.endswith('.gif'):
+            return ResponseDouble('gif', 404)
         return ResponseDouble('jpg')
 
 
 class ResponseDouble(object):
 
-    def __init__(self, mime_type):
-        self.content = b'some file content'
-        self.headers = {'Content-Type': f'image/{mime_type}'}
+    def __init__(self, mime_type, status_code=200):
+        self.status_code = status_code
+        self.raw = RawDouble(b'some file content')
+        self.headers = {'Content-Type': f'image/{mime_type}', 'Content-Length': '17'}
+
+
+    def close(self):
+        pass
+
+
+
+class RawDouble(BytesIO):
+
+    def read(self, size=None, decode_content=False):
+        return super(RawDouble, self).read(size)
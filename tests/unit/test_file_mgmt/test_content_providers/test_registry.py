@@ -0,0 +1,61 @@
+import unittest
+
+import src.file_mgmt.content_providers as providers
+
+
+class TestContentProviderRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.created = []
+        self.registry = providers.ContentProviderRegistry()
+        self.registry.register(r'^https://imgur\.com/', lambda: self._create('imgur'))
+        self.registry.register(r'^https?://', lambda: self._create('direct'))
+
+
+    def test_returns_provider_of_first_matching_pattern(self):
+        self.assertEqual(self.registry.get_provider('https://imgur.com/a/oUVDxci'), 'imgur')
+        self.assertEqual(self.registry.get_provider('http://example.com/file.png'), 'direct')
+
+
+    def test_returns_none_if_no_pattern_matches(self):
+        self.assertIsNone(self.registry.get_provider('ftp://example.com/file.png'))
+
+
+    def test_creates_each_provider_once(self):
+        self.registry.get_provider('https://imgur.com/a/oUVDxci')
+        self.registry.get_provider('https://imgur.com/a/another')
+        self.assertEqual(self.created, ['imgur'])
+
+
+    def test_does_not_create_providers_until_needed(self):
+        self.assertEqual(self.created, [])
+
+
+    # Helper
+    def _create(self, name):
+        self.created.append(name)
+        return name
+
+
+
+class TestDefaultRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = providers.create_default_registry()
+        self.registry._providers = {}
+        for pattern, factory in self.registry._entries:
+            self.registry._providers[pattern] = factory.__name__
+
+
+    def test_sends_imgur_urls_to_imgur_provider(self):
+        self.assertEqual(self.registry.get_provider('https://imgur.com/a/oUVDxci'), 'ImgurContentProvider')
+        self.assertEqual(self.registry.get_provider('https://www.imgur.com/a/oUVDxci'), 'ImgurContentProvider')
+
+
+    def test_sends_other_links_to_direct_link_provider(self):
+        self.assertEqual(self.registry.get_provider('https://i.imgur.com/file.png'), 'DirectLinkContentProvider')
+        self.assertEqual(self.registry.get_provider('http://example.com/file.png'), 'DirectLinkContentProvider')
+
+
+    def test_does_not_support_other_schemes(self):
+        self.assertIsNone(self.registry.get_provider('file:///etc/passwd'))
@@ -0,0 +1,107 @@
+import io
+import unittest
+
+from src.file_mgmt.content_providers.exceptions import ContentDownloadFailedError, ContentTooLargeError
+import src.file_mgmt.content_providers.remote_file as remote_file
+
+
+class TestRemoteFile(unittest.TestCase):
+
+    def setUp(self):
+        self.response = ResponseDouble(b'0123456789', {'Content-Type': 'image/png', 'Content-Length': '10'})
+        self.file = remote_file.RemoteFile(self.response, 'file.png')
+
+
+    def test_uses_response_headers(self):
+        self.assertEqual(self.file.filename, 'file.png')
+        self.assertEqual(self.file.mimetype, 'image/png')
+        self.assertEqual(self.file.content_length, 10)
+
+
+    def test_reads_in_chunks(self):
+        self.assertEqual(self.file.read(4), b'0123')
+        self.assertEqual(self.file.tell(), 4)
+        self.assertEqual(self.file.read(), b'456789')
+        self.assertEqual(self.file.read(4), b'')
+
+
+    def test_can_only_rewind_before_reading(self):
+        self.assertEqual(self.file.seek(0), 0)
+        self.file.read(1)
+        with self.assertRaises(io.UnsupportedOperation):
+            self.file.seek(0)
+
+
+    def test_raises_if_announced_size_exceeds_max_size(self):
+        with self.assertRaises(ContentTooLargeError):
+            remote_file.RemoteFile(self.response, 'file.png', max_size=9)
+        self.assertTrue(self.response.closed)
+
+
+    def test_raises_once_received_size_exceeds_max_size(self):
+        response = ResponseDouble(b'0123456789', {})
+        file = remote_file.RemoteFile(response, 'file.png', max_size=6)
+        file.read(4)
+        with self.assertRaises(ContentTooLargeError):
+            file.read(4)
+        self.assertTrue(response.closed)
+
+
+    def test_raises_if_body_ends_early(self):
+        response = ResponseDouble(b'01234', {'Content-Length': '10'})
+        file = remote_file.RemoteFile(response, 'file.png')
+        file.read(5)
+        with self.assertRaises(ContentDownloadFailedError):
+            file.read(5)
+
+
+    def test_ignores_content_length_of_compressed_body(self):
+        response = ResponseDouble(b'0123456789', {'Content-Length': '4', 'Content-Encoding': 'gzip'})
+        self.assertIsNone(remote_file.RemoteFile(response, 'file.png').content_length)
+
+
+
+class TestOpenRemoteFile(unittest.TestCase):
+
+    def test_streams_response_with_content_length(self):
+        response = ResponseDouble(b'0123456789', {'Content-Length': '10'})
+        file = remote_file.open_remote_file(response, 'file.png')
+        self.assertIsInstance(file, remote_file.RemoteFile)
+
+
+    def test_spools_response_without_content_length(self):
+        response = ResponseDouble(b'0123456789', {'Content-Type': 'image/png'})
+        file = remote_file.open_remote_file(response, 'file.png')
+        self.assertEqual(file.filename, 'file.png')
+        self.assertEqual(file.mimetype, 'image/png')
+        self.assertEqual(file.read(), b'0123456789')
+        file.seek(0, 2)
+        self.assertEqual(file.tell(), 10)
+        self.assertTrue(response.closed)
+
+
+    def test_spooling_respects_max_size(self):
+        response = ResponseDouble(b'0123456789', {})
+        with self.assertRaises(ContentTooLargeError):
+            remote_file.open_remote_file(response, 'file.png', max_size=5)
+
+
+
+
+class ResponseDouble(object):
+
+    def __init__(self, content, headers):
+        self.raw = RawDouble(content)
+        self.headers = headers
+        self.closed = False
+
+
+    def close(self):
+        self.closed = True
+
+
+
+class RawDouble(io.BytesIO):
+
+    def read(self, size=None, decode_content=False):
+        return super(RawDouble, self).read(size)
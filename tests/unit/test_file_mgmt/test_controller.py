@@ -1,7 +1,13 @@
 from collections import namedtuple
 import unittest
 
+import src.file_mgmt.content_managers as content_managers
+import src.file_mgmt.content_providers as content_providers
 import src.file_mgmt.controller as controller
+import src.file_mgmt.datastore as datastore
+from src.file_mgmt.importer import ConcurrentImporter
+from src.file_mgmt.model import FilePage
+import src.jobs as jobs
 
 
 class TestFileMgmtControllerBase(unittest.TestCase):
@@ -40,6 +46,17 @@ class TestGetFiles(TestFileMgmtControllerBase):
 
 
 
+class TestGetFilesPage(TestFileMgmtControllerBase):
+
+    def test_invokes_data_store_with_page_size_and_token(self):
+        page = self.controller.get_files_page('steve', 25, 'a-token')
+        self.assertEqual(self.data_store.invoked_username, 'steve')
+        self.assertEqual(self.data_store.invoked_page, (25, 'a-token'))
+        self.assertEqual(page, ('files', 'next-token'))
+
+
+
+
 class TestGetFile(TestFileMgmtControllerBase):
 
     def setUp(self):
@@ -63,6 +80,114 @@ class TestGetFile(TestFileMgmtControllerBase):
 
 
 
+class TestLoadContent(TestFileMgmtControllerBase):
+
+    def setUp(self):
+        super(TestLoadContent, self).setUp()
+        self.file = FileDouble()
+        self.returned_file = self.controller.load_content(self.file, self.user)
+
+
+    def test_does_not_invoke_data_store(self):
+        self.assertIsNone(self.data_store.invoked_content_id)
+
+
+    def test_invokes_content_manager_with_file_content_id(self):
+        self.assertEqual(self.content_manager.invoked_content_id, 'some_id')
+        self.assertEqual(self.content_manager.invoked_credentials, self.user.content_credentials)
+
+
+    def test_returns_file_with_content(self):
+        self.assertIs(self.returned_file, self.file)
+        self.assertEqual(self.file.content, b'these are file contents')
+
+
+    def test_passes_byte_range_to_content_manager(self):
+        self.assertIsNone(self.content_manager.invoked_byte_range)
+        self.controller.load_content(self.file, self.user, (0, 100))
+        self.assertEqual(self.content_manager.invoked_byte_range, (0, 100))
+
+
+
+class TestGetFileInfo(TestFileMgmtControllerBase):
+
+    def setUp(self):
+        super(TestGetFileInfo, self).setUp()
+        self.file = self.controller.get_file_info(self.content_id, self.user)
+
+
+    def test_invokes_data_store(self):
+        self.assertEqual(self.data_store.invoked_content_id, self.content_id)
+        self.assertEqual(self.data_store.invoked_username, self.user.username)
+
+
+    def test_does_not_invoke_content_manager(self):
+        self.assertIsNone(self.content_manager.invoked_content_id)
+        self.assertIsNone(self.file.content)
+
+
+
+
+class TestGetDownloadUrl(TestFileMgmtControllerBase):
+
+    def setUp(self):
+        super(TestGetDownloadUrl, self).setUp()
+        self.download_url = self.controller.get_download_url(self.content_id, self.user)
+
+
+    def test_invokes_data_store(self):
+        self.assertEqual(self.data_store.invoked_content_id, self.content_id)
+        self.assertEqual(self.data_store.invoked_username, self.user.username)
+
+
+    def test_invokes_content_manager_with_stored_names(self):
+        self.assertEqual(self.content_manager.invoked_content_id, self.content_id)
+        self.assertIs(self.content_manager.invoked_user, self.user)
+        self.assertEqual(self.content_manager.invoked_filename, 'file.jpg')
+        self.assertEqual(self.content_manager.invoked_content_name, 'bob/file.jpg')
+
+
+    def test_returns_download_url(self):
+        self.assertEqual(self.download_url, 'https://download.example.com/bob/file.jpg')
+
+
+    def test_file_download_url_does_not_invoke_data_store(self):
+        self.data_store.invoked_content_id = None
+        download_url = self.controller.get_file_download_url(FileDouble(), self.user)
+        self.assertIsNone(self.data_store.invoked_content_id)
+        self.assertEqual(download_url, 'https://download.example.com/bob/file.jpg')
+
+
+
+
+class TestGetZip(TestFileMgmtControllerBase):
+
+    def test_reads_files_by_id_lazily_and_skips_unknown_ids(self):
+        zip_stream = self.controller.get_zip(['id1', 'id2'], self.user)
+        self.assertIsNone(self.data_store.invoked_content_id)
+        self.data_store.missing_content_ids = {'id1'}
+        files = list(zip_stream._files)
+        self.assertEqual(len(files), 1)
+        self.assertEqual(self.data_store.invoked_content_id, 'id2')
+
+
+    def test_pages_through_all_files(self):
+        self.data_store.pages = {None: (['file1', 'file2'], 'next-token'), 'next-token': (['file3'], None)}
+        zip_stream = self.controller.get_zip(None, self.user)
+        self.assertEqual(list(zip_stream._files), ['file1', 'file2', 'file3'])
+        self.assertEqual(self.data_store.invoked_page, (controller._ZIP_PAGE_SIZE, 'next-token'))
+
+
+    def test_opens_content_with_user_credentials(self):
+        zip_stream = self.controller.get_zip(['id1'], self.user)
+        content = zip_stream._open_content(FileDouble())
+        self.assertEqual(content, b'these are file contents')
+        self.assertEqual(self.content_manager.invoked_content_id, 'some_id')
+        self.assertEqual(self.content_manager.invoked_credentials, self.credentials)
+
+
+
+
 class TestDeleteFile(TestFileMgmtControllerBase):
 
     def setUp(self):
@@ -80,14 +205,23 @@ class TestDeleteFile(TestFileMgmtControllerBase):
         self.assertEqual(self.content_manager.invoked_credentials, self.credentials)
 
 
+    def test_passes_stored_content_name_to_content_manager(self):
+        self.assertEqual(self.content_manager.invoked_content_name, 'bob/file.jpg')
+
+
+    def test_content_manager_looks_up_content_name_if_file_is_not_stored(self):
+        self.data_store.file_exists = False
+        self.controller.delete_file(self.content_id, self.user)
+        self.assertIsNone(self.content_manager.invoked_content_name)
+
+
     def test_does_not_invoke_data_store_if_content_manager_raises_exception(self):
-        self.data_store.invoked_content_id = None # Clear the invocation from setUp
+        self.data_store.removed_content_id = None # Clear the invocation from setUp
         self.data_store.invoked_username = None   # Clear the invocation from setUp
         self.content_manager.should_raise = True
         with self.assertRaises(ExceptionDummy):
             self.controller.delete_file(self.content_id, self.user)
-        self.assertIsNone(self.data_store.invoked_content_id)
-        self.assertIsNone(self.data_store.invoked_username)
+        self.assertIsNone(self.data_store.removed_content_id)
 
 
 
@@ -111,6 +245,13 @@ class TestSaveFile(TestFileMgmtControllerBase):
         self.assertEqual(self.data_store.invoked_file.content_id, 'a-new-content-id')
 
 
+    def test_stores_uploaded_content_metadata(self):
+        self.assertEqual(self.data_store.invoked_file.content_name, 'bob/file.jpg')
+        self.assertEqual(self.data_store.invoked_file.size, 42)
+        self.assertEqual(self.data_store.invoked_file.sha1, 'a-sha1')
+        self.assertEqual(self.data_store.invoked_file.content_type, 'image/jpeg')
+
+
     def test_does_not_invoke_data_store_if_content_manager_raises_exception(self):
         self.data_store.invoked_file = None # Clear invocation from setUp
         self.content_manager.should_raise = True
@@ -121,33 +262,262 @@ class TestSaveFile(TestFileMgmtControllerBase):
 
 
 
+class TestSaveFiles(TestFileMgmtControllerBase):
+
+    def setUp(self):
+        super(TestSaveFiles, self).setUp()
+        self.files = [FileDouble(), FileDouble()]
+
+
+    def test_uploads_every_file(self):
+        self.controller.save_files(self.files, self.user)
+        self.assertEqual(self.content_manager.upload_count, 2)
+
+
+    def test_stores_files_in_one_batch(self):
+        saved, failed = self.controller.save_files(self.files, self.user)
+        self.assertEqual(self.data_store.invoked_batches, [saved])
+        self.assertEqual([file.content_id for file in saved], ['a-new-content-id', 'a-new-content-id'])
+        self.assertEqual(failed, [])
+        self.assertEqual(self.data_store.added_file_count, 0)
+
+
+    def test_returns_files_that_failed_and_stores_the_others(self):
+        self.files[1].filename = 'broken.jpg'
+        self.content_manager.failing_filenames = {'broken.jpg'}
+        saved, failed = self.controller.save_files(self.files, self.user)
+        self.assertEqual([file.filename for file in saved], ['file.jpg'])
+        self.assertEqual(failed, [self.files[1]])
+        self.assertEqual(self.data_store.invoked_batches, [saved])
+
+
+    def test_raises_data_store_error_after_uploads(self):
+        self.data_store.add_files_error = datastore.UnprocessedItemsError()
+        with self.assertRaises(datastore.UnprocessedItemsError):
+            self.controller.save_files(self.files, self.user)
+        self.assertEqual(self.content_manager.upload_count, 2)
+
+
+    def test_retries_failed_upload_from_start_of_file(self):
+        self.files[1].filename = 'broken.jpg'
+        self.content_manager.failing_filenames = {'broken.jpg'}
+        self.controller.save_files(self.files, self.user)
+        self.assertEqual(self.files[1].seek_count, self.controller._importer.attempts)
+
+
+
+
+class TestUploadSession(TestFileMgmtControllerBase):
+
+    def test_create_upload_session_invokes_content_manager(self):
+        upload_session = self.controller.create_upload_session(self.user)
+        self.assertIs(self.content_manager.invoked_user, self.user)
+        self.assertEqual(upload_session, 'an upload session')
+
+
+    def test_end_upload_session_invokes_content_manager(self):
+        self.controller.end_upload_session(self.user, 'https://upload.example.com', 'a-token')
+        self.assertIs(self.content_manager.invoked_user, self.user)
+        self.assertEqual(self.content_manager.ended_upload_session, ('https://upload.example.com', 'a-token'))
+
+
+
+
+class TestCompleteUpload(TestFileMgmtControllerBase):
+
+    def setUp(self):
+        super(TestCompleteUpload, self).setUp()
+        self.file = self.controller.complete_upload('a-new-content-id', 'direct.jpg', self.user)
+
+
+    def test_verifies_upload_with_content_manager(self):
+        self.assertEqual(self.content_manager.invoked_content_id, 'a-new-content-id')
+        self.assertIs(self.content_manager.invoked_user, self.user)
+
+
+    def test_invokes_data_store(self):
+        self.assertIs(self.data_store.invoked_file, self.file)
+        self.assertEqual(self.file.owner, self.user.username)
+        self.assertEqual(self.file.filename, 'direct.jpg')
+        self.assertEqual(self.file.content_name, 'bob/file.jpg')
+        self.assertEqual(self.file.size, 42)
+
+
+    def test_does_not_invoke_data_store_if_verification_fails(self):
+        self.data_store.invoked_file = None # Clear invocation from setUp
+        self.content_manager.should_raise = True
+        with self.assertRaises(ExceptionDummy):
+            self.controller.complete_upload('a-new-content-id', 'direct.jpg', self.user)
+        self.assertIsNone(self.data_store.invoked_file)
+
+
+
+
+class TestResumableUpload(TestFileMgmtControllerBase):
+
+    def test_creates_upload_through_content_manager(self):
+        upload = self.controller.create_resumable_upload('video.mp4', 100, 'video/mp4', self.user)
+        self.assertEqual(upload, 'an upload')
+        self.assertEqual(self.content_manager.invoked_resumable, ('create', self.user, 'video.mp4', 100, 'video/mp4'))
+
+
+    def test_appends_chunk_through_content_manager(self):
+        offset = self.controller.append_to_resumable_upload('an-upload-id', 0, 'a stream', 10, self.user)
+        self.assertEqual(offset, 10)
+        self.assertEqual(self.content_manager.invoked_resumable, ('append', self.user, 'an-upload-id', 0, 'a stream', 10))
+
+
+    def test_stores_finished_upload(self):
+        file = self.controller.finish_resumable_upload('an-upload-id', self.user)
+        self.assertEqual(self.content_manager.invoked_resumable, ('finish', self.user, 'an-upload-id'))
+        self.assertIs(self.data_store.invoked_file, file)
+        self.assertEqual(file.filename, 'video.mp4')
+        self.assertEqual(file.content_id, 'an-upload-id')
+        self.assertEqual(file.owner, 'bob')
+
+
+    def test_does_not_store_upload_that_failed_to_finish(self):
+        self.content_manager.should_raise = True
+        with self.assertRaises(ExceptionDummy):
+            self.controller.finish_resumable_upload('an-upload-id', self.user)
+        self.assertEqual(self.data_store.added_file_count, 0)
+
+
+    def test_cancels_upload_through_content_manager(self):
+        self.controller.cancel_resumable_upload('an-upload-id', self.user)
+        self.assertEqual(self.content_manager.invoked_resumable, ('cancel', self.user, 'an-upload-id'))
+
+
+
+
 class TestSaveFileFrom(TestFileMgmtControllerBase):
 
+    def setUp(self):
+        super(TestSaveFileFrom, self).setUp()
+        self.url = 'https://imgur.com/a/oUVDxci'
+
+
     def test_raises_if_url_is_not_supported(self):
         with self.assertRaises(controller.URLNotSupportedError):
             self.controller.save_file_from('invalid_url', self.user)
 
 
     def test_handles_imgur_url(self):
-        url = 'https://imgur.com/a/oUVDxci'
-        self.controller.save_file_from(url, self.user)
-        self.assertEqual(self.controller.imgur_provider.invoked_url, url)
+        self.controller.save_file_from(self.url, self.user)
+        self.assertEqual(self.controller.imgur_provider.invoked_url, self.url)
         self.assertEqual(self.content_manager.invoked_file.filename, 'file.jpg')
         self.assertIs(self.content_manager.invoked_user, self.user)
         self.assertEqual(self.content_manager.upload_count, 3)
-        self.assertEqual(self.data_store.invoked_file.filename, 'file.jpg')
-        self.assertEqual(self.data_store.added_file_count, 3)
+
+
+    def test_stores_saved_files_in_one_batch(self):
+        result = self.controller.save_file_from(self.url, self.user)
+        self.assertEqual(self.data_store.invoked_batches, [result.saved])
+        self.assertEqual([file.filename for file in result.saved], ['file.jpg'] * 3)
+
+
+    def test_retries_failed_download(self):
+        self.controller.imgur_provider.failures = {'url/to/file2.jpg': 1}
+        result = self.controller.save_file_from(self.url, self.user)
+        self.assertEqual(len(result.saved), 3)
+        self.assertEqual(result.failed, [])
+
+
+    def test_reports_links_that_fail_every_attempt(self):
+        self.controller.imgur_provider.failures = {'url/to/file2.jpg': 3}
+        result = self.controller.save_file_from(self.url, self.user)
+        self.assertEqual(len(result.saved), 2)
+        self.assertEqual(result.failed, ['url/to/file2.jpg'])
+        self.assertEqual(len(self.data_store.invoked_batches[0]), 2)
+
+
+
+
+class TestStartImport(TestFileMgmtControllerBase):
+
+    def setUp(self):
+        super(TestStartImport, self).setUp()
+        self.url = 'https://imgur.com/a/oUVDxci'
+
+
+    def test_raises_right_away_if_url_is_not_supported(self):
+        with self.assertRaises(controller.URLNotSupportedError):
+            self.controller.start_import('invalid_url', self.user)
+        self.assertEqual(self.controller.executor.tasks, [])
+
+
+    def test_imports_in_background_job(self):
+        job = self.controller.start_import(self.url, self.user)
+        self.assertEqual(job.status, jobs.PENDING)
+        self.assertEqual(self.content_manager.upload_count, 0)
+        self.controller.executor.run_all()
+        self.assertEqual(job.status, jobs.SUCCEEDED)
+        self.assertEqual(job.result, {'saved': ['file.jpg'] * 3, 'failed': []})
+        self.assertEqual(job.progress['saved'], 3)
+        self.assertEqual(job.progress['items']['url/to/file2.jpg'], 'saved')
+
+
+    def test_import_with_failed_files_fails_job_with_result(self):
+        self.controller.imgur_provider.failures['url/to/file2.jpg'] = self.controller._importer.attempts
+        job = self.controller.start_import(self.url, self.user)
+        self.controller.executor.run_all()
+        self.assertEqual(job.status, jobs.FAILED)
+        self.assertEqual(job.result, {'saved': ['file.jpg'] * 2, 'failed': ['url/to/file2.jpg']})
+        self.assertEqual(job.progress['error'], 'ImportIncompleteError')
+
+
+    def test_same_url_from_same_user_returns_same_job(self):
+        job = self.controller.start_import(self.url, self.user)
+        self.assertIs(self.controller.start_import(self.url, self.user), job)
+        self.controller.executor.run_all()
+        self.assertIs(self.controller.start_import(self.url, self.user), job)
+        self.assertEqual(self.content_manager.upload_count, 3)
+
+
+    def test_same_url_from_other_user_starts_another_job(self):
+        job = self.controller.start_import(self.url, self.user)
+        self.assertIsNot(self.controller.start_import(self.url, UserDouble('alice', self.credentials)), job)
+
+
+    def test_get_job_returns_only_own_jobs(self):
+        job = self.controller.start_import(self.url, self.user)
+        self.assertIs(self.controller.get_job(job.id, self.user), job)
+        self.assertIsNone(self.controller.get_job(job.id, UserDouble('alice', self.credentials)))
+        self.assertIsNone(self.controller.get_job('<invalid job id>', self.user))
+
+
 
 
 class FileMgmtControllerSpy(controller.FileMgmtController):
 
     def __init__(self, data_store, content_manager):
-        super(FileMgmtControllerSpy, self).__init__(data_store, content_manager)
+        self.executor = ExecutorDouble()
         self.imgur_provider = ImgurProviderDouble()
+        provider_registry = content_providers.ContentProviderRegistry()
+        provider_registry.register(r'^https://imgur\.com/', lambda: self.imgur_provider)
+        super(FileMgmtControllerSpy, self).__init__(data_store, content_manager,
+                                                    ConcurrentImporter(sleep=lambda seconds: None),
+                                                    jobs.JobRunner(executor=self.executor),
+                                                    provider_registry)
 
 
-    def _get_imgur_provider(self):
-        return self.imgur_provider
+
+class ExecutorDouble(object):
+    """
+    Holds submitted tasks until run_all is called
+    """
+    def __init__(self):
+        self.tasks = []
+
+
+    def submit(self, function, *args):
+        self.tasks.append((function, args))
+
+
+    def run_all(self):
+        while self.tasks:
+            function, args = self.tasks.pop(0)
+            function(*args)
 
 
 
@@ -155,11 +525,19 @@ class ImgurProviderDouble(object):
 
     def __init__(self):
         self.invoked_url = None
+        self.failures = {}
 
 
-    def get_files(self, url):
+    def get_links(self, url):
         self.invoked_url = url
-        return [FileDouble(), FileDouble(), FileDouble()]
+        return ['url/to/file1.jpg', 'url/to/file2.jpg', 'url/to/file3.jpg']
+
+
+    def download(self, link):
+        if self.failures.get(link):
+            self.failures[link] -= 1
+            raise IOError()
+        return FileDouble()
 
 
 UserDouble = namedtuple('UserDouble', ['username', 'content_credentials'])
@@ -170,23 +548,78 @@ class ContentManagerDouble(object):
     def __init__(self):
         self.invoked_content_id = None
         self.invoked_credentials = None
+        self.invoked_content_name = None
+        self.invoked_filename = None
         self.invoked_file = None
         self.invoked_user = None
+        self.invoked_byte_range = None
+        self.invoked_resumable = None
+        self.failing_filenames = set()
         self.should_raise = False
         self.upload_count = 0
+        self.ended_upload_session = None
 
 
-    def get_content(self, file_id, credentials):
+    def get_content(self, file_id, credentials, byte_range=None):
         self.invoked_content_id = file_id
         self.invoked_credentials = credentials
+        self.invoked_byte_range = byte_range
         return b'these are file contents'
 
 
-    def delete_content(self, content_id, credentials):
+    def get_download_url(self, content_id, user, filename, content_name=None):
+        self.invoked_content_id = content_id
+        self.invoked_user = user
+        self.invoked_filename = filename
+        self.invoked_content_name = content_name
+        return f'https://download.example.com/{content_name}'
+
+
+    def delete_content(self, content_id, credentials, content_name=None):
         self.invoked_content_id = content_id
         self.invoked_credentials = credentials
+        self.invoked_content_name = content_name
+        if self.should_raise:
+            raise ExceptionDummy()
+
+
+    def create_upload_session(self, user):
+        self.invoked_user = user
+        return 'an upload session'
+
+
+    def end_upload_session(self, user, upload_url, token):
+        self.invoked_user = user
+        self.ended_upload_session = (upload_url, token)
+
+
+    def verify_upload(self, content_id, user):
+        self.invoked_content_id = content_id
+        self.invoked_user = user
         if self.should_raise:
             raise ExceptionDummy()
+        return content_managers.UploadedContent(content_id, 'bob/file.jpg', 42, 'a-sha1', 'image/jpeg')
+
+
+    def create_resumable_upload(self, user, filename, size, content_type=None):
+        self.invoked_resumable = ('create', user, filename, size, content_type)
+        return 'an upload'
+
+
+    def append_to_resumable_upload(self, user, upload_id, offset, stream, length):
+        self.invoked_resumable = ('append', user, upload_id, offset, stream, length)
+        return offset + length
+
+
+    def finish_resumable_upload(self, user, upload_id):
+        self.invoked_resumable = ('finish', user, upload_id)
+        if self.should_raise:
+            raise ExceptionDummy()
+        return 'video.mp4', content_managers.UploadedContent(upload_id, 'bob/video.mp4', 100, None, 'video/mp4')
+
+
+    def cancel_resumable_upload(self, user, upload_id):
+        self.invoked_resumable = ('cancel', user, upload_id)
 
 
     def upload_content(self, file, user):
@@ -195,7 +628,9 @@ class ContentManagerDouble(object):
         self.invoked_user = user
         if self.should_raise:
             raise ExceptionDummy()
-        return 'a-new-content-id'
+        if getattr(file, 'filename', None) in self.failing_filenames:
+            raise ExceptionDummy()
+        return content_managers.UploadedContent('a-new-content-id', 'bob/file.jpg', 42, 'a-sha1', 'image/jpeg')
 
 
 
@@ -208,7 +643,13 @@ class DataStoreDouble(object):
         self.invoked_content_id = None
         self.invoked_username = None
         self.invoked_file = None
+        self.removed_content_id = None
         self.added_file_count = 0
+        self.invoked_batches = []
+        self.add_files_error = None
+        self.file_exists = True
+        self.missing_content_ids = set()
+        self.pages = None
         self.files = []
 
 
@@ -217,15 +658,26 @@ class DataStoreDouble(object):
         return self.files
 
 
+    def get_files_page(self, username, page_size, continuation_token):
+        self.invoked_username = username
+        self.invoked_page = (page_size, continuation_token)
+        if self.pages:
+            return FilePage(*self.pages[continuation_token])
+        return ('files', 'next-token')
+
+
     def get_file(self, content_id, username):
         self.invoked_content_id = content_id
         self.invoked_username = username
+        if not self.file_exists or content_id in self.missing_content_ids:
+            raise datastore.FileNotFoundError()
         return FileDouble()
 
 
     def remove_file(self, content_id, username):
         self.invoked_content_id = content_id
         self.invoked_username = username
+        self.removed_content_id = content_id
 
 
     def add_file(self, file):
@@ -233,10 +685,24 @@ class DataStoreDouble(object):
         self.invoked_file = file
 
 
+    def add_files(self, files):
+        self.invoked_batches.append(files)
+        if self.add_files_error:
+            raise self.add_files_error
+
+
 class FileDouble(object):
 
     def __init__(self):
         self.filename = 'file.jpg'
+        self.content_id = 'some_id'
+        self.content_name = 'bob/file.jpg'
+        self.content = None
+        self.seek_count = 0
+
+
+    def seek(self, position):
+        self.seek_count += 1
 
 
 
@@ -1,6 +1,6 @@
 import unittest
 
-from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.conditions import Key
 
 import src.file_mgmt.datastore as datastore
 import src.file_mgmt.model as model
@@ -32,6 +32,51 @@ class TestAddFile(TestFileDataStoreBase):
 
 
 
+class TestAddFiles(TestFileDataStoreBase):
+
+    def setUp(self):
+        super(TestAddFiles, self).setUp()
+        self.sleeps = []
+        self.data_store = datastore.FileDataStore({'FILE_DB_TABLE': 'the_file_table'}, self.dynamodb, self.sleeps.append)
+        self.files = [model.File('bob', f'file_{i}.jpg', f'content_id_{i}') for i in range(30)]
+
+
+    def test_writes_files_in_batches_of_25(self):
+        self.data_store.add_files(self.files)
+        self.assertEqual([len(batch) for batch in self.dynamodb.invoked_batches], [25, 5])
+        self.assertEqual(self.dynamodb.invoked_batches[1][0], {'PutRequest': {'Item': self.files[25].to_dict()}})
+
+
+    def test_does_not_write_empty_batch(self):
+        self.data_store.add_files([])
+        self.assertEqual(self.dynamodb.invoked_batches, [])
+
+
+    def test_resends_unprocessed_items_with_backoff(self):
+        self.dynamodb.unprocessed_counts = [3, 1]
+        self.data_store.add_files(self.files[:5])
+        self.assertEqual([len(batch) for batch in self.dynamodb.invoked_batches], [5, 3, 1])
+        self.assertEqual(self.sleeps, [datastore._BATCH_WRITE_BACKOFF_SECONDS, datastore._BATCH_WRITE_BACKOFF_SECONDS * 2])
+
+
+    def test_raises_if_items_stay_unprocessed(self):
+        self.dynamodb.unprocessed_counts = [1] * datastore._BATCH_WRITE_ATTEMPTS
+        with self.assertRaises(datastore.UnprocessedItemsError):
+            self.data_store.add_files(self.files[:5])
+        self.assertEqual(len(self.dynamodb.invoked_batches), datastore._BATCH_WRITE_ATTEMPTS)
+
+
+
+class TestRemoveFiles(TestFileDataStoreBase):
+
+    def test_deletes_files_in_batches(self):
+        files = [model.File('bob', f'file_{i}.jpg', f'content_id_{i}') for i in range(26)]
+        self.data_store.remove_files(files)
+        self.assertEqual([len(batch) for batch in self.dynamodb.invoked_batches], [25, 1])
+        self.assertEqual(self.dynamodb.invoked_batches[1][0], {'DeleteRequest': {'Key': {'content_id': 'content_id_25', 'owner': 'bob'}}})
+
+
+
 class TestRemoveFile(TestFileDataStoreBase):
 
 
@@ -62,7 +107,8 @@ class TestGetFile(TestFileDataStoreBase):
 
     def test_can_get_all_files_for_owner(self):
         files = self.data_store.get_files('bob')
-        self.assertEqual(self.dynamodb.invoked_scan_filter, Attr('owner').eq('bob'))
+        self.assertEqual(self.dynamodb.invoked_query_index, datastore.OWNER_INDEX)
+        self.assertEqual(self.dynamodb.invoked_query_condition, Key('owner').eq('bob'))
         self.assertEqual(len(files), 2)
         for file in files:
             self.assertIsInstance(file, model.File)
@@ -70,6 +116,59 @@ class TestGetFile(TestFileDataStoreBase):
 
 
 
+class TestGetFiles(TestFileDataStoreBase):
+
+    def setUp(self):
+        super(TestGetFiles, self).setUp()
+        self.dynamodb._files.append(model.File('bob', 'a_file.gif', 'content_id_3').to_dict())
+
+
+    def test_follows_every_page_of_the_query(self):
+        self.dynamodb.max_page_size = 2
+        files = self.data_store.get_files('bob')
+        self.assertEqual([file.content_id for file in files], ['content_id_1', 'content_id_2', 'content_id_3'])
+        self.assertEqual(self.dynamodb.query_count, 2)
+
+
+
+class TestGetFilesPage(TestFileDataStoreBase):
+
+    def setUp(self):
+        super(TestGetFilesPage, self).setUp()
+        self.dynamodb._files.append(model.File('bob', 'a_file.gif', 'content_id_3').to_dict())
+        self.page = self.data_store.get_files_page('bob', 2)
+
+
+    def test_limits_query_to_page_size(self):
+        self.assertEqual(self.dynamodb.invoked_query_limit, 2)
+        self.assertEqual(self.dynamodb.invoked_query_index, datastore.OWNER_INDEX)
+        self.assertEqual([file.content_id for file in self.page.files], ['content_id_1', 'content_id_2'])
+
+
+    def test_continuation_token_returns_next_page(self):
+        next_page = self.data_store.get_files_page('bob', 2, self.page.continuation_token)
+        self.assertEqual(self.dynamodb.invoked_query_start_key, self.dynamodb._files[1])
+        self.assertEqual([file.content_id for file in next_page.files], ['content_id_3'])
+        self.assertIsNone(next_page.continuation_token)
+
+
+    def test_continuation_token_is_opaque_string(self):
+        self.assertIsInstance(self.page.continuation_token, str)
+        self.assertNotIn('content_id_2', self.page.continuation_token)
+
+
+    def test_raises_for_malformed_continuation_token(self):
+        with self.assertRaises(datastore.InvalidContinuationTokenError):
+            self.data_store.get_files_page('bob', 2, 'not a token')
+
+
+    def test_raises_for_continuation_token_of_other_owner(self):
+        with self.assertRaises(datastore.InvalidContinuationTokenError):
+            self.data_store.get_files_page('alice', 2, self.page.continuation_token)
+
+
+
+
 class DynamoDbDouble(object):
 
     def __init__(self):
@@ -81,7 +180,14 @@ class DynamoDbDouble(object):
         self.invoked_get_key = None
         self.invoked_delete_key = None
         self.invoked_table = None
-        self.invoked_scan_filter = None
+        self.invoked_query_index = None
+        self.invoked_query_condition = None
+        self.invoked_query_limit = None
+        self.invoked_query_start_key = None
+        self.query_count = 0
+        self.max_page_size = 1000
+        self.invoked_batches = []
+        self.unprocessed_counts = []
 
 
     def Table(self, table_name):
@@ -93,9 +199,27 @@ class DynamoDbDouble(object):
         self.invoked_put_item = Item
 
 
-    def scan(self, FilterExpression):
-        self.invoked_scan_filter = FilterExpression
-        return {'Items': self._files}
+    def batch_write_item(self, RequestItems):
+        write_requests = RequestItems[self.invoked_table]
+        self.invoked_batches.append(write_requests)
+        unprocessed_count = self.unprocessed_counts.pop(0) if self.unprocessed_counts else 0
+        if unprocessed_count:
+            return {'UnprocessedItems': {self.invoked_table: write_requests[-unprocessed_count:]}}
+        return {'UnprocessedItems': {}}
+
+
+    def query(self, IndexName, KeyConditionExpression, Limit=None, ExclusiveStartKey=None):
+        self.invoked_query_index = IndexName
+        self.invoked_query_condition = KeyConditionExpression
+        self.invoked_query_limit = Limit
+        self.invoked_query_start_key = ExclusiveStartKey
+        self.query_count += 1
+        start = self._files.index(ExclusiveStartKey) + 1 if ExclusiveStartKey else 0
+        end = start + (Limit or self.max_page_size)
+        response = {'Items': self._files[start:end]}
+        if end < len(self._files):
+            response['LastEvaluatedKey'] = self._files[end - 1]
+        return response
 
 
     def get_item(self, Key):
@@ -0,0 +1,152 @@
+from datetime import datetime
+import unittest
+
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request, Response
+
+import src.file_mgmt.http_caching as http_caching
+from src.file_mgmt.model import File
+
+
+class TestHttpCachingBase(unittest.TestCase):
+
+    def setUp(self):
+        self.file = File('bob', 'file.jpg', 'some_id', datetime(2020, 5, 17, 10, 30, 15, 123456), sha1='a-sha1')
+
+
+    def make_request(self, **headers):
+        return Request(EnvironBuilder(path='/get_file', headers=headers).get_environ())
+
+
+
+
+class TestGetEtag(TestHttpCachingBase):
+
+    def test_uses_sha1(self):
+        self.assertEqual(http_caching.get_etag(self.file), 'a-sha1')
+
+
+    def test_falls_back_to_content_id(self):
+        self.file.sha1 = None
+        self.assertEqual(http_caching.get_etag(self.file), 'some_id')
+
+
+
+
+class TestIsNotModified(TestHttpCachingBase):
+
+    def test_modified_without_conditional_headers(self):
+        self.assertFalse(http_caching.is_not_modified(self.make_request(), self.file))
+
+
+    def test_not_modified_if_etag_matches(self):
+        request = self.make_request(**{'If-None-Match': '"other", "a-sha1"'})
+        self.assertTrue(http_caching.is_not_modified(request, self.file))
+
+
+    def test_not_modified_if_weak_etag_matches(self):
+        request = self.make_request(**{'If-None-Match': 'W/"a-sha1"'})
+        self.assertTrue(http_caching.is_not_modified(request, self.file))
+
+
+    def test_not_modified_for_any_etag(self):
+        request = self.make_request(**{'If-None-Match': '*'})
+        self.assertTrue(http_caching.is_not_modified(request, self.file))
+
+
+    def test_modified_if_etag_differs(self):
+        request = self.make_request(**{'If-None-Match': '"other"'})
+        self.assertFalse(http_caching.is_not_modified(request, self.file))
+
+
+    def test_etag_takes_precedence_over_date(self):
+        request = self.make_request(**{'If-None-Match': '"other"', 'If-Modified-Since': 'Sun, 17 May 2020 10:30:15 GMT'})
+        self.assertFalse(http_caching.is_not_modified(request, self.file))
+
+
+    def test_not_modified_since_creation_second(self):
+        request = self.make_request(**{'If-Modified-Since': 'Sun, 17 May 2020 10:30:15 GMT'})
+        self.assertTrue(http_caching.is_not_modified(request, self.file))
+
+
+    def test_modified_since_earlier_date(self):
+        request = self.make_request(**{'If-Modified-Since': 'Sun, 17 May 2020 10:30:14 GMT'})
+        self.assertFalse(http_caching.is_not_modified(request, self.file))
+
+
+
+
+class TestGetByteRange(TestHttpCachingBase):
+
+    def test_none_without_range(self):
+        self.assertIsNone(http_caching.get_byte_range(self.make_request(), self.file))
+
+
+    def test_returns_single_range_with_exclusive_stop(self):
+        request = self.make_request(Range='bytes=100-199')
+        self.assertEqual(http_caching.get_byte_range(request, self.file), (100, 200))
+
+
+    def test_returns_open_ended_and_suffix_ranges(self):
+        self.assertEqual(http_caching.get_byte_range(self.make_request(Range='bytes=100-'), self.file), (100, None))
+        self.assertEqual(http_caching.get_byte_range(self.make_request(Range='bytes=-100'), self.file), (-100, None))
+
+
+    def test_ignores_multiple_ranges(self):
+        request = self.make_request(Range='bytes=0-9,20-29')
+        self.assertIsNone(http_caching.get_byte_range(request, self.file))
+
+
+    def test_ignores_other_units(self):
+        request = self.make_request(Range='items=0-9')
+        self.assertIsNone(http_caching.get_byte_range(request, self.file))
+
+
+    def test_returns_range_if_etag_still_matches(self):
+        request = self.make_request(Range='bytes=100-', **{'If-Range': '"a-sha1"'})
+        self.assertEqual(http_caching.get_byte_range(request, self.file), (100, None))
+
+
+    def test_ignores_range_if_etag_changed(self):
+        request = self.make_request(Range='bytes=100-', **{'If-Range': '"other"'})
+        self.assertIsNone(http_caching.get_byte_range(request, self.file))
+
+
+    def test_ignores_range_for_weak_etag(self):
+        request = self.make_request(Range='bytes=100-', **{'If-Range': 'W/"a-sha1"'})
+        self.assertIsNone(http_caching.get_byte_range(request, self.file))
+
+
+    def test_returns_range_if_date_matches(self):
+        request = self.make_request(Range='bytes=100-', **{'If-Range': 'Sun, 17 May 2020 10:30:15 GMT'})
+        self.assertEqual(http_caching.get_byte_range(request, self.file), (100, None))
+
+
+    def test_ignores_range_if_date_differs(self):
+        request = self.make_request(Range='bytes=100-', **{'If-Range': 'Sun, 17 May 2020 10:30:16 GMT'})
+        self.assertIsNone(http_caching.get_byte_range(request, self.file))
+
+
+
+
+class TestCacheHeaders(TestHttpCachingBase):
+
+    def test_adds_validators_and_cache_control(self):
+        response = http_caching.add_cache_headers(Response(), self.file)
+        self.assertEqual(response.headers['ETag'], '"a-sha1"')
+        self.assertEqual(response.headers['Last-Modified'], 'Sun, 17 May 2020 10:30:15 GMT')
+        self.assertEqual(response.headers['Cache-Control'], 'private, max-age=31536000, immutable')
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+
+
+    def test_does_not_mark_errors_cacheable(self):
+        response = http_caching.add_cache_headers(Response(status=502), self.file)
+        self.assertNotIn('ETag', response.headers)
+        self.assertNotIn('Cache-Control', response.headers)
+
+
+    def test_not_modified_response_has_no_body(self):
+        response = http_caching.make_not_modified_response(self.file)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(response.headers['ETag'], '"a-sha1"')
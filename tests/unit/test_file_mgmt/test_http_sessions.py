@@ -0,0 +1,97 @@
+import unittest
+
+import src.file_mgmt.http_sessions as http_sessions
+import tests.unit.test_file_mgmt.test_content_managers.common as common
+
+
+
+class TestHostSessions(unittest.TestCase):
+
+    def setUp(self):
+        self.created_sessions = []
+        self.clock = common.ClockDouble()
+        self.sessions = http_sessions.HostSessions(pool_size=3, session_factory=self.make_session,
+                                                   max_hosts=2, clock=self.clock)
+
+
+    def make_session(self, pool_size):
+        session = SessionDouble(pool_size)
+        self.created_sessions.append(session)
+        return session
+
+
+    def test_reuses_session_for_same_host(self):
+        self.sessions.get('https://api.example.com/a', params={'a': 1})
+        self.sessions.post('https://api.example.com/b', json={'b': 2})
+        self.assertEqual(len(self.created_sessions), 1)
+        session = self.created_sessions[0]
+        self.assertEqual(session.invoked, [
+            ('GET', 'https://api.example.com/a', {'params': {'a': 1}}),
+            ('POST', 'https://api.example.com/b', {'json': {'b': 2}})
+        ])
+
+
+    def test_uses_separate_session_per_host(self):
+        self.sessions.get('https://api.example.com/a')
+        self.sessions.head('https://f002.example.com/b')
+        self.assertEqual(len(self.created_sessions), 2)
+        self.assertEqual(self.created_sessions[1].invoked, [('HEAD', 'https://f002.example.com/b', {})])
+
+
+    def test_uses_configured_pool_size(self):
+        self.sessions.get('https://api.example.com/a')
+        self.assertEqual(self.created_sessions[0].pool_size, 3)
+
+
+    def test_closes_session_of_least_recently_used_host_when_full(self):
+        self.sessions.get('https://pod-1.example.com/a')
+        self.sessions.get('https://pod-2.example.com/a')
+        self.sessions.get('https://pod-3.example.com/a')
+        self.assertEqual([session.closed for session in self.created_sessions], [True, False, False])
+
+
+    def test_replaces_session_unused_for_an_hour(self):
+        self.sessions.get('https://api.example.com/a')
+        self.clock.now += http_sessions._SESSION_TTL_SECONDS
+        self.sessions.get('https://api.example.com/b')
+        self.assertEqual(len(self.created_sessions), 2)
+        self.assertTrue(self.created_sessions[0].closed)
+
+
+    def test_reports_connection_stats_per_host(self):
+        sessions = http_sessions.HostSessions(pool_size=2)
+        sessions._get_session('https://api.example.com/a')
+        self.assertEqual(sessions.stats, {'api.example.com': {'connections': 0, 'requests': 0}})
+
+
+
+class TestGetSharedSessions(unittest.TestCase):
+
+    def test_returns_same_instance_every_time(self):
+        self.assertIs(http_sessions.get_shared_sessions(), http_sessions.get_shared_sessions())
+
+
+
+
+class SessionDouble(object):
+
+    def __init__(self, pool_size):
+        self.pool_size = pool_size
+        self.invoked = []
+        self.closed = False
+
+
+    def get(self, url, **kwargs):
+        self.invoked.append(('GET', url, kwargs))
+
+
+    def post(self, url, **kwargs):
+        self.invoked.append(('POST', url, kwargs))
+
+
+    def head(self, url, **kwargs):
+        self.invoked.append(('HEAD', url, kwargs))
+
+
+    def close(self):
+        self.closed = True
@@ -0,0 +1,83 @@
+import threading
+import time
+import unittest
+
+import src.file_mgmt.importer as importer
+
+
+class TestConcurrentImporter(unittest.TestCase):
+
+    def setUp(self):
+        self.sleeps = []
+        self.importer = importer.ConcurrentImporter(concurrency=3, attempts=3, sleep=self.sleeps.append)
+
+
+    def test_returns_results_in_item_order(self):
+        succeeded, failed = self.importer.run([1, 2, 3, 4], lambda item: item * 10)
+        self.assertEqual(succeeded, [10, 20, 30, 40])
+        self.assertEqual(failed, [])
+
+
+    def test_retries_failed_item_with_backoff(self):
+        failures = {2: 2}
+        succeeded, failed = self.importer.run([1, 2], lambda item: self._fail_first(item, failures))
+        self.assertEqual(succeeded, [1, 2])
+        self.assertEqual(self.sleeps, [importer._RETRY_BACKOFF_SECONDS, importer._RETRY_BACKOFF_SECONDS * 2])
+
+
+    def test_reports_items_that_fail_every_attempt(self):
+        failures = {2: 3, 3: 3}
+        succeeded, failed = self.importer.run([1, 2, 3], lambda item: self._fail_first(item, failures))
+        self.assertEqual(succeeded, [1])
+        self.assertEqual(failed, [2, 3])
+
+
+    def test_reports_progress_per_item(self):
+        progress = {}
+        failures = {2: 3}
+        self.importer.run(['1', '2'], lambda item: self._fail_first(int(item), failures), progress)
+        self.assertEqual(progress, {
+            'total': 2,
+            'saved': 1,
+            'failed': 1,
+            'items': {'1': importer.SAVED, '2': importer.FAILED}
+        })
+
+
+    def test_runs_no_more_than_concurrency_items_at_once(self):
+        tracker = ConcurrencyTracker()
+        self.importer.run(range(10), tracker)
+        self.assertEqual(tracker.max_running, 3)
+
+
+    def test_concurrency_and_attempts_are_configured_by_environment_variables(self):
+        default_importer = importer.ConcurrentImporter()
+        self.assertEqual(default_importer.concurrency, importer._DEFAULT_CONCURRENCY)
+        self.assertEqual(default_importer.attempts, importer._DEFAULT_ATTEMPTS)
+
+
+    # Helper
+    def _fail_first(self, item, failures):
+        if failures.get(item):
+            failures[item] -= 1
+            raise IOError()
+        return item
+
+
+
+
+class ConcurrencyTracker(object):
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+
+    def __call__(self, item):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.01)
+        with self._lock:
+            self.running -= 1
@@ -0,0 +1,26 @@
+import unittest
+
+import src.file_mgmt.maintenance as maintenance
+
+
+
+class TestCancelExpiredUploads(unittest.TestCase):
+
+    def test_cancels_expired_uploads_of_every_user(self):
+        content_manager = ContentManagerDouble()
+        cancelled = maintenance.cancel_expired_uploads({'source': 'aws.events'}, None, content_manager)
+        self.assertEqual(cancelled, 3)
+        self.assertEqual(content_manager.invocations, 1)
+
+
+
+
+class ContentManagerDouble(object):
+
+    def __init__(self):
+        self.invocations = 0
+
+
+    def cancel_expired_resumable_uploads(self):
+        self.invocations += 1
+        return 3
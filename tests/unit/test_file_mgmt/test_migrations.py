@@ -0,0 +1,73 @@
+import unittest
+
+import src.file_mgmt.datastore as datastore
+import src.file_mgmt.migrations as migrations
+
+
+
+class TestAddOwnerIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.config = {'FILE_DB_TABLE': 'the_file_table'}
+        self.dynamodb = DynamoDbClientDouble()
+        self.sleeps = []
+
+
+    def migrate(self):
+        migrations.add_owner_index(self.config, self.dynamodb, self.sleeps.append)
+
+
+    def test_creates_owner_index_on_configured_table(self):
+        self.migrate()
+        self.assertEqual(self.dynamodb.invoked_table_name, 'the_file_table')
+        index = self.dynamodb.created_index
+        self.assertEqual(index['IndexName'], datastore.OWNER_INDEX)
+        self.assertEqual(index['KeySchema'][0], {'AttributeName': 'owner', 'KeyType': 'HASH'})
+        self.assertEqual(index['Projection'], {'ProjectionType': 'ALL'})
+
+
+    def test_copies_provisioned_throughput_of_table(self):
+        self.migrate()
+        expected_throughput = {'ReadCapacityUnits': 5, 'WriteCapacityUnits': 3}
+        self.assertEqual(self.dynamodb.created_index['ProvisionedThroughput'], expected_throughput)
+
+
+    def test_omits_throughput_for_on_demand_tables(self):
+        self.dynamodb.table['BillingModeSummary'] = {'BillingMode': 'PAY_PER_REQUEST'}
+        self.migrate()
+        self.assertNotIn('ProvisionedThroughput', self.dynamodb.created_index)
+
+
+    def test_waits_for_backfill_to_finish(self):
+        self.dynamodb.statuses = ['CREATING', 'BACKFILLING', 'ACTIVE']
+        self.migrate()
+        self.assertEqual(self.sleeps, [migrations._POLL_INTERVAL_SECONDS] * 2)
+
+
+    def test_does_not_recreate_existing_index(self):
+        self.dynamodb.table['GlobalSecondaryIndexes'] = [{'IndexName': datastore.OWNER_INDEX, 'IndexStatus': 'ACTIVE'}]
+        self.migrate()
+        self.assertIsNone(self.dynamodb.created_index)
+
+
+
+
+class DynamoDbClientDouble(object):
+
+    def __init__(self):
+        self.table = {'ProvisionedThroughput': {'ReadCapacityUnits': 5, 'WriteCapacityUnits': 3, 'NumberOfDecreasesToday': 0}}
+        self.statuses = ['ACTIVE']
+        self.invoked_table_name = None
+        self.created_index = None
+
+
+    def describe_table(self, TableName):
+        if self.created_index:
+            self.created_index['IndexStatus'] = self.statuses.pop(0)
+        return {'Table': self.table}
+
+
+    def update_table(self, TableName, AttributeDefinitions, GlobalSecondaryIndexUpdates):
+        self.invoked_table_name = TableName
+        self.created_index = dict(GlobalSecondaryIndexUpdates[0]['Create'])
+        self.table['GlobalSecondaryIndexes'] = [self.created_index]
@@ -1,4 +1,5 @@
 from datetime import datetime
+from decimal import Decimal
 import unittest
 
 import src.file_mgmt.model as model
@@ -50,6 +51,29 @@ class TestFile(unittest.TestCase):
         self.assertEqual(file.filename, self.filename)
         self.assertEqual(file.created_at, created_at)
         self.assertEqual(file.content_id, self.content_id)
+        self.assertIsNone(file.content_name)
+        self.assertIsNone(file.size)
+
+
+    def test_to_dict_includes_content_metadata_if_known(self):
+        file = FileSpy(self.owner, self.filename, self.content_id,
+                       content_name='bob/a_file.jpg', size=42, sha1='a-sha1', content_type='image/jpeg')
+        file_dict = file.to_dict()
+        self.assertEqual(file_dict['content_name'], 'bob/a_file.jpg')
+        self.assertEqual(file_dict['size'], 42)
+        self.assertEqual(file_dict['sha1'], 'a-sha1')
+        self.assertEqual(file_dict['content_type'], 'image/jpeg')
+
+
+    def test_from_dict_reads_content_metadata(self):
+        file_dict = self.file.to_dict()
+        file_dict.update({'content_name': 'bob/a_file.jpg', 'size': Decimal(42), 'sha1': 'a-sha1', 'content_type': 'image/jpeg'})
+        file = FileSpy.from_dict(file_dict)
+        self.assertEqual(file.content_name, 'bob/a_file.jpg')
+        self.assertEqual(file.size, 42)
+        self.assertIsInstance(file.size, int)
+        self.assertEqual(file.sha1, 'a-sha1')
+        self.assertEqual(file.content_type, 'image/jpeg')
 
 
 
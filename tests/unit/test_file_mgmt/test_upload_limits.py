@@ -0,0 +1,121 @@
+from io import BytesIO
+import unittest
+
+from flask import Flask, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+import src.file_mgmt.upload_limits as upload_limits
+
+
+class TestUploadLimitsBase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.request_class = upload_limits.UploadLimitedRequest
+        self.app.container = ContainerDouble({'FILEZAP_MAX_FILE_SIZE': 10, 'FILEZAP_MAX_FILES_PER_REQUEST': 3})
+        self.app.add_url_rule('/save_files', 'save_files', upload_limits.takes_many_files(lambda: 'OK'), methods=['POST'])
+
+
+    def make_upload_context(self, content, **kwargs):
+        return self.app.test_request_context('/save_file', method='POST', data={'file': (BytesIO(content), 'file.txt')}, **kwargs)
+
+
+
+
+class TestUploadLimitedRequest(TestUploadLimitsBase):
+
+    def test_parses_file_within_limit(self):
+        with self.make_upload_context(b'0123456789'):
+            self.assertEqual(request.files['file'].read(), b'0123456789')
+
+
+    def test_rejects_file_over_limit_while_parsing(self):
+        self.app.container.config['FILEZAP_MAX_REQUEST_SIZE'] = 1000000
+        with self.make_upload_context(b'0123456789a'):
+            with self.assertRaises(RequestEntityTooLarge):
+                request.files
+
+
+    def test_rejects_announced_request_size_before_parsing(self):
+        with self.make_upload_context(b'0123456789', environ_overrides={'CONTENT_LENGTH': str(10 + upload_limits.MULTIPART_OVERHEAD + 1)}):
+            with self.assertRaises(RequestEntityTooLarge):
+                request.files
+
+
+    def test_parses_any_size_without_limit(self):
+        self.app.container.config['FILEZAP_MAX_FILE_SIZE'] = 0
+        with self.make_upload_context(b'x' * 100):
+            self.assertEqual(len(request.files['file'].read()), 100)
+
+
+    def test_limits_form_fields_in_memory(self):
+        self.assertEqual(upload_limits.UploadLimitedRequest.max_form_memory_size, upload_limits._MAX_FORM_MEMORY_SIZE)
+
+
+
+
+class TestSizeLimitedSpooledFile(unittest.TestCase):
+
+    def test_keeps_written_data(self):
+        file = upload_limits.SizeLimitedSpooledFile(10)
+        file.write(b'01234')
+        file.write(b'56789')
+        file.seek(0)
+        self.assertEqual(file.read(), b'0123456789')
+
+
+    def test_rejects_writes_past_limit(self):
+        file = upload_limits.SizeLimitedSpooledFile(10)
+        file.write(b'0123456789')
+        with self.assertRaises(RequestEntityTooLarge):
+            file.write(b'a')
+        self.assertTrue(file.closed)
+
+
+    def test_spills_to_disk_past_memory_limit(self):
+        file = upload_limits.SizeLimitedSpooledFile(0)
+        file.write(b'x' * (upload_limits._SPOOL_MAX_MEMORY + 1))
+        self.assertTrue(file._rolled)
+
+
+
+
+class TestRejectOversizedRequest(TestUploadLimitsBase):
+
+    def test_rejects_announced_size_over_limit(self):
+        with self.app.test_request_context('/', method='POST', environ_overrides={'CONTENT_LENGTH': str(10 + upload_limits.MULTIPART_OVERHEAD + 1)}):
+            with self.assertRaises(RequestEntityTooLarge):
+                upload_limits.reject_oversized_request()
+
+
+    def test_allows_announced_size_within_limit(self):
+        with self.app.test_request_context('/', method='POST', environ_overrides={'CONTENT_LENGTH': str(10 + upload_limits.MULTIPART_OVERHEAD)}):
+            self.assertIsNone(upload_limits.reject_oversized_request())
+
+
+    def test_allows_many_files_to_views_taking_many_files(self):
+        with self.app.test_request_context('/save_files', method='POST', environ_overrides={'CONTENT_LENGTH': str(3 * 10 + upload_limits.MULTIPART_OVERHEAD)}):
+            self.assertIsNone(upload_limits.reject_oversized_request())
+
+
+    def test_rejects_more_than_many_files_to_views_taking_many_files(self):
+        with self.app.test_request_context('/save_files', method='POST', environ_overrides={'CONTENT_LENGTH': str(3 * 10 + upload_limits.MULTIPART_OVERHEAD + 1)}):
+            with self.assertRaises(RequestEntityTooLarge):
+                upload_limits.reject_oversized_request()
+
+
+    def test_max_request_size_overrides_file_size(self):
+        self.assertEqual(upload_limits.get_max_request_size({'FILEZAP_MAX_FILE_SIZE': 10, 'FILEZAP_MAX_REQUEST_SIZE': 500}), 500)
+        self.assertEqual(upload_limits.get_max_request_size({'FILEZAP_MAX_FILE_SIZE': 10, 'FILEZAP_MAX_REQUEST_SIZE': 500}, 3), 500)
+
+
+    def test_no_limit_without_configuration(self):
+        self.assertIsNone(upload_limits.get_max_request_size({'FILEZAP_MAX_FILE_SIZE': 0, 'FILEZAP_MAX_REQUEST_SIZE': 0}))
+
+
+
+
+class ContainerDouble(object):
+
+    def __init__(self, config):
+        self.config = config
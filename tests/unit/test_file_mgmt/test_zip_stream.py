@@ -0,0 +1,173 @@
+from datetime import datetime
+from io import BytesIO
+import threading
+import time
+import unittest
+import zipfile
+
+import src.file_mgmt.zip_stream as zip_stream
+from src.file_mgmt.model import File
+
+
+class TestZipStreamBase(unittest.TestCase):
+
+    def setUp(self):
+        self.contents = {
+            'id1': [b'first ', b'file'],
+            'id2': [b'second file'],
+            'id3': [b'third ', b'file']
+        }
+        self.files = [
+            File('bob', 'one.txt', 'id1', datetime(2020, 5, 17, 10, 30, 15)),
+            File('bob', 'two.txt', 'id2', datetime(2020, 5, 18, 10, 30, 15)),
+            File('bob', 'one.txt', 'id3', datetime(2020, 5, 19, 10, 30, 15))
+        ]
+        self.opener = ContentOpenerDouble(self.contents)
+
+
+    def read_archive(self, read_ahead=2):
+        data = b''.join(zip_stream.ZipStream(self.files, self.opener.open, read_ahead))
+        return zipfile.ZipFile(BytesIO(data))
+
+
+
+
+class TestZipStream(TestZipStreamBase):
+
+    def test_archives_every_file_in_order(self):
+        archive = self.read_archive()
+        self.assertEqual(archive.namelist(), ['one.txt', 'two.txt', 'one (1).txt'])
+        self.assertEqual(archive.read('one.txt'), b'first file')
+        self.assertEqual(archive.read('two.txt'), b'second file')
+        self.assertEqual(archive.read('one (1).txt'), b'third file')
+
+
+    def test_stores_files_uncompressed(self):
+        for zip_info in self.read_archive().infolist():
+            self.assertEqual(zip_info.compress_type, zipfile.ZIP_STORED)
+
+
+    def test_writes_zip64_local_headers(self):
+        data = b''.join(zip_stream.ZipStream(self.files[:1], self.opener.open))
+        name_end = 30 + len(b'one.txt')
+        self.assertEqual(data[name_end:name_end + 2], b'\x01\x00')  # ZIP64 extra field header id
+
+
+    def test_dates_entries_with_file_creation_time(self):
+        self.assertEqual(self.read_archive().getinfo('two.txt').date_time, (2020, 5, 18, 10, 30, 14))
+
+
+    def test_leaves_out_files_that_cannot_be_opened(self):
+        self.opener.failing_content_ids = {'id2'}
+        self.assertEqual(self.read_archive().namelist(), ['one.txt', 'one (1).txt'])
+
+
+    def test_empty_archive_without_files(self):
+        self.files = []
+        self.assertEqual(self.read_archive().namelist(), [])
+
+
+    def test_closes_every_content(self):
+        self.read_archive()
+        self.assertEqual(self.opener.closed_content_ids, {'id1', 'id2', 'id3'})
+
+
+    def test_flattens_paths_in_filenames(self):
+        self.files[0].filename = '../etc/passwd'
+        self.assertEqual(self.read_archive().namelist()[0], '.._etc_passwd')
+
+
+    def test_raises_if_content_fails_after_entry_started(self):
+        self.contents['id2'] = FailingChunks()
+        with self.assertRaises(IOError):
+            self.read_archive()
+
+
+
+
+class TestZipStreamReadAhead(TestZipStreamBase):
+
+    def test_sends_first_bytes_before_later_files_are_opened(self):
+        self.files = [File('bob', f'{index}.txt', 'id1') for index in range(10)]
+        first_chunk = next(iter(zip_stream.ZipStream(self.files, self.opener.open, read_ahead=2)))
+        self.assertTrue(first_chunk.startswith(b'PK'))
+        self.assertLessEqual(self.opener.open_count, 3)
+
+
+    def test_stops_fetching_when_closed_early(self):
+        self.files = [File('bob', f'{index}.txt', 'id1') for index in range(10)]
+        chunks = iter(zip_stream.ZipStream(self.files, self.opener.open, read_ahead=2))
+        next(chunks)
+        chunks.close()
+        self.assertLess(self.opener.open_count, 10)
+
+
+    def test_stops_fetching_entry_being_written_when_closed(self):
+        self.contents['id1'] = [b'chunk'] * 100
+        chunks = iter(zip_stream.ZipStream(self.files[:1], self.opener.open, read_ahead=1))
+        zip_stream._PUT_TIMEOUT_SECONDS, timeout = 0.01, zip_stream._PUT_TIMEOUT_SECONDS
+        try:
+            next(chunks)
+            chunks.close()
+            deadline = time.monotonic() + 1
+            while 'id1' not in self.opener.closed_content_ids and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            zip_stream._PUT_TIMEOUT_SECONDS = timeout
+        self.assertEqual(self.opener.closed_content_ids, {'id1'})
+
+
+
+
+class TestChunkWriter(unittest.TestCase):
+
+    def test_drain_returns_written_chunks_once(self):
+        writer = zip_stream._ChunkWriter()
+        writer.write(b'abc')
+        writer.write(memoryview(b'def'))
+        self.assertEqual(writer.drain(), [b'abc', b'def'])
+        self.assertEqual(writer.drain(), [])
+
+
+
+
+class ContentOpenerDouble(object):
+
+    def __init__(self, contents):
+        self._contents = contents
+        self.failing_content_ids = set()
+        self.closed_content_ids = set()
+        self.open_count = 0
+        self._lock = threading.Lock()
+
+
+    def open(self, file):
+        with self._lock:
+            self.open_count += 1
+        if file.content_id in self.failing_content_ids:
+            raise IOError()
+        return ContentDouble(self._contents[file.content_id], lambda: self.closed_content_ids.add(file.content_id))
+
+
+
+class ContentDouble(object):
+
+    def __init__(self, chunks, on_close):
+        self._chunks = chunks
+        self._on_close = on_close
+
+
+    def __iter__(self):
+        return iter(self._chunks)
+
+
+    def close(self):
+        self._on_close()
+
+
+
+class FailingChunks(object):
+
+    def __iter__(self):
+        yield b'partial'
+        raise IOError()
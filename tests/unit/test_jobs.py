@@ -0,0 +1,159 @@
+import threading
+import unittest
+
+import src.jobs as jobs
+
+
+class TestJobRunnerBase(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ExecutorDouble()
+        self.runner = jobs.JobRunner(executor=self.executor)
+
+
+
+class TestSubmit(TestJobRunnerBase):
+
+    def test_job_is_pending_until_run(self):
+        job = self.runner.submit('a_job', lambda job: None)
+        self.assertEqual(job.status, jobs.PENDING)
+        self.assertFalse(job.finished)
+
+
+    def test_passes_job_and_arguments_to_task(self):
+        invocations = []
+        job = self.runner.submit('a_job', lambda job, a, b: invocations.append((job, a, b)), 1, 2)
+        self.executor.run_all()
+        self.assertEqual(invocations, [(job, 1, 2)])
+
+
+    def test_records_result_of_successful_task(self):
+        job = self.runner.submit('a_job', lambda job: 'a result')
+        self.executor.run_all()
+        self.assertEqual(job.status, jobs.SUCCEEDED)
+        self.assertEqual(job.result, 'a result')
+
+
+    def test_records_failed_task(self):
+        job = self.runner.submit('a_job', self._fail)
+        self.executor.run_all()
+        self.assertEqual(job.status, jobs.FAILED)
+        self.assertEqual(job.progress, {'error': 'ValueError'})
+
+
+    def test_records_result_of_task_that_failed_with_a_result(self):
+        job = self.runner.submit('a_job', self._fail_with_result)
+        self.executor.run_all()
+        self.assertEqual(job.status, jobs.FAILED)
+        self.assertEqual(job.result, 'a partial result')
+        self.assertEqual(job.progress, {'error': 'TaskFailedError'})
+
+
+    def test_returns_unfinished_job_with_same_key(self):
+        job = self.runner.submit('a_job', lambda job: None, key='bob')
+        self.assertIs(self.runner.submit('a_job', lambda job: None, key='bob'), job)
+        self.assertEqual(len(self.executor.tasks), 1)
+
+
+    def test_starts_new_job_once_job_with_same_key_finished(self):
+        job = self.runner.submit('a_job', lambda job: None, key='bob')
+        self.executor.run_all()
+        self.assertIsNot(self.runner.submit('a_job', lambda job: None, key='bob'), job)
+
+
+    def test_reuses_recently_succeeded_job_with_same_key(self):
+        job = self.runner.submit('a_job', lambda job: None, key='bob', reuse_seconds=60)
+        self.executor.run_all()
+        self.assertIs(self.runner.submit('a_job', lambda job: None, key='bob', reuse_seconds=60), job)
+        job.finished_at -= 61
+        self.assertIsNot(self.runner.submit('a_job', lambda job: None, key='bob', reuse_seconds=60), job)
+
+
+    def test_does_not_reuse_failed_job_with_same_key(self):
+        job = self.runner.submit('a_job', self._fail, key='bob', reuse_seconds=60)
+        self.executor.run_all()
+        self.assertIsNot(self.runner.submit('a_job', lambda job: None, key='bob', reuse_seconds=60), job)
+
+
+    def test_records_job_owner(self):
+        job = self.runner.submit('a_job', lambda job: None, owner='bob')
+        self.assertEqual(job.owner, 'bob')
+        self.assertNotIn('owner', job.to_dict())
+
+
+    def test_runs_tasks_on_background_threads(self):
+        runner = jobs.JobRunner(max_workers=2)
+        task_threads = []
+        job = runner.submit('a_job', lambda job: task_threads.append(threading.current_thread()))
+        runner._executor.shutdown(wait=True)
+        self.assertTrue(job.finished)
+        self.assertIsNot(task_threads[0], threading.current_thread())
+
+
+    # Helper
+    def _fail(self, job):
+        raise ValueError()
+
+
+    def _fail_with_result(self, job):
+        raise jobs.TaskFailedError('a partial result')
+
+
+
+class TestGet(TestJobRunnerBase):
+
+    def test_returns_submitted_job(self):
+        job = self.runner.submit('a_job', lambda job: None)
+        self.assertIs(self.runner.get(job.id), job)
+
+
+    def test_returns_none_for_unknown_job(self):
+        self.assertIsNone(self.runner.get('<invalid job id>'))
+
+
+    def test_forgets_oldest_finished_jobs(self):
+        first_job = self.runner.submit('a_job', lambda job: None)
+        for i in range(jobs._MAX_FINISHED_JOBS):
+            self.runner.submit('a_job', lambda job: None)
+        self.executor.run_all()
+        self.assertIsNone(self.runner.get(first_job.id))
+        self.assertEqual(len(self.runner._jobs), jobs._MAX_FINISHED_JOBS)
+
+
+
+class TestJob(unittest.TestCase):
+
+    def test_to_dict(self):
+        job = jobs.Job('a_job')
+        job.progress['deleted'] = 3
+        self.assertEqual(job.to_dict(), {'id': job.id, 'name': 'a_job', 'status': jobs.PENDING, 'progress': {'deleted': 3}})
+
+
+    def test_to_dict_includes_result_once_set(self):
+        job = jobs.Job('a_job')
+        job.result = ['a file']
+        self.assertEqual(job.to_dict().get('result'), ['a file'])
+
+
+    def test_ids_are_unique(self):
+        self.assertNotEqual(jobs.Job('a_job').id, jobs.Job('a_job').id)
+
+
+
+
+class ExecutorDouble(object):
+    """
+    Holds submitted tasks until run_all is called
+    """
+    def __init__(self):
+        self.tasks = []
+
+
+    def submit(self, function, *args):
+        self.tasks.append((function, args))
+
+
+    def run_all(self):
+        while self.tasks:
+            function, args = self.tasks.pop(0)
+            function(*args)
@@ -0,0 +1,85 @@
+import sys
+import unittest
+
+import src.startup as startup
+import tests.unit.test_file_mgmt.test_content_managers.common as common
+
+
+_HEAVY_MODULES = ('boto3', 'botocore', 'requests', 'imgurpython')
+_IMPORT_BUDGET_SECONDS = 1.0
+_INIT_BUDGET_SECONDS = 0.25
+
+
+class TestPhaseTimer(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = common.ClockDouble()
+        self.timer = startup.PhaseTimer(self.clock)
+
+
+    def test_records_phases_in_order(self):
+        with self.timer.phase('first'):
+            self.clock.now += 2
+        with self.timer.phase('second'):
+            self.clock.now += 3
+        self.assertEqual(self.timer.phases, [('first', 2), ('second', 3)])
+        self.assertEqual(self.timer.total_seconds, 5)
+
+
+    def test_records_phase_that_raises(self):
+        with self.assertRaises(ValueError):
+            with self.timer.phase('broken'):
+                self.clock.now += 1
+                raise ValueError()
+        self.assertEqual(self.timer.phases, [('broken', 1)])
+
+
+
+class TestParseImportTimes(unittest.TestCase):
+
+    def setUp(self):
+        output = ('import time: self [us] | cumulative | imported package\n'
+                  'import time:       120 |        120 |     botocore.session\n'
+                  'import time:       300 |        420 |   boto3\n'
+                  'some other line\n'
+                  'import time:        80 |        500 | app\n')
+        self.import_times = startup.parse_import_times(output)
+
+
+    def test_parses_module_timings(self):
+        self.assertEqual(self.import_times[1], startup.ImportTime('boto3', 0.0003, 0.00042, 1))
+        self.assertEqual([import_time.depth for import_time in self.import_times], [2, 1, 0])
+
+
+    def test_groups_timings_by_top_level_package(self):
+        self.assertEqual(startup.get_top_level_imports(self.import_times), [('boto3', 0.0003), ('botocore', 0.00012), ('app', 0.00008)])
+
+
+    def test_report_lists_packages_and_phases(self):
+        report = startup.format_report(startup.ColdStart(self.import_times, [('flask_app', 0.002)]), top=1)
+        self.assertIn('boto3', report)
+        self.assertNotIn('botocore', report)
+        self.assertIn('2.0 ms  flask_app', report)
+
+
+
+@unittest.skipIf(sys.version_info < startup._IMPORTTIME_MIN_VERSION, 'python -X importtime needs Python 3.7')
+class TestColdStartBudget(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cold_start = startup.measure_cold_start()
+
+
+    def test_heavy_modules_are_not_imported_on_cold_start(self):
+        modules = {import_time.module.split('.')[0] for import_time in self.cold_start.imports}
+        self.assertEqual(modules.intersection(_HEAVY_MODULES), set())
+
+
+    def test_imports_fit_budget(self):
+        main_import = next(import_time for import_time in self.cold_start.imports if import_time.module == 'main')
+        self.assertLess(main_import.cumulative_seconds, _IMPORT_BUDGET_SECONDS)
+
+
+    def test_init_fits_budget(self):
+        self.assertLess(sum(seconds for name, seconds in self.cold_start.phases), _INIT_BUDGET_SECONDS)
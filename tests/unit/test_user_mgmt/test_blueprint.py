@@ -0,0 +1,77 @@
+import re
+import unittest
+
+from src.file_mgmt.model import File
+import src.jobs as jobs
+import tests.unit.common as common
+
+
+
+class TestDeleteAccount(unittest.TestCase):
+
+    def setUp(self):
+        self.content_manager = ContentManagerDouble()
+        self.app = common.make_app(self.content_manager)
+        self.client = self.app.test_client()
+        self.user = common.add_user(self.app, 'bob', 'bobs_password')
+        self.files_table = self.app.container.dynamodb.Table(common.FILE_TABLE)
+        for content_id in ('first-id', 'second-id'):
+            self.files_table.put_item(Item=File('bob', f'{content_id}.jpg', content_id).to_dict())
+        common.login(self.client, 'bob', 'bobs_password')
+
+
+    def delete_account(self, password='bobs_password'):
+        response = self.client.post('/deleteAccount', data={'password': password})
+        job_id = re.search(r'jobId=(\w+)', response.get_data(as_text=True))
+        return response, job_id.group(1) if job_id else None
+
+
+    def test_deletes_files_and_user_in_background_job(self):
+        response, job_id = self.delete_account()
+        job = common.wait_for_job(self.app, job_id)
+        self.assertEqual(job.status, jobs.SUCCEEDED)
+        self.assertEqual(sorted(self.content_manager.deleted_content_ids), ['first-id', 'second-id'])
+        self.assertEqual(self.content_manager.revoked_usernames, ['bob'])
+        self.assertEqual(self.files_table.items, {})
+        self.assertIsNone(self.app.container.user_data_store.get_user('bob'))
+
+
+    def test_status_reports_finished_job(self):
+        response, job_id = self.delete_account()
+        common.wait_for_job(self.app, job_id)
+        status = self.client.get(f'/deleteAccount/status?jobId={job_id}').get_json()
+        self.assertEqual(status['status'], jobs.SUCCEEDED)
+        self.assertEqual(status['progress'], {'deleted': 2, 'failed': 0})
+
+
+    def test_logs_user_out(self):
+        self.delete_account()
+        self.assertEqual(self.client.get('/').status_code, 302)
+
+
+    def test_keeps_account_if_password_is_wrong(self):
+        response, job_id = self.delete_account('wrong_password')
+        self.assertIsNone(job_id)
+        self.assertIn('Invalid password', response.get_data(as_text=True))
+        self.assertFalse(self.user.deletion_pending)
+
+
+
+
+class ContentManagerDouble(object):
+
+    def __init__(self):
+        self.deleted_content_ids = []
+        self.revoked_usernames = []
+
+
+    def generate_credentials(self, user):
+        user.content_credentials = f'{user.username}:credentials'
+
+
+    def delete_content(self, content_id, credentials, content_name):
+        self.deleted_content_ids.append(content_id)
+
+
+    def revoke_credentials(self, user):
+        self.revoked_usernames.append(user.username)
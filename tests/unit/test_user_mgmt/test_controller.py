@@ -1,5 +1,6 @@
 import unittest
 
+import src.jobs as jobs
 import src.user_mgmt.authentication as auth
 import src.user_mgmt.controller as controller
 
@@ -9,7 +10,9 @@ class TestUserControllerBase(unittest.TestCase):
     def setUp(self):
         self.user_manager = UserManagerDouble()
         self.content_manager = ContentManagerDummy()
-        self.controller = controller.UserMgmtController(self.user_manager, self.content_manager, self.login_callback)
+        self.job_runner = jobs.JobRunner(executor=ExecutorDouble())
+        self.controller = controller.UserMgmtController(self.user_manager, self.content_manager, self.login_callback,
+                                                        self.job_runner)
         self.password = 'plain_password'
         self.user = self.controller.register_user('bob', self.password)
 
@@ -89,12 +92,40 @@ class TestDeleteUser(TestUserControllerBase):
         self.assertIs(self.user_manager.invoked_content_manager, self.content_manager)
 
 
+    def test_marks_user_for_deletion_before_deleting(self):
+        self.controller.delete_user(self.logged_in_user, self.password)
+        self.assertEqual(self.user_manager.calls, ['mark_for_deletion', 'delete_user'])
+
+
+    def test_returns_job_with_progress(self):
+        job = self.controller.delete_user(self.logged_in_user, self.password)
+        self.assertEqual(job.status, jobs.SUCCEEDED)
+        self.assertEqual(job.progress, {'deleted': 2, 'failed': 0})
+        self.assertIs(self.controller.get_deletion_job(job.id), job)
+
+
+    def test_get_deletion_job_ignores_other_jobs(self):
+        job = self.job_runner.submit('another_job', lambda job: None)
+        self.assertIsNone(self.controller.get_deletion_job(job.id))
+        self.assertIsNone(self.controller.get_deletion_job('<invalid job id>'))
+
+
+    def test_login_resumes_pending_deletion(self):
+        self.logged_in_user.deletion_pending = True
+        self.logged_in_user = None
+        with self.assertRaises(controller.AccountDeletionPendingError):
+            self.controller.login_user('bob', self.password)
+        self.assertIsNone(self.logged_in_user)
+        self.assertEqual(self.user_manager.calls, ['delete_user'])
+
+
 
 class UserManagerDouble(object):
 
     def __init__(self):
         self.invoked_user = None
         self.invoked_content_manager = None
+        self.calls = []
         self._users = {}
 
 
@@ -112,9 +143,25 @@ class UserManagerDouble(object):
         return self._users.get(username)
 
 
-    def delete_user(self, user, content_manager):
+    def mark_for_deletion(self, user):
+        self.calls.append('mark_for_deletion')
+        user.deletion_pending = True
+
+
+    def delete_user(self, user, content_manager, progress=None):
+        self.calls.append('delete_user')
         self.invoked_user = user
         self.invoked_content_manager = content_manager
+        progress.update({'deleted': 2, 'failed': 0})
 
 
 class ContentManagerDummy(object): pass
+
+
+
+class ExecutorDouble(object):
+    """
+    Runs submitted tasks right away
+    """
+    def submit(self, function, *args):
+        function(*args)
@@ -1,4 +1,5 @@
 import base64
+from collections import namedtuple
 import os
 import unittest
 
@@ -61,6 +62,14 @@ class TestUser(TestUserBase):
         self.assertEqual(user.password_hash, self.hashed_password)
         self.assertEqual(user.salt, self.salt)
         self.assertEqual(user.content_credentials, self.content_credentials)
+        self.assertFalse(user.deletion_pending)
+
+
+    def test_round_trips_deletion_pending(self):
+        self.user.deletion_pending = True
+        user_dict = self.user.to_dict()
+        self.assertTrue(user_dict.get('deletion_pending'))
+        self.assertTrue(model.User.from_dict(user_dict).deletion_pending)
 
 
 
@@ -160,11 +169,13 @@ class TestDeleteUser(TestUserManagerBase):
 
 
     def test_deletes_all_user_files_from_content_manager(self):
-        self.assertEqual(self.content_manager.removed_content_ids, ['content_id_1', 'content_id_2'])
+        self.assertCountEqual(self.content_manager.removed_content_ids, ['content_id_1', 'content_id_2', 'content_id_3'])
+        self.assertCountEqual(self.content_manager.removed_content_names,
+                              ['bob/content_id_1.png', 'bob/content_id_2.png', 'bob/content_id_3.png'])
 
 
-    def test_deletes_all_user_files_from_data_store(self):
-        self.assertEqual(self.file_data_store.removed_content_ids, ['content_id_1', 'content_id_2'])
+    def test_deletes_all_user_files_from_data_store_one_batch_per_page(self):
+        self.assertEqual(self.file_data_store.removed_batches, [['content_id_1', 'content_id_2'], ['content_id_3']])
 
 
     def test_revokes_user_credentials_from_content_manager(self):
@@ -181,6 +192,47 @@ class TestDeleteUser(TestUserManagerBase):
 
 
 
+class TestDeleteUserProgress(TestUserManagerBase):
+
+    def setUp(self):
+        super(TestDeleteUserProgress, self).setUp()
+        self.user = model.User('bob', 'bob_password', b'salt')
+        self.user_manager.add_user(self.user, self.content_manager)
+        self.progress = {}
+
+
+    def test_mark_for_deletion_stores_user(self):
+        self.user_manager.mark_for_deletion(self.user)
+        self.assertTrue(self.user.deletion_pending)
+        self.assertIs(self.user_data_store.added_user, self.user)
+
+
+    def test_reports_deleted_files(self):
+        self.user_manager.delete_user(self.user, self.content_manager, self.progress)
+        self.assertEqual(self.progress, {'deleted': 3, 'failed': 0})
+
+
+    def test_keeps_files_and_user_if_content_deletion_fails(self):
+        self.content_manager.failing_content_ids = {'content_id_2'}
+        with self.assertRaises(model.AccountDeletionIncompleteError):
+            self.user_manager.delete_user(self.user, self.content_manager, self.progress)
+        self.assertEqual(self.progress, {'deleted': 2, 'failed': 1})
+        self.assertEqual(self.file_data_store.removed_batches, [['content_id_1'], ['content_id_3']])
+        self.assertIsNone(self.content_manager.revoked_user)
+        self.assertIsNone(self.user_data_store.deleted_user)
+
+
+    def test_deleting_again_resumes_with_remaining_files(self):
+        self.content_manager.failing_content_ids = {'content_id_2'}
+        with self.assertRaises(model.AccountDeletionIncompleteError):
+            self.user_manager.delete_user(self.user, self.content_manager)
+        self.content_manager.failing_content_ids = set()
+        self.user_manager.delete_user(self.user, self.content_manager, self.progress)
+        self.assertEqual(self.progress, {'deleted': 1, 'failed': 0})
+        self.assertEqual(self.user_data_store.deleted_user, self.user.username)
+
+
+
 
 
 class UserDataStoreDouble(object):
@@ -207,19 +259,24 @@ class UserDataStoreDouble(object):
 
 
 class FileDataStoreDouble(object):
-
+    """
+    Pages hold two files so deletion has to follow the continuation token
+    """
     def __init__(self):
-        self.removed_content_ids = []
+        self.files = [FileDouble('content_id_1'), FileDouble('content_id_2'), FileDouble('content_id_3')]
+        self.removed_batches = []
         self.invoked_owner = None
 
 
-    def get_files(self, owner):
+    def get_files_page(self, owner, page_size=None, continuation_token=None):
         self.invoked_owner = owner
-        return [FileDouble('content_id_1'), FileDouble('content_id_2')]
+        files = [file for file in self.files if file.content_id > (continuation_token or '')]
+        return FilePageDouble(files[:2], files[1].content_id if len(files) > 2 else None)
 
 
-    def remove_file(self, content_id, owner):
-        self.removed_content_ids.append(content_id)
+    def remove_files(self, files):
+        self.removed_batches.append([file.content_id for file in files])
+        self.files = [file for file in self.files if file not in files]
 
 
 
@@ -228,8 +285,10 @@ class ContentManagerDouble(object):
 
     def __init__(self):
         self.removed_content_ids = []
+        self.removed_content_names = []
         self.invoked_user = None
         self.revoked_user = None
+        self.failing_content_ids = set()
 
     def generate_credentials(self, user):
         self.invoked_user = user
@@ -237,11 +296,18 @@ class ContentManagerDouble(object):
     def revoke_credentials(self, user):
         self.revoked_user = user
 
-    def delete_content(self, content_id, credentials):
+    def delete_content(self, content_id, credentials, content_name=None):
+        if content_id in self.failing_content_ids:
+            raise IOError()
         self.removed_content_ids.append(content_id)
+        self.removed_content_names.append(content_name)
+
+
+FilePageDouble = namedtuple('FilePageDouble', ['files', 'continuation_token'])
 
 
 class FileDouble(object):
 
     def __init__(self, content_id):
         self.content_id = content_id
+        self.content_name = f'bob/{content_id}.png'